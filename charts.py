@@ -0,0 +1,90 @@
+import asyncio
+import base64
+import io
+import os
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from typing import Dict, Hashable, Optional
+
+# Rendering runs here so it never holds db_lock or blocks the event loop
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('CHART_WORKERS', '2')), thread_name_prefix="chart"
+)
+
+_figure_class = None
+_import_lock = Lock()
+
+
+def _get_figure_class():
+    """Import matplotlib on first use, forcing the non-interactive Agg backend"""
+    global _figure_class
+    if _figure_class is None:
+        with _import_lock:
+            if _figure_class is None:
+                import matplotlib
+                matplotlib.use('Agg')
+                from matplotlib.figure import Figure
+                _figure_class = Figure
+    return _figure_class
+
+
+def render_user_pie(user_counts: Dict[str, int]) -> str:
+    """Render the blocks-by-user pie chart as a base64 PNG.
+
+    Uses a standalone Figure rather than pyplot, so there is no global figure
+    state and workers can render concurrently.
+    """
+    if not user_counts:
+        return ""
+    figure = _get_figure_class()(figsize=(8, 6))
+    axes = figure.subplots()
+    axes.pie(
+        list(user_counts.values()),
+        labels=list(user_counts.keys()),
+        autopct='%1.1f%%',
+        startangle=140
+    )
+    axes.set_title('Blocks by User')
+    buf = io.BytesIO()
+    figure.savefig(buf, format='png')
+    return base64.b64encode(buf.getvalue()).decode('utf-8')
+
+
+class ChartCache:
+    """Rendered charts keyed by guild, query and rollup version.
+
+    A new violation bumps the guild's rollup version, so stale images are never
+    served; repeated dashboard opens between violations reuse the cached one.
+    Concurrent requests for the same key share one in-flight render.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._lock = Lock()
+        self._entries: "OrderedDict[Hashable, Future]" = OrderedDict()
+
+    def user_pie(self, guild_id: str, version: int, user_counts: Dict[str, int],
+                 query: Optional[Hashable] = None) -> Future:
+        """Return a future for the guild's pie chart, rendering it only if needed"""
+        key = (guild_id, query, version)
+        with self._lock:
+            future = self._entries.get(key)
+            if future is not None and not (future.done() and future.exception()):
+                self._entries.move_to_end(key)
+                return future
+            # Older versions of this chart can never be served again
+            for stale in [k for k in self._entries if k[:2] == (guild_id, query)]:
+                del self._entries[stale]
+            future = _executor.submit(render_user_pie, dict(user_counts))
+            self._entries[key] = future
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return future
+
+    async def user_pie_async(self, guild_id: str, version: int, user_counts: Dict[str, int],
+                             query: Optional[Hashable] = None) -> str:
+        return await asyncio.wrap_future(self.user_pie(guild_id, version, user_counts, query))
+
+
+chart_cache = ChartCache()
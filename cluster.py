@@ -0,0 +1,97 @@
+import asyncio
+import json
+import os
+import socket
+from typing import Callable, List, Optional, Union
+
+
+def shard_ranges(shard_count: int, cluster_count: int) -> List[range]:
+    """Split shards into contiguous, near-equal ranges, one per cluster"""
+    return [
+        range(cluster * shard_count // cluster_count, (cluster + 1) * shard_count // cluster_count)
+        for cluster in range(cluster_count)
+    ]
+
+
+class _InvalidationProtocol(asyncio.DatagramProtocol):
+    def __init__(self, handler: Callable[[Optional[str]], None]):
+        self.handler = handler
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        try:
+            message = json.loads(data)
+        except ValueError:
+            return
+        if message.get('op') == 'invalidate':
+            self.handler(message.get('guild_id'))
+
+
+class Cluster:
+    """This process's place in a sharded deployment started by launcher.py.
+
+    A cluster owns a contiguous range of shards, and with it the caches,
+    filters and background work for the guilds on them. Discord only
+    delivers those shards' guilds to the process, so ``bot.guilds``, and
+    every job driven by it, is already this cluster's share. Clusters on one host
+    tell each other about config changes over UDP on localhost: cluster ``n``
+    listens on ``port_base + n``, and every committed change, or a flush of
+    all config, is broadcast to all the others, since any of them may hold a
+    copy. Without SHARD_COUNT the bot runs as a single process and every
+    guild is local.
+    """
+
+    def __init__(self, cluster_id: int = 0, cluster_count: int = 1, shard_count: Optional[int] = None,
+                 port_base: int = 47600, host: str = "127.0.0.1"):
+        self.cluster_id = cluster_id
+        self.cluster_count = cluster_count
+        self.shard_count = shard_count
+        self.port_base = port_base
+        self.host = host
+        self.ranges = shard_ranges(shard_count, cluster_count) if shard_count else []
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM) if cluster_count > 1 else None
+        self._transport: Optional[asyncio.DatagramTransport] = None
+
+    @property
+    def sharded(self) -> bool:
+        return self.shard_count is not None
+
+    @property
+    def shard_ids(self) -> Optional[List[int]]:
+        return list(self.ranges[self.cluster_id]) if self.sharded else None
+
+    def publish_invalidation(self, guild_id: Optional[Union[int, str]] = None) -> None:
+        """Tell every other cluster to drop its copy of a guild's config (all config, for None)"""
+        if self._socket is None:
+            return
+        targets = [cluster for cluster in range(self.cluster_count) if cluster != self.cluster_id]
+        payload = json.dumps({'op': 'invalidate', 'guild_id': None if guild_id is None else str(guild_id)}).encode()
+        for cluster in targets:
+            try:
+                self._socket.sendto(payload, (self.host, self.port_base + cluster))
+            except OSError as e:
+                print(f"[WARNING] Could not notify cluster {cluster} of a config change: {e}")
+
+    async def listen(self, handler: Callable[[Optional[str]], None]) -> None:
+        """Start receiving invalidations from other clusters (idempotent; no-op for one cluster)"""
+        if self.cluster_count < 2 or self._transport is not None:
+            return
+        self._transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: _InvalidationProtocol(handler), local_addr=(self.host, self.port_base + self.cluster_id)
+        )
+
+    def close(self) -> None:
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+_shard_count = os.getenv('SHARD_COUNT')
+cluster = Cluster(
+    cluster_id=int(os.getenv('CLUSTER_ID', '0')),
+    cluster_count=int(os.getenv('CLUSTER_COUNT', '1')),
+    shard_count=int(_shard_count) if _shard_count else None,
+    port_base=int(os.getenv('CLUSTER_PORT_BASE', '47600'))
+)
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+from typing import Callable, Dict, Generic, Hashable, Iterable, List, Optional, TypeVar
+
+from metrics import metrics
+
+T = TypeVar('T')
+V = TypeVar('V')
+
+
+class BatchLoader(Generic[T, V]):
+    """DataLoader-style batching of lookups made within one event-loop tick.
+
+    Every ``load`` that misses ``peek`` registers a future; the first one
+    schedules a dispatch with ``call_soon``, so all lookups issued before the
+    loop next runs its callbacks are resolved by one ``batch_fn`` call on a
+    worker thread. Concurrent loads of the same key share one future.
+    ``batch_fn`` takes the items and returns a dict keyed by ``key_fn(item)``.
+    """
+
+    def __init__(self, name: str, batch_fn: Callable[[List[T]], Dict[Hashable, V]],
+                 key_fn: Callable[[T], Hashable], peek: Optional[Callable[[Hashable], Optional[V]]] = None,
+                 max_batch: int = 500):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.key_fn = key_fn
+        self.peek = peek
+        self.max_batch = max_batch
+        self._pending: Dict[Hashable, T] = {}
+        self._futures: Dict[Hashable, asyncio.Future] = {}
+        self._scheduled = False
+
+    async def load(self, item: T) -> V:
+        key = self.key_fn(item)
+        if self.peek is not None and (value := self.peek(key)) is not None:
+            return value
+        future = self._futures.get(key)
+        if future is not None:
+            metrics.incr(f'loader.{self.name}.deduplicated')
+        else:
+            loop = asyncio.get_running_loop()
+            future = self._futures[key] = loop.create_future()
+            self._pending[key] = item
+            if not self._scheduled:
+                self._scheduled = True
+                loop.call_soon(self._dispatch)
+        # Shielded so one cancelled waiter does not cancel the shared lookup
+        return await asyncio.shield(future)
+
+    async def load_many(self, items: Iterable[T]) -> List[V]:
+        return list(await asyncio.gather(*(self.load(item) for item in items)))
+
+    def _dispatch(self) -> None:
+        self._scheduled = False
+        pending, self._pending = self._pending, {}
+        items = list(pending.items())
+        for start in range(0, len(items), self.max_batch):
+            asyncio.ensure_future(self._run(dict(items[start:start + self.max_batch])))
+
+    async def _run(self, batch: Dict[Hashable, T]) -> None:
+        metrics.incr(f'loader.{self.name}.batches')
+        metrics.incr(f'loader.{self.name}.keys', len(batch))
+        try:
+            results = await asyncio.to_thread(self.batch_fn, list(batch.values()))
+        except Exception as e:
+            for key in batch:
+                future = self._futures.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key in batch:
+            future = self._futures.pop(key)
+            if future.done():
+                continue
+            if key in results:
+                future.set_result(results[key])
+            else:
+                future.set_exception(KeyError(key))
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one execution.
+
+    The first thread to ``do`` a key runs ``fn``; threads arriving while it is
+    in flight wait for and share its result (or exception) instead of
+    repeating the work. Nothing is cached once the call completes.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], V]) -> V:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            metrics.incr(f'singleflight.{self.name}.shared')
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        metrics.incr(f'singleflight.{self.name}.executed')
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
@@ -0,0 +1,220 @@
+import json
+import sqlite3
+import time
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# Tables mirrored from the backend into the local tier
+from storage import CONFIG_TABLES
+
+
+class LocalConfigStore:
+    """SQLite (WAL mode) copy of the raw Supabase config rows.
+
+    Sits under the in-memory snapshot caches: a memory miss is answered from
+    here in microseconds, and the last known config survives restarts and
+    Supabase outages. Rows are stored as Supabase returns them (swear_data rows
+    with their words attached) so the parsers in database.py apply unchanged.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS config_rows (
+                table_name TEXT NOT NULL,
+                guild_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                synced_at REAL NOT NULL,
+                PRIMARY KEY (table_name, guild_id)
+            )
+        """)
+
+    def get(self, table: str, guild_id: str) -> Optional[Dict]:
+        """Return the stored row for a guild, or None if it was never synced"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM config_rows WHERE table_name = ? AND guild_id = ?",
+                (table, guild_id)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, table: str, guild_id: str, row: Dict) -> None:
+        self.put_many(table, [row], guild_ids=[guild_id])
+
+    def put_many(self, table: str, rows: List[Dict], guild_ids: Optional[List[str]] = None) -> None:
+        """Upsert rows in one transaction; guild IDs default to each row's guild_id"""
+        now = time.time()
+        ids = guild_ids or [str(row['guild_id']) for row in rows]
+        params = [(table, guild_id, json.dumps(row), now) for guild_id, row in zip(ids, rows)]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO config_rows (table_name, guild_id, payload, synced_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    params
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, table: str, guild_id: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM config_rows WHERE table_name = ? AND guild_id = ?", (table, guild_id)
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM config_rows")
+
+    def guild_ids(self, table: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT guild_id FROM config_rows WHERE table_name = ?", (table,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+class ConfigSync(Thread):
+    """Background thread that keeps the local tier in step with Supabase.
+
+    Guilds served from the local tier are queued with ``request`` and refreshed
+    in batches; every ``interval`` seconds all locally known guilds are
+    refreshed as well. ``on_update`` is called with each fresh row so the
+    in-memory caches can swap in new snapshots. Failures are logged and retried
+    on the next pass, so a Supabase outage only delays freshness.
+    """
+
+    def __init__(self, store: LocalConfigStore,
+                 fetch_rows: Callable[[str, List[str]], List[Dict]],
+                 on_update: Callable[[str, Dict], None],
+                 interval: float = 300.0, batch_delay: float = 1.0):
+        super().__init__(name="config-sync", daemon=True)
+        self.store = store
+        self.fetch_rows = fetch_rows
+        self.on_update = on_update
+        self.interval = interval
+        self.batch_delay = batch_delay
+        self._pending: Set[Tuple[str, str]] = set()
+        self._pending_lock = Lock()
+        self._wakeup = Event()
+        self._last_full_sync = time.monotonic()
+
+    def request(self, table: str, guild_id: str) -> None:
+        """Queue a refresh of one guild's row from Supabase"""
+        with self._pending_lock:
+            self._pending.add((table, guild_id))
+        self._wakeup.set()
+
+    def sync(self, table: str, guild_ids: Iterable[str]) -> int:
+        """Refresh the given guilds of one table now; returns rows written"""
+        guild_ids = list(guild_ids)
+        if not guild_ids:
+            return 0
+        rows = self.fetch_rows(table, guild_ids)
+        if rows:
+            self.store.put_many(table, rows)
+            for row in rows:
+                self.on_update(table, row)
+        return len(rows)
+
+    def run(self) -> None:
+        while True:
+            self._wakeup.wait(timeout=self.interval)
+            self._wakeup.clear()
+            # Let bursts of requests accumulate into a single batch
+            time.sleep(self.batch_delay)
+
+            with self._pending_lock:
+                pending, self._pending = self._pending, set()
+
+            if time.monotonic() - self._last_full_sync >= self.interval:
+                self._last_full_sync = time.monotonic()
+                try:
+                    for table in CONFIG_TABLES:
+                        pending.update((table, guild_id) for guild_id in self.store.guild_ids(table))
+                except Exception as e:
+                    print(f"[WARNING] Could not list locally cached guilds: {e}")
+
+            by_table: Dict[str, List[str]] = {}
+            for table, guild_id in pending:
+                by_table.setdefault(table, []).append(guild_id)
+
+            for table, guild_ids in by_table.items():
+                try:
+                    self.sync(table, guild_ids)
+                except Exception as e:
+                    print(f"[WARNING] Config sync for {table} failed, keeping local copy: {e}")
+                    with self._pending_lock:
+                        self._pending.update((table, guild_id) for guild_id in guild_ids)
+
+
+class DefaultRowWriter(Thread):
+    """Background thread that creates default config rows for new guilds.
+
+    Readers that find no row serve an in-memory default and call ``request``,
+    which never blocks and only queues each (table, guild) once per process.
+    The thread starts on the first request. ``create(table, guild_id, row)``
+    must be idempotent (insert if absent), so a row written meanwhile by a
+    real config change is never overwritten; it returns whether a row was
+    inserted. Failed writes are retried on the next pass.
+    """
+
+    def __init__(self, create: Callable[[str, str, Dict], bool], retry_delay: float = 30.0):
+        super().__init__(name="default-rows", daemon=True)
+        self.create = create
+        self.retry_delay = retry_delay
+        self._requested: Set[Tuple[str, str]] = set()
+        self._pending: Dict[Tuple[str, str], Dict] = {}
+        self._lock = Lock()
+        self._wakeup = Event()
+
+    def request(self, table: str, guild_id: str, row: Dict) -> bool:
+        """Queue a default row; returns False if it was already requested"""
+        key = (table, guild_id)
+        with self._lock:
+            if key in self._requested:
+                return False
+            self._requested.add(key)
+            self._pending[key] = row
+            if self.ident is None:
+                self.start()
+        self._wakeup.set()
+        return True
+
+    def forget(self, table: str, guild_id: str) -> None:
+        """Drop a queued default, e.g. because a real row was just saved"""
+        with self._lock:
+            self._pending.pop((table, guild_id), None)
+
+    def drain(self) -> int:
+        """Write every queued row now; returns how many were created"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        created = 0
+        for (table, guild_id), row in pending.items():
+            try:
+                if self.create(table, guild_id, row):
+                    created += 1
+            except Exception as e:
+                print(f"[WARNING] Could not create default {table} row for {guild_id}, will retry: {e}")
+                with self._lock:
+                    self._pending.setdefault((table, guild_id), row)
+        return created
+
+    def run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            self.drain()
+            with self._lock:
+                retry = bool(self._pending)
+            if retry:
+                time.sleep(self.retry_delay)
+                self._wakeup.set()
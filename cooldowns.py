@@ -0,0 +1,117 @@
+import heapq
+import os
+import sqlite3
+import time
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from metrics import metrics
+
+# (command name, user ID)
+Key = Tuple[str, int]
+
+
+class SharedCooldownStore:
+    """SQLite (WAL mode) table of cooldown expiries shared by every process on the host.
+
+    ``acquire`` is a single conditional upsert, so two shards handling the same
+    user at the same moment cannot both start a cooldown. Expired rows are
+    deleted at most once per ``prune_interval`` seconds.
+    """
+
+    def __init__(self, path: str, prune_interval: float = 60.0):
+        self.path = path
+        self.prune_interval = prune_interval
+        self._lock = Lock()
+        self._last_prune = 0.0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cooldowns (
+                command TEXT NOT NULL,
+                user_id INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (command, user_id)
+            )
+        """)
+
+    def acquire(self, key: Key, now: float, expires_at: float) -> Optional[float]:
+        """Start the cooldown unless one is running; returns the running one's expiry"""
+        with self._lock:
+            if now - self._last_prune >= self.prune_interval:
+                self._last_prune = now
+                self._conn.execute("DELETE FROM cooldowns WHERE expires_at <= ?", (now,))
+            cursor = self._conn.execute(
+                "INSERT INTO cooldowns (command, user_id, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (command, user_id) DO UPDATE SET expires_at = excluded.expires_at "
+                "WHERE cooldowns.expires_at <= ?",
+                (key[0], key[1], expires_at, now)
+            )
+            if cursor.rowcount:
+                return None
+            row = self._conn.execute(
+                "SELECT expires_at FROM cooldowns WHERE command = ? AND user_id = ?", key
+            ).fetchone()
+        return row[0] if row else None
+
+
+class CooldownTracker:
+    """Per-command, per-user cooldowns with bounded memory.
+
+    Expiries are wall-clock timestamps, so they can be rendered as Discord
+    relative timestamps and compared across processes. Entries are dropped
+    once they expire (tracked with a heap, so pruning costs nothing while the
+    table is quiet), and the table never holds more than ``max_entries``; past
+    that the soonest-expiring entries go first. With a ``shared`` store,
+    cooldowns started by other shards on the host apply here as well.
+    """
+
+    def __init__(self, max_entries: int = 10000, shared: Optional[SharedCooldownStore] = None):
+        self.max_entries = max_entries
+        self.shared = shared
+        self._expires: Dict[Key, float] = {}
+        self._heap: List[Tuple[float, Key]] = []
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def _prune(self, now: float) -> None:
+        while self._heap and (self._heap[0][0] <= now or len(self._expires) > self.max_entries):
+            expires_at, key = heapq.heappop(self._heap)
+            if self._expires.get(key) == expires_at:
+                del self._expires[key]
+
+    def _set(self, key: Key, expires_at: float) -> None:
+        self._expires[key] = expires_at
+        heapq.heappush(self._heap, (expires_at, key))
+        if len(self._heap) > 2 * self.max_entries:
+            # Superseded heap entries are only skipped lazily; rebuild before they pile up
+            self._heap = [(expires_at, key) for key, expires_at in self._expires.items()]
+            heapq.heapify(self._heap)
+
+    def hit(self, command: str, user_id: int, seconds: float) -> Optional[float]:
+        """Start a cooldown for this use, or return the epoch time the running one ends"""
+        now = time.time()
+        self._prune(now)
+        key = (command, user_id)
+        expires_at = self._expires.get(key)
+        if expires_at is None and self.shared is not None:
+            try:
+                expires_at = self.shared.acquire(key, now, now + seconds)
+            except sqlite3.Error as e:
+                print(f"[WARNING] Shared cooldown store unavailable, using local state: {e}")
+        if expires_at is not None:
+            self._set(key, expires_at)
+            metrics.incr('cooldowns.blocked')
+            return expires_at
+        self._set(key, now + seconds)
+        self._prune(now)
+        return None
+
+
+_shared_path = os.getenv('COOLDOWN_DB')
+cooldowns = CooldownTracker(
+    max_entries=int(os.getenv('COOLDOWN_MAX_ENTRIES', '10000')),
+    shared=SharedCooldownStore(_shared_path) if _shared_path else None
+)
@@ -1,26 +1,33 @@
 import json
 import os
 from threading import Lock
-from functools import lru_cache
-from typing import Dict, List, Optional, Union
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from typing import TypedDict
-import matplotlib.pyplot as plt
-import io
+import asyncio
+import atexit
 import base64
+import time
 from datetime import datetime
-import supabase
 from dotenv import load_dotenv
+from models import GuildConfig, RolesData, SwearData
+from config_store import ConfigSync, DefaultRowWriter, LocalConfigStore
+from storage import CONFIG_TABLES, StorageBackend, create_backend
+from resilience import wrap_backend
+from rollups import RollupFlusher, RollupRegistry
+from charts import chart_cache
+from coalescing import BatchLoader, SingleFlight
+from metrics import TimedLock, cache_result, instrumented, metrics
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Supabase client
-supabase_url = os.getenv('SUPABASE_URL')
-supabase_key = os.getenv('SUPABASE_KEY')
-supabase_client = supabase.create_client(supabase_url, supabase_key)
+# Global lock for thread-safe database operations; records wait and hold times
+db_lock = TimedLock('db_lock')
 
-# Global lock for thread-safe database operations
-db_lock = Lock()
+# Storage backend selected by STORAGE_BACKEND (supabase or sqlite), with
+# timeouts, retries and a circuit breaker around every call; db_lock is
+# released while a retry backs off
+backend: StorageBackend = wrap_backend(create_backend(), yield_lock=db_lock)
 
 class AnalyticsResult(TypedDict):
     total_blocks: int
@@ -29,213 +36,528 @@ class AnalyticsResult(TypedDict):
 
 def setup_database():
     """Initialize the database with required tables"""
-    # This is handled via Supabase migrations or UI
-    # Tables should be created in Supabase dashboard before running the bot
+    # The SQLite backend creates its schema when it is opened.
+    # For Supabase this is handled via migrations or UI:
+    # tables should be created in Supabase dashboard before running the bot
     pass
 
-# In database.py, modify the load_roles_data function:
-@lru_cache(maxsize=128)
-def load_roles_data(guild_id: Optional[Union[int, str]] = None) -> Union[Dict, Optional[Dict]]:
-    """Load roles data for a specific guild or all guilds"""
+# Per-guild snapshot caches. Snapshots are immutable, so readers share them
+# without copying or locking; writers swap in a new snapshot after saving.
+_roles_cache: Dict[str, RolesData] = {}
+_swear_cache: Dict[str, SwearData] = {}
+
+# Combined per-guild config built from the caches above; dropped whenever one
+# of its parts changes and rebuilt on the next read
+_config_cache: Dict[str, GuildConfig] = {}
+
+# Last config successfully built for each guild. Never invalidated, so a
+# guild keeps its filter while the backend is unreachable
+_last_known_config: Dict[str, GuildConfig] = {}
+
+# In-flight backend fetches per table (and for whole guild configs), keyed by guild
+_flights: Dict[str, SingleFlight] = {
+    name: SingleFlight(name) for name in ('swear_data', 'roles_data', 'guild_settings', 'guild_config')
+}
+
+# Serializes read-modify-write cycles in the update_* helpers
+_commit_lock = Lock()
+
+# Local SQLite tier under the memory caches, kept fresh by a background sync
+local_store = LocalConfigStore(os.getenv('LOCAL_CONFIG_DB', 'config_cache.db'))
+
+def _local_row(table: str, guild_id: str) -> Optional[Dict]:
+    """Read a row from the local tier; returns None if it is missing or unreadable"""
+    try:
+        row = local_store.get(table, guild_id)
+        cache_result('local_config', row is not None)
+        return row
+    except Exception as e:
+        print(f"[WARNING] Local config read failed for {table}/{guild_id}: {e}")
+        return None
+
+def _store_local(table: str, guild_id: str, row: Dict, merge: bool = False) -> None:
+    """Write a row through to the local tier, optionally merged into the stored one"""
+    try:
+        if merge:
+            row = {**(local_store.get(table, guild_id) or {}), **row}
+        local_store.put(table, guild_id, row)
+    except Exception as e:
+        print(f"[WARNING] Local config write failed for {table}/{guild_id}: {e}")
+
+# Rows the backend reported missing, so repeated misses are answered without
+# a query until the entry expires or a row is saved
+NEGATIVE_CACHE_TTL = float(os.getenv('NEGATIVE_CACHE_TTL', '300'))
+_absent_rows: Dict[Tuple[str, str], float] = {}
+
+def _mark_absent(table: str, guild_id: str) -> None:
+    _absent_rows[(table, guild_id)] = time.monotonic()
+
+def _mark_present(table: str, guild_id: str) -> None:
+    _absent_rows.pop((table, guild_id), None)
+    default_rows.forget(table, guild_id)
+
+def _known_absent(table: str, guild_id: str) -> bool:
+    """Whether the backend recently had no row for this guild"""
+    marked = _absent_rows.get((table, guild_id))
+    if marked is None:
+        return False
+    if time.monotonic() - marked > NEGATIVE_CACHE_TTL:
+        _absent_rows.pop((table, guild_id), None)
+        return False
+    metrics.incr('config.negative_cache_hits')
+    return True
+
+def _roles_row(guild_id: str, data: RolesData) -> Dict:
+    return {
+        'guild_id': guild_id,
+        'owner_id': str(data.owner_id) if data.owner_id else None,
+        'allowed_roles': json.dumps(sorted(data.allowed_roles)),
+        'immune_roles': json.dumps(sorted(data.immune_roles))
+    }
+
+def _swear_row(guild_id: str, data: SwearData) -> Dict:
+    # The words themselves are rows of the swear_words table
+    return {
+        'guild_id': guild_id,
+        'allowed_channels': json.dumps(sorted(data.allowed_channels))
+    }
+
+def _swear_local_row(guild_id: str, data: SwearData) -> Dict:
+    """swear_data row with its words attached, as kept in the local tier"""
+    return {
+        **_swear_row(guild_id, data),
+        'swear_words': json.dumps(sorted(data.swear_words)),
+        'words_version': data.version
+    }
+
+@instrumented('create_default_row', guild_arg=1)
+def _create_default_row(table: str, guild_id: str, row: Dict) -> bool:
+    """Insert a default row if the guild still has none (runs on the writer thread)"""
     with db_lock:
+        created = backend.insert_row_if_absent(table, guild_id, row)
+    if created:
+        metrics.incr('config.default_rows_created')
+        _store_local(table, guild_id, row)
+        _absent_rows.pop((table, guild_id), None)
+    else:
+        # A real row appeared meanwhile; pull it instead of keeping the default
+        config_sync.request(table, guild_id)
+    return created
+
+default_rows = DefaultRowWriter(_create_default_row)
+
+def _install_default(table: str, guild_id: str, data: Union[RolesData, SwearData]) -> None:
+    """Cache a default snapshot for a guild with no row and queue the row's creation"""
+    cache, _ = _TABLE_CACHES[table]
+    cache[guild_id] = data
+    _config_cache.pop(guild_id, None)
+    row = _roles_row(guild_id, data) if table == 'roles_data' else _swear_row(guild_id, data)
+    if default_rows.request(table, guild_id, row):
+        metrics.incr('config.default_rows_queued')
+
+def _parse_roles_row(row: Dict) -> RolesData:
+    return RolesData(
+        owner_id=int(row['owner_id']) if row['owner_id'] and row['owner_id'] != 'None' else None,
+        allowed_roles=json.loads(row['allowed_roles']) if row['allowed_roles'] else [],
+        immune_roles=json.loads(row['immune_roles']) if row['immune_roles'] else []
+    )
+
+def _parse_swear_row(row: Dict) -> SwearData:
+    return SwearData(
+        swear_words=json.loads(row['swear_words']) if row.get('swear_words') else [],
+        allowed_channels=json.loads(row['allowed_channels']) if row.get('allowed_channels') else [],
+        version=row.get('words_version') or 0
+    )
+
+def _attach_swear_words(rows: List[Dict], word_rows: Optional[List[Dict]] = None) -> List[Dict]:
+    """Fill swear_data rows from the backend with their words; call with db_lock held.
+
+    Rows still holding a legacy JSON word list are migrated to swear_words
+    first. Guilds with a versioned cached snapshot only fetch the changes made
+    since, all in one query; the rest are read in full unless ``word_rows``
+    already holds their live words.
+    """
+    guild_ids = [str(row['guild_id']) for row in rows]
+    legacy = {guild_id for guild_id, row in zip(guild_ids, rows) if row.get('swear_words')}
+    for guild_id in legacy:
+        moved = backend.migrate_swear_words(guild_id)
+        metrics.incr('swear_words.migrated_guilds')
+        metrics.incr('swear_words.migrated_words', moved)
+
+    bases: Dict[str, SwearData] = {}
+    if word_rows is None or legacy:
+        for guild_id in guild_ids:
+            cached = _swear_cache.get(guild_id)
+            if cached is not None and cached.version and guild_id not in legacy:
+                bases[guild_id] = cached
+        word_rows = []
+        if full := [guild_id for guild_id in guild_ids if guild_id not in bases]:
+            word_rows += backend.fetch_swear_words(full)
+        if bases:
+            # Versions are global, so one query from the oldest snapshot covers every guild
+            word_rows += backend.fetch_swear_words(list(bases), min(data.version for data in bases.values()))
+    metrics.incr('swear_words.delta_reads', len(bases))
+    metrics.incr('swear_words.full_reads', len(guild_ids) - len(bases))
+
+    changes: Dict[str, List[Dict]] = {}
+    for word_row in word_rows:
+        changes.setdefault(str(word_row['guild_id']), []).append(word_row)
+    attached = []
+    for guild_id, row in zip(guild_ids, rows):
+        base = bases.get(guild_id)
+        words = set(base.swear_words) if base else set()
+        version = known = base.version if base else 0
+        for change in changes.get(guild_id, ()):
+            if change['version'] <= known:
+                continue
+            if change['deleted']:
+                words.discard(change['word'])
+            else:
+                words.add(change['word'])
+            version = max(version, change['version'])
+        attached.append({**row, 'swear_words': json.dumps(sorted(words)), 'words_version': version})
+    return attached
+
+def invalidate_config(guild_id: Optional[Union[int, str]] = None, remote: bool = False) -> None:
+    """Drop cached config snapshots for one guild, or for every guild.
+
+    Other processes are told to do the same. With ``remote`` (the change was
+    made by another process, which already told everyone) the local-tier
+    rows and negative cache entries go too, so the next read comes from the
+    backend.
+    """
+    if guild_id is None:
+        _roles_cache.clear()
+        _swear_cache.clear()
+        _settings_cache.clear()
+        _config_cache.clear()
+        if remote:
+            _absent_rows.clear()
+            try:
+                local_store.clear()
+            except Exception as e:
+                print(f"[WARNING] Local config clear failed: {e}")
+    else:
+        _roles_cache.pop(str(guild_id), None)
+        _swear_cache.pop(str(guild_id), None)
+        _settings_cache.pop(str(guild_id), None)
+        _config_cache.pop(str(guild_id), None)
+        if remote:
+            for table in CONFIG_TABLES:
+                _absent_rows.pop((table, str(guild_id)), None)
+                try:
+                    local_store.delete(table, str(guild_id))
+                except Exception as e:
+                    print(f"[WARNING] Local config delete failed for {table}/{guild_id}: {e}")
+    if not remote:
+        _config_changed(None if guild_id is None else str(guild_id))
+
+# Called with the guild ID (None for every guild) after each config write or
+# flush, e.g. to tell the other bot processes to drop their copies
+config_change_hooks: List[Callable[[Optional[str]], None]] = []
+
+def _config_changed(guild_id: Optional[str]) -> None:
+    for hook in config_change_hooks:
         try:
-            if guild_id:
-                response = supabase_client.table('roles_data').select('*').eq('guild_id', str(guild_id)).execute()
-                if response.data and len(response.data) > 0:
-                    row = response.data[0]
-                    return {
-                        "owner_id": int(row['owner_id']) if row['owner_id'] and row['owner_id'] != 'None' else None,
-                        "allowed_roles": json.loads(row['allowed_roles']) if row['allowed_roles'] else [],
-                        "immune_roles": json.loads(row['immune_roles']) if row['immune_roles'] else []
-                    }
-                return None
-            
-            response = supabase_client.table('roles_data').select('*').execute()
-            return {row['guild_id']: {
-                "owner_id": int(row['owner_id']) if row['owner_id'] and row['owner_id'] != 'None' else None,
-                "allowed_roles": json.loads(row['allowed_roles']) if row['allowed_roles'] else [],
-                "immune_roles": json.loads(row['immune_roles']) if row['immune_roles'] else []
-            } for row in response.data}
-        except json.JSONDecodeError as e:
-            print(f"[ERROR] JSON decode error in load_roles_data: {e}")
-            return None if guild_id else {}
+            hook(guild_id)
         except Exception as e:
-            print(f"[ERROR] Failed to load roles data: {e}")
-            return None if guild_id else {}
+            print(f"[WARNING] Config change hook failed for guild {guild_id}: {e}")
 
-# Also update the save_roles_data function:
-def save_roles_data(guild_id: Union[int, str], data: Dict) -> bool:
-    """Save roles data for a guild"""
-    with db_lock:
-        try:
-            # Check if record exists
-            response = supabase_client.table('roles_data').select('*').eq('guild_id', str(guild_id)).execute()
-            
-            row_data = {
-                'guild_id': str(guild_id),
-                'owner_id': str(data.get("owner_id", "")) if data.get("owner_id") else None,
-                'allowed_roles': json.dumps(data.get("allowed_roles", [])),
-                'immune_roles': json.dumps(data.get("immune_roles", []))
-            }
+@instrumented('load_roles_data')
+def load_roles_data(guild_id: Optional[Union[int, str]] = None) -> Union[Dict[str, RolesData], Optional[RolesData]]:
+    """Load roles data for a specific guild or all guilds"""
+    if guild_id:
+        if str(guild_id) in _roles_cache:
+            cache_result('roles_data', True)
+            return _roles_cache[str(guild_id)]
+        cache_result('roles_data', False)
+        if (row := _local_row('roles_data', str(guild_id))) is not None:
+            data = _roles_cache[str(guild_id)] = _parse_roles_row(row)
+            _config_cache.pop(str(guild_id), None)
+            config_sync.request('roles_data', str(guild_id))
+            return data
+        if _known_absent('roles_data', str(guild_id)):
+            return None
+
+    def fetch() -> Union[Dict[str, RolesData], Optional[RolesData]]:
+        with db_lock:
+            try:
+                if guild_id:
+                    row = backend.fetch_row('roles_data', str(guild_id))
+                    if row:
+                        data = _roles_cache[str(guild_id)] = _parse_roles_row(row)
+                        _config_cache.pop(str(guild_id), None)
+                        _store_local('roles_data', str(guild_id), row)
+                        return data
+                    _mark_absent('roles_data', str(guild_id))
+                    return None
             
-            if response.data and len(response.data) > 0:
-                # Update existing record
-                supabase_client.table('roles_data').update(row_data).eq('guild_id', str(guild_id)).execute()
-            else:
-                # Insert new record
-                supabase_client.table('roles_data').insert(row_data).execute()
-                
-            load_roles_data.cache_clear()
-            return True
-        except Exception as e:
-            print(f"[ERROR] Failed to save roles data: {e}")
-            return False
-        
-def save_roles_data(guild_id: Union[int, str], data: Dict) -> bool:
-    """Save roles data for a guild"""
+                all_data = {row['guild_id']: _parse_roles_row(row) for row in backend.fetch_rows('roles_data')}
+                _roles_cache.update(all_data)
+                _config_cache.clear()
+                return all_data
+            except json.JSONDecodeError as e:
+                print(f"[ERROR] JSON decode error in load_roles_data: {e}")
+                return None if guild_id else {}
+            except Exception as e:
+                print(f"[ERROR] Failed to load roles data: {e}")
+                if guild_id and (stale := _last_known_config.get(str(guild_id))) is not None:
+                    metrics.incr('config.served_stale')
+                    return stale.roles
+                return None if guild_id else {}
+
+    # Concurrent misses for the same guild share one backend fetch
+    return _flights['roles_data'].do(str(guild_id) if guild_id else None, fetch)
+
+@instrumented('save_roles_data')
+def save_roles_data(guild_id: Union[int, str], data: RolesData) -> bool:
+    """Save roles data for a guild and install it as the cached snapshot"""
     with db_lock:
         try:
-            # Check if record exists
-            response = supabase_client.table('roles_data').select('*').eq('guild_id', str(guild_id)).execute()
-            
-            row_data = {
-                'guild_id': str(guild_id),
-                'owner_id': str(data.get("owner_id", "")),
-                'allowed_roles': json.dumps(data.get("allowed_roles", [])),
-                'immune_roles': json.dumps(data.get("immune_roles", []))
-            }
-            
-            if response.data and len(response.data) > 0:
-                # Update existing record
-                supabase_client.table('roles_data').update(row_data).eq('guild_id', str(guild_id)).execute()
-            else:
-                # Insert new record
-                supabase_client.table('roles_data').insert(row_data).execute()
-                
-            load_roles_data.cache_clear()
+            row_data = _roles_row(str(guild_id), data)
+            backend.upsert_row('roles_data', str(guild_id), row_data)
+            _roles_cache[str(guild_id)] = data
+            _mark_present('roles_data', str(guild_id))
+            _config_cache.pop(str(guild_id), None)
+            _store_local('roles_data', str(guild_id), row_data)
+            _config_changed(str(guild_id))
             return True
         except Exception as e:
             print(f"[ERROR] Failed to save roles data: {e}")
             return False
 
-def get_roles_data(guild: Union[object, int, str]) -> Dict:
-    """Get roles data for a guild, creating default if not exists"""
+def get_roles_data(guild: Union[object, int, str]) -> RolesData:
+    """Get roles data for a guild, serving a default if it has none.
+
+    The default row is created once in the background, never by the caller.
+    """
     try:
         guild_id = guild.id if hasattr(guild, 'id') else guild
         data = load_roles_data(guild_id)
         
         if not data:
             owner_id = guild.owner_id if hasattr(guild, 'owner_id') else None
-            data = {
-                "owner_id": owner_id,
-                "allowed_roles": [],
-                "immune_roles": []
-            }
-            if not save_roles_data(guild_id, data):
-                print(f"[WARNING] Failed to save default roles data for guild {guild_id}")
+            data = RolesData(owner_id=owner_id)
+            # Only a confirmed miss is cached; a failed read is retried next time
+            if _known_absent('roles_data', str(guild_id)):
+                _install_default('roles_data', str(guild_id), data)
         
         return data
     except Exception as e:
         print(f"[ERROR] get_roles_data failed: {e}")
-        return {"owner_id": None, "allowed_roles": [], "immune_roles": []}
+        return RolesData()
 
-@lru_cache(maxsize=128)
-def load_swear_data(guild_id: Union[int, str]) -> Optional[Dict]:
-    """Load swear data for a specific guild"""
-    with db_lock:
-        try:
-            response = supabase_client.table('swear_data').select('*').eq('guild_id', str(guild_id)).execute()
-            if response.data and len(response.data) > 0:
-                row = response.data[0]
-                return {
-                    "swear_words": json.loads(row['swear_words']) if row['swear_words'] else [],
-                    "allowed_channels": json.loads(row['allowed_channels']) if row['allowed_channels'] else []
-                }
-            return None
-        except json.JSONDecodeError as e:
-            print(f"[ERROR] JSON decode error in load_swear_data: {e}")
-            return None
-        except Exception as e:
-            print(f"[ERROR] Failed to load swear data: {e}")
+def update_roles_data(guild: Union[object, int, str], mutate: Callable[[RolesData], RolesData]) -> Optional[RolesData]:
+    """Apply ``mutate`` to the current roles snapshot and commit the result.
+
+    The cached snapshot is only replaced once the save succeeds. Returns the
+    committed snapshot, or None if the current data could not be read or
+    saving failed.
+    """
+    guild_id = str(guild.id if hasattr(guild, 'id') else guild)
+    with _commit_lock:
+        current = load_roles_data(guild_id)
+        if current is None and _known_absent('roles_data', guild_id):
+            current = RolesData(owner_id=guild.owner_id if hasattr(guild, 'owner_id') else None)
+        elif current is None or _roles_cache.get(guild_id) is not current:
+            # The read failed (or only served a stale copy); committing a
+            # default or outdated snapshot would overwrite the stored roles
+            print(f"[ERROR] Not updating roles data for guild {guild_id}: current data could not be read")
             return None
+        updated = mutate(current)
+        if updated == current:
+            return current
+        return updated if save_roles_data(guild_id, updated) else None
+
+@instrumented('load_swear_data')
+def load_swear_data(guild_id: Union[int, str]) -> Optional[SwearData]:
+    """Load swear data for a specific guild"""
+    if str(guild_id) in _swear_cache:
+        cache_result('swear_data', True)
+        return _swear_cache[str(guild_id)]
+    cache_result('swear_data', False)
+    if (row := _local_row('swear_data', str(guild_id))) is not None:
+        data = _swear_cache[str(guild_id)] = _parse_swear_row(row)
+        _config_cache.pop(str(guild_id), None)
+        config_sync.request('swear_data', str(guild_id))
+        return data
+    if _known_absent('swear_data', str(guild_id)):
+        return None
+
+    def fetch() -> Optional[SwearData]:
+        with db_lock:
+            try:
+                row = backend.fetch_row('swear_data', str(guild_id))
+                if row:
+                    row = _attach_swear_words([row])[0]
+                    data = _swear_cache[str(guild_id)] = _parse_swear_row(row)
+                    _config_cache.pop(str(guild_id), None)
+                    _store_local('swear_data', str(guild_id), row)
+                    return data
+                _mark_absent('swear_data', str(guild_id))
+                return None
+            except json.JSONDecodeError as e:
+                print(f"[ERROR] JSON decode error in load_swear_data: {e}")
+                return None
+            except Exception as e:
+                print(f"[ERROR] Failed to load swear data: {e}")
+                if (stale := _last_known_config.get(str(guild_id))) is not None:
+                    metrics.incr('config.served_stale')
+                    return stale.swear
+                return None
 
-def save_swear_data(guild_id: Union[int, str], data: Dict) -> bool:
-    """Save swear data for a guild"""
+    # Concurrent misses for the same guild share one backend fetch
+    return _flights['swear_data'].do(str(guild_id), fetch)
+
+@instrumented('save_swear_data')
+def save_swear_data(guild_id: Union[int, str], data: SwearData, added_by: Optional[int] = None,
+                    base: Optional[SwearData] = None) -> bool:
+    """Save swear data for a guild and install it as the cached snapshot.
+
+    Only the words added or removed relative to ``base`` (the snapshot the
+    caller edited; the cached snapshot by default) are written, so words the
+    caller never saw are left alone, and the channel list only if it changed.
+    """
+    guild_id = str(guild_id)
     with db_lock:
         try:
-            # Check if record exists
-            response = supabase_client.table('swear_data').select('*').eq('guild_id', str(guild_id)).execute()
-            
-            row_data = {
-                'guild_id': str(guild_id),
-                'swear_words': json.dumps(data.get("swear_words", [])),
-                'allowed_channels': json.dumps(data.get("allowed_channels", []))
-            }
-            
-            if response.data and len(response.data) > 0:
-                # Update existing record
-                supabase_client.table('swear_data').update(row_data).eq('guild_id', str(guild_id)).execute()
-            else:
-                # Insert new record
-                supabase_client.table('swear_data').insert(row_data).execute()
-                
-            load_swear_data.cache_clear()
+            previous = _swear_cache.get(guild_id)
+            if previous is None or not previous.version:
+                # Nothing versioned to diff against: read (and migrate) the stored list
+                row = backend.fetch_row('swear_data', guild_id)
+                previous = _parse_swear_row(_attach_swear_words([row])[0]) if row else None
+            stored = previous or SwearData()
+            base = stored if base is None else base
+            added = sorted(data.swear_words - base.swear_words)
+            removed = sorted(base.swear_words - data.swear_words)
+            if added or removed:
+                backend.apply_swear_words(guild_id, added, removed, str(added_by) if added_by else None)
+                metrics.incr('swear_words.added', len(added))
+                metrics.incr('swear_words.removed', len(removed))
+            if previous is None or data.allowed_channels != previous.allowed_channels:
+                backend.upsert_row('swear_data', guild_id, _swear_row(guild_id, data))
+            # Keep the version diffed against, so the next refresh also picks up
+            # changes other processes made in the meantime
+            data = _swear_cache[guild_id] = data.replace(
+                swear_words=(stored.swear_words - set(removed)) | set(added), version=stored.version
+            )
+            _mark_present('swear_data', guild_id)
+            _config_cache.pop(guild_id, None)
+            _store_local('swear_data', guild_id, _swear_local_row(guild_id, data))
+            _config_changed(str(guild_id))
             return True
         except Exception as e:
             print(f"[ERROR] Failed to save swear data: {e}")
             return False
 
-def get_swear_data(guild_id: Union[int, str]) -> Dict:
-    """Get swear data for a guild, creating default if not exists"""
+def get_swear_data(guild_id: Union[int, str]) -> SwearData:
+    """Get swear data for a guild, serving a default if it has none.
+
+    The default row is created once in the background, never by the caller.
+    """
     try:
         data = load_swear_data(guild_id)
         
         if not data:
-            data = {
-                "swear_words": [],
-                "allowed_channels": []
-            }
-            if not save_swear_data(guild_id, data):
-                print(f"[WARNING] Failed to save default swear data for guild {guild_id}")
+            data = SwearData()
+            # Only a confirmed miss is cached; a failed read is retried next time
+            if _known_absent('swear_data', str(guild_id)):
+                _install_default('swear_data', str(guild_id), data)
         
         return data
     except Exception as e:
         print(f"[ERROR] get_swear_data failed: {e}")
-        return {"swear_words": [], "allowed_channels": []}
+        return SwearData()
+
+def update_swear_data(guild_id: Union[int, str], mutate: Callable[[SwearData], SwearData],
+                      added_by: Optional[int] = None) -> Optional[SwearData]:
+    """Apply ``mutate`` to the current swear snapshot and commit the result.
 
-@lru_cache(maxsize=128)
+    The cached snapshot is only replaced once the save succeeds. Returns the
+    committed snapshot, or None if the current data could not be read or
+    saving failed. ``added_by`` is recorded against any words added.
+    """
+    guild_id = str(guild_id)
+    with _commit_lock:
+        current = load_swear_data(guild_id)
+        if current is None and _known_absent('swear_data', guild_id):
+            current = SwearData()
+        elif current is None or _swear_cache.get(guild_id) is not current:
+            # The read failed (or only served a stale copy); diffing an empty
+            # default against the stored list would delete every word
+            print(f"[ERROR] Not updating swear data for guild {guild_id}: current data could not be read")
+            return None
+        updated = mutate(current)
+        if updated == current:
+            return current
+        if not save_swear_data(guild_id, updated, added_by, base=current):
+            return None
+        return _swear_cache.get(guild_id, updated)
+
+DEFAULT_GUILD_SETTINGS = {
+    'strict_mode': False,
+    'warning_message': None,
+    'cooldown_time': 60,
+    'max_warnings': 3,
+    'retention_days': None,
+    'logging_channel': None
+}
+
+# Days of raw moderation logs kept for guilds without their own setting (0 = forever)
+DEFAULT_RETENTION_DAYS = int(os.getenv('LOG_RETENTION_DAYS', '0'))
+
+_settings_cache: Dict[str, Dict] = {}
+
+def _parse_settings_row(row: Dict) -> Dict:
+    return {
+        'strict_mode': bool(row.get('strict_mode')),
+        'warning_message': row.get('warning_message'),
+        'cooldown_time': row.get('cooldown_time') or DEFAULT_GUILD_SETTINGS['cooldown_time'],
+        'max_warnings': row.get('max_warnings') or DEFAULT_GUILD_SETTINGS['max_warnings'],
+        'retention_days': row.get('retention_days'),
+        'logging_channel': int(row['logging_channel']) if row.get('logging_channel') else None
+    }
+
+@instrumented('load_guild_settings')
 def load_guild_settings(guild_id: Union[int, str]) -> Dict:
     """Load guild-specific settings"""
-    with db_lock:
-        try:
-            response = supabase_client.table('guild_settings').select('*').eq('guild_id', str(guild_id)).execute()
-            default_settings = {
-                'strict_mode': False,
-                'warning_message': None,
-                'cooldown_time': 60,
-                'max_warnings': 3
-            }
-            
-            if response.data and len(response.data) > 0:
-                row = response.data[0]
-                return {
-                    'strict_mode': bool(row['strict_mode']),
-                    'warning_message': row['warning_message'],
-                    'cooldown_time': row['cooldown_time'],
-                    'max_warnings': row['max_warnings']
-                }
-            return default_settings
-        except Exception as e:
-            print(f"[ERROR] Failed to load guild settings: {e}")
-            return default_settings
+    if str(guild_id) in _settings_cache:
+        cache_result('guild_settings', True)
+        return _settings_cache[str(guild_id)]
+    cache_result('guild_settings', False)
+    if (row := _local_row('guild_settings', str(guild_id))) is not None:
+        settings = _settings_cache[str(guild_id)] = _parse_settings_row(row)
+        _config_cache.pop(str(guild_id), None)
+        config_sync.request('guild_settings', str(guild_id))
+        return settings
 
+    def fetch() -> Dict:
+        with db_lock:
+            try:
+                row = backend.fetch_row('guild_settings', str(guild_id))
+                if row:
+                    _store_local('guild_settings', str(guild_id), row)
+                if not row:
+                    _mark_absent('guild_settings', str(guild_id))
+                settings = _parse_settings_row(row) if row else dict(DEFAULT_GUILD_SETTINGS)
+                _settings_cache[str(guild_id)] = settings
+                _config_cache.pop(str(guild_id), None)
+                return settings
+            except Exception as e:
+                print(f"[ERROR] Failed to load guild settings: {e}")
+                if (stale := _last_known_config.get(str(guild_id))) is not None:
+                    metrics.incr('config.served_stale')
+                    return {key: getattr(stale, key) for key in DEFAULT_GUILD_SETTINGS}
+                return dict(DEFAULT_GUILD_SETTINGS)
+
+    # Concurrent misses for the same guild share one backend fetch
+    return _flights['guild_settings'].do(str(guild_id), fetch)
+
+@instrumented('save_guild_settings')
 def save_guild_settings(guild_id: Union[int, str], settings: Dict) -> bool:
     """Save guild-specific settings"""
     with db_lock:
         try:
-            # Check if record exists
-            response = supabase_client.table('guild_settings').select('*').eq('guild_id', str(guild_id)).execute()
-            
             row_data = {
                 'guild_id': str(guild_id),
                 'strict_mode': int(settings.get('strict_mode', False)),
@@ -243,59 +565,363 @@ def save_guild_settings(guild_id: Union[int, str], settings: Dict) -> bool:
                 'cooldown_time': int(settings.get('cooldown_time', 60)),
                 'max_warnings': int(settings.get('max_warnings', 3))
             }
-            
-            if response.data and len(response.data) > 0:
-                # Update existing record
-                supabase_client.table('guild_settings').update(row_data).eq('guild_id', str(guild_id)).execute()
-            else:
-                # Insert new record
-                supabase_client.table('guild_settings').insert(row_data).execute()
-                
-            load_guild_settings.cache_clear()
+            backend.upsert_row('guild_settings', str(guild_id), row_data)
+            _settings_cache.pop(str(guild_id), None)
+            _config_cache.pop(str(guild_id), None)
+            _mark_present('guild_settings', str(guild_id))
+            _store_local('guild_settings', str(guild_id), row_data, merge=True)
+            _config_changed(str(guild_id))
             return True
         except Exception as e:
             print(f"[ERROR] Failed to save guild settings: {e}")
             return False
 
-# Add to database.py
-def load_logging_channel(guild_id: Union[int, str]) -> Optional[int]:
-    """Load the logging channel ID for a guild"""
+@instrumented('fetch_rows_for_guilds', guild_arg=None)
+def _fetch_rows_for_guilds(table: str, guild_ids: List[str]) -> List[Dict]:
+    """Fetch all rows of a table for the given guilds (paged by the backend).
+
+    swear_data rows come back with their words attached.
+    """
     with db_lock:
+        rows = backend.fetch_rows(table, guild_ids)
+        return _attach_swear_words(rows) if table == 'swear_data' else rows
+
+@instrumented('preload_guild_configs', guild_arg=None)
+def preload_guild_configs(guilds: Iterable[Union[object, int, str]]) -> Dict[str, float]:
+    """Fill the config caches for many guilds with a few paged queries.
+
+    Guilds without stored rows get default snapshots in the cache without being
+    written back; their rows are created on the first committed change.
+    Returns the seconds spent loading each table.
+    """
+    owners = {}
+    for guild in guilds:
+        guild_id = str(guild.id if hasattr(guild, 'id') else guild)
+        owners[guild_id] = getattr(guild, 'owner_id', None)
+    guild_ids = list(owners)
+    timings = {}
+
+    defaults = {
+        'swear_data': lambda guild_id: SwearData(),
+        'roles_data': lambda guild_id: RolesData(owner_id=owners[guild_id]),
+        'guild_settings': lambda guild_id: dict(DEFAULT_GUILD_SETTINGS)
+    }
+    for table, default in defaults.items():
+        started = time.perf_counter()
+        cache, parse = _TABLE_CACHES[table]
         try:
-            response = supabase_client.table('guild_settings').select('logging_channel').eq('guild_id', str(guild_id)).execute()
-            if response.data and len(response.data) > 0:
-                return int(response.data[0]['logging_channel']) if response.data[0]['logging_channel'] else None
-            return None
+            rows = _fetch_rows_for_guilds(table, guild_ids)
+            local_store.put_many(table, rows)
+            loaded = {row['guild_id']: parse(row) for row in rows}
+            for guild_id in guild_ids:
+                if guild_id not in loaded:
+                    _mark_absent(table, guild_id)
+                cache[guild_id] = loaded.get(guild_id) or default(guild_id)
+                _config_cache.pop(guild_id, None)
         except Exception as e:
-            print(f"[ERROR] Failed to load logging channel: {e}")
-            return None
+            # The backend is unavailable: start from the last known local config
+            print(f"[ERROR] Failed to preload {table}, using local copy: {e}")
+            for guild_id in guild_ids:
+                if (row := _local_row(table, guild_id)) is not None:
+                    cache[guild_id] = parse(row)
+                    _config_cache.pop(guild_id, None)
+        timings[table] = time.perf_counter() - started
+
+    return timings
+
+# Cache and row parser for each mirrored table
+_TABLE_CACHES = {
+    'swear_data': (_swear_cache, _parse_swear_row),
+    'roles_data': (_roles_cache, _parse_roles_row),
+    'guild_settings': (_settings_cache, _parse_settings_row)
+}
+
+# Called with (table, guild ID) when the background sync swaps in a row that
+# differs from the cached one, e.g. to rebuild the guild's compiled filter
+config_refresh_hooks: List[Callable[[str, str], None]] = []
+
+def _install_synced_row(table: str, row: Dict) -> None:
+    """Swap a freshly synced backend row into the memory cache"""
+    cache, parse = _TABLE_CACHES[table]
+    guild_id = str(row['guild_id'])
+    try:
+        fresh = parse(row)
+    except Exception as e:
+        print(f"[ERROR] Failed to parse synced {table} row: {e}")
+        return
+    changed = cache.get(guild_id) != fresh
+    cache[guild_id] = fresh
+    _config_cache.pop(guild_id, None)
+    _mark_present(table, guild_id)
+    if changed:
+        for hook in config_refresh_hooks:
+            try:
+                hook(table, guild_id)
+            except Exception as e:
+                print(f"[WARNING] Config refresh hook failed for {table}/{guild_id}: {e}")
+
+config_sync = ConfigSync(
+    local_store,
+    fetch_rows=_fetch_rows_for_guilds,
+    on_update=_install_synced_row,
+    interval=float(os.getenv('CONFIG_SYNC_INTERVAL', '300'))
+)
+
+def start_config_sync() -> None:
+    """Start the background backend -> local tier sync (idempotent)"""
+    if config_sync.ident is None:
+        config_sync.start()
+
+def _compose_config(guild_id: str, owner_id: Optional[int] = None) -> GuildConfig:
+    """Build a GuildConfig from the per-table caches; missing parts use defaults"""
+    settings = _settings_cache.get(guild_id) or DEFAULT_GUILD_SETTINGS
+    return GuildConfig(
+        swear=_swear_cache.get(guild_id) or SwearData(),
+        roles=_roles_cache.get(guild_id) or RolesData(owner_id=owner_id),
+        strict_mode=settings['strict_mode'],
+        warning_message=settings['warning_message'],
+        cooldown_time=settings['cooldown_time'],
+        max_warnings=settings['max_warnings'],
+        retention_days=settings['retention_days'],
+        logging_channel=settings['logging_channel']
+    )
+
+def _missing_config_tables(guild_id: str, owner_id: Optional[int]) -> List[str]:
+    """Fill a guild's config caches from the local tier; returns the tables still missing"""
+    missing = []
+    for table, (cache, parse) in _TABLE_CACHES.items():
+        if guild_id in cache:
+            continue
+        if (row := _local_row(table, guild_id)) is not None:
+            cache[guild_id] = parse(row)
+            config_sync.request(table, guild_id)
+        elif _known_absent(table, guild_id):
+            _install_config_default(table, guild_id, owner_id)
+        else:
+            missing.append(table)
+    return missing
+
+def _install_fetched_row(table: str, guild_id: str, row: Optional[Dict], owner_id: Optional[int]) -> None:
+    cache, parse = _TABLE_CACHES[table]
+    if row is not None:
+        cache[guild_id] = parse(row)
+        _store_local(table, guild_id, row)
+    else:
+        _mark_absent(table, guild_id)
+        _install_config_default(table, guild_id, owner_id)
 
+def _config_unavailable(guild_id: str, owner_id: Optional[int]) -> GuildConfig:
+    """Config to serve when the backend failed: the last known one, else uncached defaults"""
+    if (stale := _last_known_config.get(guild_id)) is not None:
+        metrics.incr('config.served_stale')
+        return stale
+    # Defaults are not cached, so the next read retries
+    return _compose_config(guild_id, owner_id)
+
+def _cache_config(guild_id: str, owner_id: Optional[int]) -> GuildConfig:
+    config = _config_cache[guild_id] = _last_known_config[guild_id] = _compose_config(guild_id, owner_id)
+    return config
+
+def cached_guild_config(guild_id: Union[int, str]) -> Optional[GuildConfig]:
+    """The cached GuildConfig for a guild, or None without loading anything"""
+    return _config_cache.get(str(guild_id))
+
+@instrumented('get_guild_config')
+def get_guild_config(guild: Union[object, int, str]) -> GuildConfig:
+    """Get a guild's complete config, reading at most once from the backend.
+
+    Parts missing from memory come from the local tier, and whatever is still
+    missing is fetched in a single backend query for all three tables.
+    """
+    guild_id = str(guild.id if hasattr(guild, 'id') else guild)
+    if (config := _config_cache.get(guild_id)) is not None:
+        cache_result('guild_config', True)
+        return config
+    cache_result('guild_config', False)
+
+    owner_id = getattr(guild, 'owner_id', None)
+
+    def fetch() -> GuildConfig:
+        if missing := _missing_config_tables(guild_id, owner_id):
+            with db_lock:
+                try:
+                    rows = backend.fetch_guild_config(guild_id)
+                    if rows.get('swear_data') is not None:
+                        rows['swear_data'] = _attach_swear_words([rows['swear_data']], rows.get('swear_words'))[0]
+                except Exception as e:
+                    print(f"[ERROR] Failed to load guild config: {e}")
+                    return _config_unavailable(guild_id, owner_id)
+            for table in missing:
+                _install_fetched_row(table, guild_id, rows.get(table), owner_id)
+        return _cache_config(guild_id, owner_id)
+
+    # Concurrent misses for the same guild share one backend fetch
+    return _flights['guild_config'].do(guild_id, fetch)
+
+@instrumented('get_guild_configs', guild_arg=None)
+def get_guild_configs(guilds: Iterable[Union[object, int, str]]) -> Dict[str, GuildConfig]:
+    """Get complete configs for many guilds with at most one query per table.
+
+    Used by the batching loader; guilds whose tables could not be fetched get
+    their last known config, as in get_guild_config.
+    """
+    owners = {}
+    for guild in guilds:
+        owners[str(guild.id if hasattr(guild, 'id') else guild)] = getattr(guild, 'owner_id', None)
+
+    configs = {}
+    missing_by_table: Dict[str, List[str]] = {}
+    for guild_id, owner_id in owners.items():
+        if (config := _config_cache.get(guild_id)) is not None:
+            cache_result('guild_config', True)
+            configs[guild_id] = config
+            continue
+        cache_result('guild_config', False)
+        for table in _missing_config_tables(guild_id, owner_id):
+            missing_by_table.setdefault(table, []).append(guild_id)
+
+    failed = set()
+    for table, guild_ids in missing_by_table.items():
+        try:
+            # fetch_rows pages the ids into `in` filters
+            rows = {str(row['guild_id']): row for row in _fetch_rows_for_guilds(table, guild_ids)}
+        except Exception as e:
+            print(f"[ERROR] Failed to load {table} for {len(guild_ids)} guilds: {e}")
+            failed.update(guild_ids)
+            continue
+        for guild_id in guild_ids:
+            _install_fetched_row(table, guild_id, rows.get(guild_id), owners[guild_id])
+
+    for guild_id, owner_id in owners.items():
+        if guild_id in configs:
+            continue
+        if guild_id in failed:
+            configs[guild_id] = _config_unavailable(guild_id, owner_id)
+        else:
+            configs[guild_id] = _cache_config(guild_id, owner_id)
+    return configs
+
+# Misses from the event loop within one tick share a single get_guild_configs call
+config_loader: BatchLoader = BatchLoader(
+    'guild_config', get_guild_configs,
+    key_fn=lambda guild: str(guild.id if hasattr(guild, 'id') else guild),
+    peek=cached_guild_config
+)
+
+async def get_guild_config_async(guild: Union[object, int, str]) -> GuildConfig:
+    """get_guild_config for the event loop: cache hits return at once, misses are batched off-loop"""
+    return await config_loader.load(guild)
+
+def storage_status() -> Dict:
+    """Backend name and circuit breaker state, for status commands and scripts"""
+    status = {'backend': backend.name, **backend.breaker.stats()}
+    status['degraded'] = status['state'] != 'closed'
+    return status
+
+def _install_config_default(table: str, guild_id: str, owner_id: Optional[int]) -> None:
+    if table == 'guild_settings':
+        # Settings rows are only written when a setting is changed
+        _settings_cache[guild_id] = dict(DEFAULT_GUILD_SETTINGS)
+    elif table == 'roles_data':
+        _install_default(table, guild_id, RolesData(owner_id=owner_id))
+    else:
+        _install_default(table, guild_id, SwearData())
+
+# Add to database.py
+def load_logging_channel(guild_id: Union[int, str]) -> Optional[int]:
+    """Load the logging channel ID for a guild (cached with its settings)"""
+    return load_guild_settings(guild_id).get('logging_channel')
+
+@instrumented('save_logging_channel')
 def save_logging_channel(guild_id: Union[int, str], channel_id: Optional[int]) -> bool:
     """Save the logging channel ID for a guild"""
     with db_lock:
         try:
-            # Check if record exists
-            response = supabase_client.table('guild_settings').select('*').eq('guild_id', str(guild_id)).execute()
-            
             row_data = {
                 'guild_id': str(guild_id),
                 'logging_channel': str(channel_id) if channel_id else None
             }
-            
-            if response.data and len(response.data) > 0:
-                # Update existing record
-                supabase_client.table('guild_settings').update(row_data).eq('guild_id', str(guild_id)).execute()
-            else:
-                # Insert new record
-                supabase_client.table('guild_settings').insert(row_data).execute()
-                
-            load_guild_settings.cache_clear()
+            backend.upsert_row('guild_settings', str(guild_id), row_data)
+            _settings_cache.pop(str(guild_id), None)
+            _config_cache.pop(str(guild_id), None)
+            _mark_present('guild_settings', str(guild_id))
+            _store_local('guild_settings', str(guild_id), row_data, merge=True)
+            _config_changed(str(guild_id))
             return True
         except Exception as e:
             print(f"[ERROR] Failed to save logging channel: {e}")
             return False
+
+def get_retention_days(guild_id: Union[int, str]) -> int:
+    """Days of raw logs kept for a guild; 0 keeps them forever"""
+    days = load_guild_settings(guild_id).get('retention_days')
+    return DEFAULT_RETENTION_DAYS if days is None else days
+
+@instrumented('save_retention_days')
+def save_retention_days(guild_id: Union[int, str], days: Optional[int]) -> bool:
+    """Save a guild's log retention; None falls back to LOG_RETENTION_DAYS"""
+    with db_lock:
+        try:
+            row_data = {
+                'guild_id': str(guild_id),
+                'retention_days': int(days) if days is not None else None
+            }
+            backend.upsert_row('guild_settings', str(guild_id), row_data)
+            _settings_cache.pop(str(guild_id), None)
+            _config_cache.pop(str(guild_id), None)
+            _mark_present('guild_settings', str(guild_id))
+            _store_local('guild_settings', str(guild_id), row_data, merge=True)
+            _config_changed(str(guild_id))
+            return True
+        except Exception as e:
+            print(f"[ERROR] Failed to save retention: {e}")
+            return False
 # Update in database.py
 
+@instrumented('load_rollup_rows')
+def _load_rollup_rows(guild_id: str) -> List[Dict]:
+    """Persisted rollups for a guild, backfilled from the raw logs the first time"""
+    with db_lock:
+        rows = backend.fetch_rollups(guild_id)
+        if rows:
+            return rows
+        # Only total, day and user counts can be rebuilt from the log aggregates
+        counts = backend.aggregate_logs(guild_id)
+        rows = [{'dimension': 'total', 'bucket': '', 'count': counts['total']}]
+        rows += [{'dimension': 'day', 'bucket': day, 'count': n} for day, n in counts['daily'].items()]
+        rows += [{'dimension': 'user', 'bucket': user, 'count': n} for user, n in counts['users'].items()]
+        if not counts['total']:
+            return rows
+        # Written only if the guild still has no rollups: a backfill racing this one
+        # (another process, or another thread loading the guild) must not add twice
+        if backend.seed_rollups(guild_id, [(r['dimension'], r['bucket'], r['count']) for r in rows]):
+            return rows
+        return backend.fetch_rollups(guild_id)
+
+@instrumented('flush_rollup_rows', guild_arg=None)
+def _flush_rollup_rows(rows: List) -> None:
+    with db_lock:
+        backend.increment_rollups(rows)
+
+# In-memory violation rollups answering analytics; raw logs are kept for audit
+rollups = RollupRegistry(load=_load_rollup_rows, flush=_flush_rollup_rows)
+rollup_flusher = RollupFlusher(rollups, interval=float(os.getenv('ROLLUP_FLUSH_INTERVAL', '60')))
+
+def start_rollup_flusher() -> None:
+    """Start periodic rollup flushing, with a final flush at exit (idempotent)"""
+    if rollup_flusher.ident is None:
+        rollup_flusher.start()
+        atexit.register(flush_rollups)
+
+def flush_rollups() -> int:
+    """Write pending rollup deltas now; returns rows written"""
+    try:
+        return rollups.flush()
+    except Exception as e:
+        print(f"[ERROR] Failed to flush rollups: {e}")
+        return 0
+
+@instrumented('log_violation')
 def log_violation(
     guild_id: int,
     user_id: int,
@@ -303,9 +929,16 @@ def log_violation(
     channel_id: int,
     message: str,
     timestamp: str,
-    discriminator: Optional[str] = None
+    discriminator: Optional[str] = None,
+    matched_word: Optional[str] = None
 ) -> bool:
     """Log a moderation violation to the database"""
+    try:
+        # Load (and backfill) the guild's rollup first, so a backfill never includes this entry
+        rollups.get(str(guild_id))
+    except Exception as e:
+        print(f"[ERROR] Failed to load rollups: {e}")
+
     with db_lock:
         try:
             # Prepare the data to insert
@@ -322,80 +955,154 @@ def log_violation(
             if discriminator:
                 log_data['discriminator'] = discriminator
                 
-            # Insert into Supabase
-            response = supabase_client.table('moderation_logs').insert(log_data).execute()
-            
-            # Check if the insert was successful
-            if hasattr(response, 'data') and response.data:
-                return True
-            return False
+            stored = backend.insert_log(log_data)
                 
         except Exception as e:
             print(f"[DB ERROR] Failed to log violation: {e}")
             return False
 
-def get_analytics(guild_id: int) -> AnalyticsResult:
-    """Generate graphical analytics data"""
-    with db_lock:
+    if stored:
+        # Analytics count only violations that were actually stored
         try:
-            # Get raw data
-            logs = supabase_client.table('moderation_logs') \
-                .select('*') \
-                .eq('guild_id', str(guild_id)) \
-                .execute().data
+            rollups.record(
+                str(guild_id), f"{username}#{discriminator}", str(channel_id),
+                word=matched_word, timestamp=datetime.fromisoformat(timestamp)
+            )
+        except Exception as e:
+            print(f"[ERROR] Failed to update rollups: {e}")
+    return stored
 
-            # 1. Total blocks count
-            total = len(logs)
+@instrumented('analytics_counts')
+def _analytics_counts(guild_id: int, since: Optional[datetime], until: Optional[datetime]) -> Dict:
+    if since is None and until is None:
+        # All-time figures come straight from the in-memory rollups
+        return rollups.summary(str(guild_id))
+    # Counts are aggregated by the store; no log rows are transferred
+    with db_lock:
+        counts = backend.aggregate_logs(
+            str(guild_id),
+            since=since.isoformat() if since else None,
+            until=until.isoformat() if until else None
+        )
+    counts['version'] = rollups.version(str(guild_id))
+    return counts
 
-            # 2. Daily blocks
-            daily = {}
-            for log in logs:
-                date = log['timestamp'][:10]  # YYYY-MM-DD
-                daily[date] = daily.get(date, 0) + 1
+def get_analytics(guild_id: int, since: Optional[datetime] = None,
+                  until: Optional[datetime] = None) -> AnalyticsResult:
+    """Generate graphical analytics data, optionally limited to [since, until)"""
+    try:
+        counts = _analytics_counts(guild_id, since, until)
+    except Exception as e:
+        print(f"[ERROR] Analytics generation failed: {e}")
+        return {
+            'total_blocks': 0,
+            'daily_blocks': {},
+            'user_block_pie': ""
+        }
+    try:
+        # Rendered on the chart pool and cached until the next violation
+        pie = chart_cache.user_pie(str(guild_id), counts['version'], counts['users'], query=(since, until)).result()
+    except Exception as e:
+        # The counts are still worth showing without the chart
+        print(f"[ERROR] Analytics chart rendering failed: {e}")
+        pie = ""
+    return {
+        'total_blocks': counts['total'],
+        'daily_blocks': counts['daily'],
+        'user_block_pie': pie
+    }
 
-            # 3. User-wise pie chart
-            user_counts = {}
-            for log in logs:
-                user = f"{log['username']}#{log['discriminator']}"
-                user_counts[user] = user_counts.get(user, 0) + 1
+async def get_analytics_async(guild_id: int, since: Optional[datetime] = None,
+                              until: Optional[datetime] = None) -> AnalyticsResult:
+    """get_analytics for the event loop: counts on a worker thread, chart awaited from the pool"""
+    try:
+        counts = await asyncio.to_thread(_analytics_counts, guild_id, since, until)
+    except Exception as e:
+        print(f"[ERROR] Analytics generation failed: {e}")
+        return {
+            'total_blocks': 0,
+            'daily_blocks': {},
+            'user_block_pie': ""
+        }
+    try:
+        pie = await chart_cache.user_pie_async(
+            str(guild_id), counts['version'], counts['users'], query=(since, until)
+        )
+    except Exception as e:
+        print(f"[ERROR] Analytics chart rendering failed: {e}")
+        pie = ""
+    return {
+        'total_blocks': counts['total'],
+        'daily_blocks': counts['daily'],
+        'user_block_pie': pie
+    }
 
+def encode_log_cursor(row: Dict) -> str:
+    """Opaque cursor pointing just past a log row"""
+    return base64.urlsafe_b64encode(json.dumps([row['timestamp'], row['id']]).encode()).decode()
 
-            
-            # Generate pie chart
-            plt.figure(figsize=(8, 6))
-            plt.pie(
-                user_counts.values(),
-                labels=user_counts.keys(),
-                autopct='%1.1f%%',
-                startangle=140
-            )
-            plt.title('Blocks by User')
-            buf = io.BytesIO()
-            plt.savefig(buf, format='png')
-            plt.close()
-            buf.seek(0)
-            pie_b64 = base64.b64encode(buf.read()).decode('utf-8')
-
-            return {
-                'total_blocks': total,
-                'daily_blocks': daily,
-                'user_block_pie': pie_b64
-            }
+def decode_log_cursor(cursor: str) -> Tuple[str, int]:
+    timestamp, log_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return timestamp, int(log_id)
 
-        except Exception as e:
-            print(f"[ERROR] Analytics generation failed: {e}")
-            return {
-                'total_blocks': 0,
-                'daily_blocks': {},
-                'user_block_pie': ""
-            }
-def get_violation_logs(guild_id: int, limit: int = 50) -> List[Dict]:
-    """Retrieve moderation logs"""
+def _log_filters(user_id: Optional[int], channel_id: Optional[int],
+                 since: Optional[datetime], until: Optional[datetime]) -> Dict:
+    return {
+        'user_id': str(user_id) if user_id is not None else None,
+        'channel_id': str(channel_id) if channel_id is not None else None,
+        'since': since.isoformat() if since else None,
+        'until': until.isoformat() if until else None
+    }
+
+@instrumented('get_violation_logs_page')
+def get_violation_logs_page(
+    guild_id: int,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    oldest_first: bool = False,
+    user_id: Optional[int] = None,
+    channel_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> Tuple[List[Dict], Optional[str]]:
+    """Retrieve one page of moderation logs and the cursor for the next (None at the end)"""
+    after = decode_log_cursor(cursor) if cursor else None
+    with db_lock:
+        rows = backend.fetch_logs(
+            str(guild_id), limit, after=after, ascending=oldest_first,
+            **_log_filters(user_id, channel_id, since, until)
+        )
+    next_cursor = encode_log_cursor(rows[-1]) if len(rows) == limit else None
+    return rows, next_cursor
+
+def get_violation_logs(guild_id: int, limit: int = 50, cursor: Optional[str] = None,
+                       **filters) -> List[Dict]:
+    """Retrieve moderation logs, newest first; see get_violation_logs_page for paging"""
+    try:
+        return get_violation_logs_page(guild_id, limit, cursor, **filters)[0]
+    except Exception as e:
+        print(f"[ERROR] Failed to get logs: {e}")
+        return []
+
+@instrumented('delete_violation_logs')
+def delete_violation_logs(guild_id: int, log_ids: List[int]) -> int:
+    """Delete log entries by id; returns how many were removed"""
     with db_lock:
         try:
-            response = supabase_client.table('moderation_logs').select('*').eq('guild_id', str(guild_id)).order('timestamp', desc=True).limit(limit).execute()
-            return response.data
+            return backend.delete_logs(str(guild_id), log_ids)
         except Exception as e:
-            print(f"[ERROR] Failed to get logs: {e}")
-            return []
+            print(f"[ERROR] Failed to delete logs: {e}")
+            return 0
+
+def iter_violation_logs(guild_id: int, page_size: int = 500, oldest_first: bool = True,
+                        **filters) -> Iterator[Dict]:
+    """Walk a guild's whole log history one page at a time, holding a single page in memory"""
+    cursor = None
+    while True:
+        rows, cursor = get_violation_logs_page(
+            guild_id, page_size, cursor, oldest_first=oldest_first, **filters
+        )
+        yield from rows
+        if cursor is None:
+            return
 
@@ -0,0 +1,200 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from metrics import metrics
+
+
+class GuildBacklogged(Exception):
+    """A guild's filter queue is full; the message was not queued."""
+
+
+class _GuildQueue:
+    __slots__ = ("jobs", "weight", "credit", "scheduled", "window_start", "spent", "throttled_until", "wait")
+
+    def __init__(self, weight: int):
+        self.jobs: Deque[Tuple[Callable[[], Any], asyncio.Future, float]] = deque()
+        self.weight = weight
+        self.credit = weight
+        self.scheduled = False  # In the ready queue or being served; never both, never twice
+        self.window_start = 0.0
+        self.spent = 0.0
+        self.throttled_until = 0.0
+        self.wait = 0.0  # moving average of queue wait, seconds
+
+
+class FilterScheduler:
+    """Fair scheduling of message filtering across guilds.
+
+    Each guild has its own queue, and ``workers`` tasks serve the guilds with
+    queued work in weighted round-robin order: a guild runs up to its weight
+    (default 1) of messages per turn, one at a time, so a guild's messages
+    stay in order and a flooded guild cannot hold more than one worker.
+    Checks are synchronous calls, so the CPU time measured around each one is
+    that guild's alone. A guild that uses more than ``budget`` seconds (times
+    its weight) within ``interval`` seconds is skipped until the interval
+    ends. Its queue keeps filling
+    meanwhile; past ``max_queue`` messages new ones are refused with
+    GuildBacklogged, and the caller must check them some other way rather
+    than let them through. Waits are recorded as ``filter_queue.wait_seconds``
+    and per-guild depth, wait and CPU use are available from ``stats``.
+
+    The workers are coroutines on the caller's event loop, not threads: the
+    budget limits how often a guild gets the loop, but each check still runs
+    to completion on it. One check against a very large word list stalls
+    every guild (and the gateway) while it runs; the guild then sits out the
+    rest of its interval.
+    """
+
+    def __init__(self, workers: int = 4, budget: float = 0.05, interval: float = 1.0, max_queue: int = 200,
+                 weights: Optional[Dict[int, int]] = None):
+        self.workers = workers
+        self.budget = budget
+        self.interval = interval
+        self.max_queue = max_queue
+        self.weights = weights or {}
+        self._guilds: Dict[int, _GuildQueue] = {}
+        self._ready: Deque[int] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def submit(self, guild_id: int, check: Callable[[], Any]) -> asyncio.Future:
+        """Queue a filter check (a synchronous call) for a guild; the future resolves to its result"""
+        if not self._tasks:
+            self._start()
+        queue = self._guilds.get(guild_id)
+        if queue is None:
+            queue = self._guilds[guild_id] = _GuildQueue(self.weights.get(guild_id, 1))
+        if len(queue.jobs) >= self.max_queue:
+            metrics.incr('filter_queue.rejected')
+            raise GuildBacklogged(f"guild {guild_id} has {len(queue.jobs)} messages waiting")
+        future = asyncio.get_running_loop().create_future()
+        queue.jobs.append((check, future, time.perf_counter()))
+        metrics.incr('filter_queue.submitted')
+        if time.monotonic() >= queue.throttled_until:
+            self._schedule(guild_id, queue)
+        return future
+
+    def _start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+
+    def _schedule(self, guild_id: int, queue: _GuildQueue, front: bool = False) -> None:
+        """Put a guild with queued work in rotation, unless it already is"""
+        if queue.scheduled or not queue.jobs:
+            return
+        queue.scheduled = True
+        if front:
+            self._ready.appendleft(guild_id)
+        else:
+            self._ready.append(guild_id)
+        self._wakeup.set()
+
+    def _release(self, guild_id: int) -> None:
+        """Put a throttled guild back in rotation once its interval has ended"""
+        queue = self._guilds.get(guild_id)
+        if queue is not None:
+            self._schedule(guild_id, queue)
+
+    async def _work(self) -> None:
+        while True:
+            if not self._ready:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            guild_id = self._ready.popleft()
+            queue = self._guilds[guild_id]
+            try:
+                self._serve(guild_id, queue)
+            except Exception as e:
+                # Never let a worker die; the guild is put back in rotation below
+                print(f"[ERROR] Filter worker failed serving guild {guild_id}: {e}")
+                queue.scheduled = False
+                self._schedule(guild_id, queue)
+            # Let gateway events and other tasks run between messages
+            await asyncio.sleep(0)
+
+    def _serve(self, guild_id: int, queue: _GuildQueue) -> None:
+        """Run one queued check for a guild, then decide when it runs next"""
+        if not queue.jobs:
+            queue.scheduled = False
+            return
+        check, future, queued_at = queue.jobs.popleft()
+        waited = time.perf_counter() - queued_at
+        metrics.observe('filter_queue.wait_seconds', waited)
+        queue.wait = waited if not queue.wait else 0.8 * queue.wait + 0.2 * waited
+        now = time.monotonic()
+        if now - queue.window_start >= self.interval:
+            queue.window_start, queue.spent = now, 0.0
+
+        if not future.done():  # Skip messages whose handler gave up waiting
+            started = time.thread_time()
+            try:
+                result = check()
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            finally:
+                queue.spent += time.thread_time() - started
+
+        queue.scheduled = False
+        if queue.spent >= self.budget * queue.weight:
+            # Over budget: sit out the rest of the interval; queued messages wait
+            queue.throttled_until = queue.window_start + self.interval
+            queue.credit = queue.weight
+            metrics.incr('filter_queue.throttled')
+            asyncio.get_running_loop().call_later(queue.throttled_until - time.monotonic(), self._release, guild_id)
+            return
+        queue.credit -= 1
+        if queue.credit > 0:
+            self._schedule(guild_id, queue, front=True)  # Rest of its turn
+        else:
+            queue.credit = queue.weight
+            self._schedule(guild_id, queue)
+
+    def stats(self, limit: int = 5) -> List[Dict]:
+        """The guilds with the deepest queues: depth, average wait and CPU use this interval"""
+        now = time.monotonic()
+        busiest = sorted(self._guilds.items(), key=lambda item: (len(item[1].jobs), item[1].wait), reverse=True)
+        return [
+            {
+                'guild_id': guild_id,
+                'depth': len(queue.jobs),
+                'wait': queue.wait,
+                'cpu': queue.spent if now - queue.window_start < self.interval else 0.0,
+                'throttled': now < queue.throttled_until,
+            }
+            for guild_id, queue in busiest[:limit]
+        ]
+
+    async def close(self) -> None:
+        """Stop the workers; messages still queued are not filtered"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for queue in self._guilds.values():
+            for _, future, _ in queue.jobs:
+                future.cancel()
+            queue.jobs.clear()
+
+
+def _parse_weights(value: str) -> Dict[int, int]:
+    """FILTER_GUILD_WEIGHTS format: ``guild_id:weight,guild_id:weight``"""
+    weights = {}
+    for pair in filter(None, (part.strip() for part in value.split(','))):
+        guild_id, _, weight = pair.partition(':')
+        weights[int(guild_id)] = max(1, int(weight or 1))
+    return weights
+
+
+filter_scheduler = FilterScheduler(
+    workers=int(os.getenv('FILTER_WORKERS', '4')),
+    budget=float(os.getenv('FILTER_CPU_BUDGET_MS', '50')) / 1000,
+    interval=float(os.getenv('FILTER_BUDGET_INTERVAL', '1')),
+    max_queue=int(os.getenv('FILTER_MAX_QUEUE', '200')),
+    weights=_parse_weights(os.getenv('FILTER_GUILD_WEIGHTS', ''))
+)
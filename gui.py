@@ -1,10 +1,11 @@
 import discord
 from discord import ui
 from typing import List, Dict, Optional, Set, Any, Tuple
-from database import get_roles_data, save_roles_data, get_swear_data, save_swear_data, load_logging_channel,save_logging_channel
+from database import get_roles_data, update_roles_data, get_swear_data, update_swear_data, load_logging_channel,save_logging_channel
 from swear_filter import SwearFilter, split_words
 import asyncio
-from shared import guild_filters 
+from shared import guild_filters
+from outbound import Dropped, Priority, outbound
 
 # Constants for UI consistency
 DEFAULT_TIMEOUT = 300  # 5 minutes
@@ -36,13 +37,13 @@ class GuildState:
         """Lazy-load the swear filter for this guild."""
         if not self.swear_filter:
             swear_data = get_swear_data(self.guild_id)
-            self.swear_filter = SwearFilter(swear_data["swear_words"])
+            self.swear_filter = SwearFilter(swear_data.swear_words)
         return self.swear_filter
     
     def refresh_filter(self) -> None:
         """Refresh the swear filter with latest data from the database."""
         swear_data = get_swear_data(self.guild_id)
-        self.swear_filter = SwearFilter(swear_data["swear_words"])
+        self.swear_filter = SwearFilter(swear_data.swear_words)
         
     async def cleanup_ephemeral(self):
         """Clean up ephemeral messages after a delay."""
@@ -52,7 +53,9 @@ class GuildState:
         
         for msg in messages_to_remove:
             try:
-                await msg.delete()
+                await outbound.run(('gui', self.guild_id), Priority.COSMETIC, msg.delete)
+            except Dropped:
+                pass  # Shed under load; ephemeral messages vanish on their own
             except (discord.NotFound, discord.HTTPException) as e:
                 print(f"Error deleting ephemeral message: {e}")
 
@@ -129,9 +132,9 @@ class SwearGuardGUI:
         
         embed.add_field(
             name="📊 Stats",
-            value=f"• Filtered Words: {len(swear_data['swear_words'])}\n"
-                 f"• Allowed Channels: {len(swear_data['allowed_channels'])}\n"
-                 f"• Immune Roles: {len(roles_data['immune_roles'])}",
+            value=f"• Filtered Words: {len(swear_data.swear_words)}\n"
+                 f"• Allowed Channels: {len(swear_data.allowed_channels)}\n"
+                 f"• Immune Roles: {len(roles_data.immune_roles)}",
             inline=False
         )
         
@@ -209,9 +212,9 @@ class DashboardView(BaseView):
         
         embed.add_field(
             name="📊 Stats",
-            value=f"• Filtered Words: {len(swear_data['swear_words'])}\n"
-                 f"• Allowed Channels: {len(swear_data['allowed_channels'])}\n"
-                 f"• Immune Roles: {len(roles_data['immune_roles'])}",
+            value=f"• Filtered Words: {len(swear_data.swear_words)}\n"
+                 f"• Allowed Channels: {len(swear_data.allowed_channels)}\n"
+                 f"• Immune Roles: {len(roles_data.immune_roles)}",
             inline=False
         )
         
@@ -296,7 +299,7 @@ class WordManagerView(BaseView):
 
     def _create_embed(self) -> discord.Embed:
         """Create the word management embed."""
-        words = self.swear_data["swear_words"]
+        words = sorted(self.swear_data.swear_words)
         
         # Apply search filter if exists
         if self.search_term:
@@ -364,21 +367,26 @@ class WordManagerView(BaseView):
         if modal.words.value:
             new_words = split_words(modal.words.value)
             self.swear_data = get_swear_data(self.guild.id)  # Refresh data
-            existing_words = set(self.swear_data["swear_words"])
-            words_to_add = [w for w in new_words if w not in existing_words]
+            words_to_add = [w for w in new_words if w not in self.swear_data.swear_words]
             
             if not words_to_add:
                 await self._send_ephemeral(interaction, "All words already in filter")
                 return
                 
-            self.swear_data["swear_words"].extend(words_to_add)
-            save_swear_data(self.guild.id, self.swear_data)
+            updated = update_swear_data(
+                self.guild.id, lambda d: d.replace(swear_words=d.swear_words | set(words_to_add)),
+                added_by=interaction.user.id
+            )
+            if updated is None:
+                await self._send_ephemeral(interaction, "❌ Failed to save words")
+                return
+            self.swear_data = updated
             
             # Update both GUI and main filter
             guild_state = self.gui_system.get_guild_state(self.guild.id)
             guild_state.refresh_filter()
             if self.guild.id in guild_filters:  # Update main filter if exists
-                guild_filters[self.guild.id] = SwearFilter(self.swear_data["swear_words"])
+                guild_filters[self.guild.id] = SwearFilter(self.swear_data.swear_words)
             
             self.embed = self._create_embed()
             await self.gui_system.update_message(interaction, self.embed, self)
@@ -401,7 +409,7 @@ class WordManagerView(BaseView):
     async def _next_page(self, interaction: discord.Interaction) -> None:
         """Handle next page button click."""
         await interaction.response.defer()
-        words = self.swear_data["swear_words"]
+        words = self.swear_data.swear_words
         if self.search_term:
             words = [w for w in words if self.search_term.lower() in w.lower()]
         max_page = (len(words) + ITEMS_PER_PAGE['words'] - 1) // ITEMS_PER_PAGE['words'] - 1
@@ -492,7 +500,7 @@ class RemoveOptionsView(BaseView):
 
     async def _select_from_list(self, interaction: discord.Interaction) -> None:
         """Handle select from list button click."""
-        if not self.swear_data["swear_words"]:
+        if not self.swear_data.swear_words:
             await self._send_ephemeral(interaction, "No words to remove - the filter list is empty!")
             return
             
@@ -502,7 +510,7 @@ class RemoveOptionsView(BaseView):
 
     async def _type_manually(self, interaction: discord.Interaction) -> None:
         """Handle type manually button click."""
-        if not self.swear_data["swear_words"]:
+        if not self.swear_data.swear_words:
             await self._send_ephemeral(interaction, "No words to remove - the filter list is empty!")
             return
             
@@ -511,18 +519,19 @@ class RemoveOptionsView(BaseView):
         await modal.wait()
         
         if modal.words_to_remove:
-            self.swear_data = get_swear_data(self.guild.id)
-            self.swear_data["swear_words"] = [
-                w for w in self.swear_data["swear_words"]
-                if w not in modal.words_to_remove
-            ]
-            save_swear_data(self.guild.id, self.swear_data)
+            updated = update_swear_data(
+                self.guild.id, lambda d: d.replace(swear_words=d.swear_words - set(modal.words_to_remove))
+            )
+            if updated is None:
+                await self._send_ephemeral(interaction, "❌ Failed to remove words")
+                return
+            self.swear_data = updated
             
             # Update both GUI and main filter
             guild_state = self.gui_system.get_guild_state(self.guild.id)
             guild_state.refresh_filter()
             if self.guild.id in guild_filters:
-                guild_filters[self.guild.id] = SwearFilter(self.swear_data["swear_words"])
+                guild_filters[self.guild.id] = SwearFilter(self.swear_data.swear_words)
             
             view = WordManagerView(self.guild, self.gui_system)
             await self.gui_system.update_message(interaction, view.embed, view)
@@ -551,7 +560,7 @@ class RemoveWordsModal(ui.Modal, title="Remove Words from Filter"):
         """Handle modal submission."""
         swear_data = get_swear_data(self.guild_id)
         input_words = split_words(self.words.value)
-        self.words_to_remove = [w for w in input_words if w in swear_data["swear_words"]]
+        self.words_to_remove = [w for w in input_words if w in swear_data.swear_words]
         await interaction.response.defer()
 
 class WordSelectionView(BaseView):
@@ -569,10 +578,10 @@ class WordSelectionView(BaseView):
             placeholder="Select words to remove...",
             options=[
                 discord.SelectOption(label=word, value=word)
-                for word in self.swear_data["swear_words"]
+                for word in sorted(self.swear_data.swear_words)
             ],
             min_values=1,
-            max_values=min(ITEMS_PER_PAGE['selection'], len(self.swear_data["swear_words"]))
+            max_values=min(ITEMS_PER_PAGE['selection'], len(self.swear_data.swear_words))
         )
         word_select.callback = self._on_word_select
         self.add_item(word_select)
@@ -624,18 +633,19 @@ class WordSelectionView(BaseView):
         
         await interaction.response.defer()
         
-        self.swear_data = get_swear_data(self.guild.id)
-        self.swear_data["swear_words"] = [
-            w for w in self.swear_data["swear_words"]
-            if w not in self.selected_words
-        ]
-        save_swear_data(self.guild.id, self.swear_data)
+        updated = update_swear_data(
+            self.guild.id, lambda d: d.replace(swear_words=d.swear_words - set(self.selected_words))
+        )
+        if updated is None:
+            await self._send_ephemeral(interaction, "❌ Failed to remove words")
+            return
+        self.swear_data = updated
         
         # Update both GUI and main filter
         guild_state = self.gui_system.get_guild_state(self.guild.id)
         guild_state.refresh_filter()
         if self.guild.id in guild_filters:
-            guild_filters[self.guild.id] = SwearFilter(self.swear_data["swear_words"])
+            guild_filters[self.guild.id] = SwearFilter(self.swear_data.swear_words)
         
         view = WordManagerView(self.guild, self.gui_system)
         await self.gui_system.update_message(interaction, view.embed, view)
@@ -683,12 +693,12 @@ class RoleManagerView(BaseView):
         
         allowed_roles = "\n".join(
             f"• {role_name}" 
-            for role_name in self.roles_data["allowed_roles"]
+            for role_name in sorted(self.roles_data.allowed_roles)
         ) or "None"
         
         immune_roles = "\n".join(
             f"• {role_name}" 
-            for role_name in self.roles_data["immune_roles"]
+            for role_name in sorted(self.roles_data.immune_roles)
         ) or "None"
         
         embed.add_field(
@@ -718,9 +728,14 @@ class RoleManagerView(BaseView):
         if not self.selected_role:
             return await self._send_ephemeral(interaction, "Please select a role first!")
         
-        if self.selected_role.name not in self.roles_data["allowed_roles"]:
-            self.roles_data["allowed_roles"].append(self.selected_role.name)
-            save_roles_data(self.guild.id, self.roles_data)
+        role_name = self.selected_role.name
+        if role_name not in self.roles_data.allowed_roles:
+            updated = update_roles_data(
+                self.guild, lambda d: d.replace(allowed_roles=d.allowed_roles | {role_name})
+            )
+            if updated is None:
+                return await self._send_ephemeral(interaction, "❌ Failed to save roles")
+            self.roles_data = updated
         
         self.embed = self._create_embed()
         await interaction.response.edit_message(embed=self.embed)
@@ -731,9 +746,14 @@ class RoleManagerView(BaseView):
         if not self.selected_role:
             return await self._send_ephemeral(interaction, "Please select a role first!")
         
-        if self.selected_role.name not in self.roles_data["immune_roles"]:
-            self.roles_data["immune_roles"].append(self.selected_role.name)
-            save_roles_data(self.guild.id, self.roles_data)
+        role_name = self.selected_role.name
+        if role_name not in self.roles_data.immune_roles:
+            updated = update_roles_data(
+                self.guild, lambda d: d.replace(immune_roles=d.immune_roles | {role_name})
+            )
+            if updated is None:
+                return await self._send_ephemeral(interaction, "❌ Failed to save roles")
+            self.roles_data = updated
         
         self.embed = self._create_embed()
         await interaction.response.edit_message(embed=self.embed)
@@ -744,16 +764,18 @@ class RoleManagerView(BaseView):
         if not self.selected_role:
             return await self._send_ephemeral(interaction, "Please select a role first!")
         
-        removed = False
-        if self.selected_role.name in self.roles_data["allowed_roles"]:
-            self.roles_data["allowed_roles"].remove(self.selected_role.name)
-            removed = True
-        if self.selected_role.name in self.roles_data["immune_roles"]:
-            self.roles_data["immune_roles"].remove(self.selected_role.name)
-            removed = True
+        role_name = self.selected_role.name
+        removed = (role_name in self.roles_data.allowed_roles or
+                   role_name in self.roles_data.immune_roles)
         
         if removed:
-            save_roles_data(self.guild.id, self.roles_data)
+            updated = update_roles_data(self.guild, lambda d: d.replace(
+                allowed_roles=d.allowed_roles - {role_name},
+                immune_roles=d.immune_roles - {role_name}
+            ))
+            if updated is None:
+                return await self._send_ephemeral(interaction, "❌ Failed to save roles")
+            self.roles_data = updated
             self.embed = self._create_embed()
             await interaction.response.edit_message(embed=self.embed)
             await self._send_ephemeral(interaction, f"Removed permissions from {self.selected_role.name}")
@@ -825,7 +847,7 @@ class ChannelSettingsView(BaseView):
         
         # Allowed channels section
         allowed_channels = []
-        for channel_id in self.swear_data["allowed_channels"]:
+        for channel_id in sorted(self.swear_data.allowed_channels):
             channel = self.guild.get_channel(channel_id)
             if channel:
                 allowed_channels.append(f"• {channel.mention}")
@@ -866,15 +888,16 @@ class ChannelSettingsView(BaseView):
         
         changes = 0
         for channel_id in self.selected_channels:
-            if channel_id in self.swear_data["allowed_channels"]:
-                self.swear_data["allowed_channels"].remove(channel_id)
-                changes -= 1
-            else:
-                self.swear_data["allowed_channels"].append(channel_id)
-                changes += 1
+            changes += -1 if channel_id in self.swear_data.allowed_channels else 1
         
         if changes != 0:
-            save_swear_data(self.guild.id, self.swear_data)
+            # Toggling is a symmetric difference against the committed snapshot
+            updated = update_swear_data(self.guild.id, lambda d: d.replace(
+                allowed_channels=d.allowed_channels ^ set(self.selected_channels)
+            ))
+            if updated is None:
+                return await self._send_ephemeral(interaction, "❌ Failed to save channel settings")
+            self.swear_data = updated
             self.embed = self._create_embed()
             await interaction.response.edit_message(embed=self.embed)
             action = "Allowed" if changes > 0 else "Blocked"
@@ -0,0 +1,132 @@
+"""Run the bot as several processes, each owning a range of shards.
+
+    python launcher.py
+
+SHARD_COUNT defaults to Discord's recommendation for the token and CLUSTERS
+(processes) to the number of cores. Each process gets its own local config
+cache and metrics file; cooldowns are shared through COOLDOWN_DB. A process
+that exits is restarted with backoff until the launcher is stopped.
+"""
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from cluster import shard_ranges
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+MAX_BACKOFF = 60.0
+
+
+def recommended_shards(token: str) -> int:
+    """Discord's recommended shard count for this bot"""
+    request = urllib.request.Request(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={"Authorization": f"Bot {token}", "User-Agent": "SwearBot launcher"}
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return int(json.load(response)["shards"])
+
+
+def suffixed(path: str, cluster_id: int) -> str:
+    """config_cache.db -> config_cache.2.db"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{cluster_id}{ext}"
+
+
+def cluster_env(cluster_id: int, cluster_count: int, shard_count: int) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        'SHARD_COUNT': str(shard_count),
+        'CLUSTER_ID': str(cluster_id),
+        'CLUSTER_COUNT': str(cluster_count),
+        # Per-process state must not be shared between clusters
+        'LOCAL_CONFIG_DB': suffixed(os.getenv('LOCAL_CONFIG_DB', 'config_cache.db'), cluster_id),
+        # Cooldowns are per user, so every cluster on the host shares them
+        'COOLDOWN_DB': os.getenv('COOLDOWN_DB', 'cooldowns.db'),
+    })
+    if os.getenv('METRICS_FILE'):
+        env['METRICS_FILE'] = suffixed(os.environ['METRICS_FILE'], cluster_id)
+    return env
+
+
+class Launcher:
+    """Starts one bot process per cluster and restarts any that exit."""
+
+    def __init__(self, shard_count: int, cluster_count: int):
+        self.shard_count = shard_count
+        self.cluster_count = cluster_count
+        self.ranges = shard_ranges(shard_count, cluster_count)
+        self._processes: List[Optional[subprocess.Popen]] = [None] * cluster_count
+        self._backoff = [1.0] * cluster_count
+        self._restart_at = [0.0] * cluster_count
+        self._started_at = [0.0] * cluster_count
+        self._stopping = False
+
+    def _spawn(self, cluster_id: int) -> None:
+        shards = self.ranges[cluster_id]
+        print(f"[INFO] Starting cluster {cluster_id} (shards {shards.start}-{shards.stop - 1} of {self.shard_count})")
+        self._processes[cluster_id] = subprocess.Popen(
+            [sys.executable, MAIN], env=cluster_env(cluster_id, self.cluster_count, self.shard_count),
+            start_new_session=True  # Signals reach it only through the launcher
+        )
+        self._started_at[cluster_id] = time.monotonic()
+
+    def stop(self, *_) -> None:
+        self._stopping = True
+
+    def run(self) -> None:
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        for cluster_id in range(self.cluster_count):
+            if self._stopping:
+                break
+            self._spawn(cluster_id)
+            if cluster_id + 1 < self.cluster_count:
+                # Discord allows one IDENTIFY per 5 seconds; discord.py paces the shards
+                # within a process, so stagger the processes as well
+                time.sleep(5 * len(self.ranges[cluster_id]))
+        while not self._stopping:
+            now = time.monotonic()
+            for cluster_id, process in enumerate(self._processes):
+                if process is not None and process.poll() is not None:
+                    if now - self._started_at[cluster_id] > MAX_BACKOFF:
+                        self._backoff[cluster_id] = 1.0  # It ran fine for a while; not a crash loop
+                    print(f"[WARNING] Cluster {cluster_id} exited with {process.returncode}; "
+                          f"restarting in {self._backoff[cluster_id]:.0f}s")
+                    self._processes[cluster_id] = None
+                    self._restart_at[cluster_id] = now + self._backoff[cluster_id]
+                    self._backoff[cluster_id] = min(self._backoff[cluster_id] * 2, MAX_BACKOFF)
+                elif process is None and now >= self._restart_at[cluster_id]:
+                    self._spawn(cluster_id)
+            time.sleep(1)
+        self._shutdown()
+
+    def _shutdown(self) -> None:
+        running = [process for process in self._processes if process is not None and process.poll() is None]
+        print(f"[INFO] Stopping {len(running)} clusters")
+        for process in running:
+            process.send_signal(signal.SIGINT)  # Lets each bot flush its buffers in close()
+        deadline = time.monotonic() + 30
+        for process in running:
+            try:
+                process.wait(timeout=max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    token = os.getenv('DISCORD_TOKEN')
+    if not token:
+        print("ERROR: No Discord token found in environment variables!")
+        sys.exit(1)
+    shard_count = int(os.getenv('SHARD_COUNT') or recommended_shards(token))
+    cluster_count = max(1, min(int(os.getenv('CLUSTERS') or os.cpu_count() or 1), shard_count))
+    Launcher(shard_count, cluster_count).run()
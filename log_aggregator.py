@@ -0,0 +1,193 @@
+import asyncio
+import functools
+import os
+from collections import Counter, OrderedDict, deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+import discord
+
+from metrics import metrics
+from outbound import Dropped, Priority, outbound
+
+# Discord accepts at most this many embeds per message
+MAX_EMBEDS = 10
+
+
+def violation_entry(message: discord.Message, now_utc: datetime) -> Dict:
+    """The parts of a filtered message the log needs, copied so the message can be released"""
+    return {
+        'author_id': message.author.id,
+        'author_name': message.author.name,
+        'author_mention': message.author.mention,
+        'channel_mention': message.channel.mention,
+        'content': message.content[:1000],
+        'timestamp': now_utc,
+    }
+
+
+def violation_embed(entry: Dict) -> discord.Embed:
+    embed = discord.Embed(
+        title="🚨 Filtered Message",
+        color=discord.Color.red(),
+        timestamp=entry['timestamp']
+    )
+    embed.add_field(name="User", value=f"{entry['author_mention']}\n({entry['author_name']})", inline=True)
+    embed.add_field(name="Channel", value=entry['channel_mention'], inline=True)
+    embed.add_field(name="Time", value=f"<t:{int(entry['timestamp'].timestamp())}:F>", inline=False)
+    embed.add_field(name="Message Content", value=f"```{entry['content']}```", inline=False)
+    embed.set_footer(text=f"User ID: {entry['author_id']}")
+    return embed
+
+
+def summary_embed(entries: List[Dict], dropped: int = 0) -> discord.Embed:
+    """One embed standing in for a burst of violations"""
+    total = len(entries) + dropped
+    first, last = entries[0]['timestamp'], entries[-1]['timestamp']
+    embed = discord.Embed(
+        title=f"🚨 {total} Filtered Messages",
+        description=f"Between <t:{int(first.timestamp())}:T> and <t:{int(last.timestamp())}:T>",
+        color=discord.Color.dark_red(),
+        timestamp=last
+    )
+    users = Counter(entry['author_mention'] for entry in entries)
+    channels = Counter(entry['channel_mention'] for entry in entries)
+    embed.add_field(
+        name="Top Users",
+        value="\n".join(f"{mention} — {count}" for mention, count in users.most_common(5)),
+        inline=True
+    )
+    embed.add_field(
+        name="Channels",
+        value="\n".join(f"{mention} — {count}" for mention, count in channels.most_common(5)),
+        inline=True
+    )
+    latest = "\n".join(
+        f"{entry['author_name']}: {entry['content'][:80].replace('`', '')}" for entry in entries[-5:]
+    )
+    embed.add_field(name="Latest Messages", value=f"```{latest[:1000]}```", inline=False)
+    if dropped:
+        embed.set_footer(text=f"{dropped} earlier messages were not kept in the log buffer")
+    return embed
+
+
+class LogAggregator:
+    """Batches violation embeds per guild before posting to its logging channel.
+
+    The first violation for a guild starts a ``window``-second timer. When it
+    fires, everything buffered is posted as one message: up to MAX_EMBEDS
+    individual embeds, or a single summary embed for larger bursts. Each
+    guild keeps at most ``max_buffer`` entries; older ones are dropped and
+    counted in the summary. With ``use_webhooks`` the log is posted through a
+    webhook in the logging channel (created on first use if the bot may manage
+    webhooks), which has its own rate limit; the channel itself is used
+    otherwise or if the webhook fails. Webhook lookups are cached for the
+    ``max_webhooks`` most recently used channels. ``close`` flushes every
+    buffer.
+    """
+
+    def __init__(self, window: float = 2.0, max_buffer: int = 500, use_webhooks: bool = False,
+                 webhook_name: str = "SwearGuard Logs", max_webhooks: int = 1000):
+        self.window = window
+        self.max_buffer = max_buffer
+        self.use_webhooks = use_webhooks
+        self.webhook_name = webhook_name
+        self.max_webhooks = max_webhooks
+        self._buffers: Dict[int, Deque[Dict]] = {}
+        self._dropped: Counter = Counter()
+        # Only guilds with buffered entries; dropped again when their buffer is flushed
+        self._targets: Dict[int, Tuple[discord.Guild, int]] = {}
+        self._timers: Dict[int, asyncio.Task] = {}
+        self._webhooks: OrderedDict = OrderedDict()
+
+    def add(self, guild: discord.Guild, logging_channel_id: Optional[int], entry: Dict) -> None:
+        """Buffer a violation for the guild's logging channel (no-op if it has none)"""
+        if not logging_channel_id:
+            return
+        buffer = self._buffers.get(guild.id)
+        if buffer is None:
+            buffer = self._buffers[guild.id] = deque(maxlen=self.max_buffer)
+        if len(buffer) == self.max_buffer:
+            self._dropped[guild.id] += 1
+            metrics.incr('log_embeds.dropped')
+        buffer.append(entry)
+        self._targets[guild.id] = (guild, logging_channel_id)
+        if guild.id not in self._timers:
+            self._timers[guild.id] = asyncio.ensure_future(self._flush_later(guild.id))
+
+    async def _flush_later(self, guild_id: int) -> None:
+        await asyncio.sleep(self.window)
+        self._timers.pop(guild_id, None)
+        await self.flush(guild_id)
+
+    async def flush(self, guild_id: int) -> None:
+        buffer = self._buffers.pop(guild_id, None)
+        dropped = self._dropped.pop(guild_id, 0)
+        target = self._targets.pop(guild_id, None)
+        if not buffer or target is None:
+            return
+        entries = list(buffer)
+        guild, channel_id = target
+        channel = guild.get_channel(channel_id)
+        if channel is None:
+            return
+
+        if len(entries) <= MAX_EMBEDS and not dropped:
+            embeds = [violation_embed(entry) for entry in entries]
+        else:
+            embeds = [summary_embed(entries, dropped)]
+            metrics.incr('log_embeds.summaries')
+        try:
+            await self._send(channel, embeds)
+            metrics.incr('log_embeds.messages')
+            metrics.incr('log_embeds.violations', len(entries) + dropped)
+        except discord.Forbidden:
+            print(f"Missing permissions to log to {channel.mention}")
+        except Dropped:
+            metrics.incr('log_embeds.shed')
+        except Exception as e:
+            metrics.incr('log_embeds.errors')
+            print(f"[WARNING] Failed to post {len(entries)} log entries for guild {guild_id}: {e}")
+
+    async def _send(self, channel: discord.TextChannel, embeds: List[discord.Embed]) -> None:
+        if self.use_webhooks and (webhook := await self._webhook(channel)) is not None:
+            try:
+                await outbound.run(('webhook', webhook.id), Priority.AUDIT, functools.partial(webhook.send, embeds=embeds))
+                return
+            except (discord.NotFound, discord.Forbidden):
+                # Deleted or no longer usable; fall back to the channel and look it up again next time
+                self._webhooks.pop(channel.id, None)
+        await outbound.run(channel.id, Priority.AUDIT, functools.partial(channel.send, embeds=embeds))
+
+    async def _webhook(self, channel: discord.TextChannel) -> Optional[discord.Webhook]:
+        """The bot's log webhook in this channel, created if missing; None if not permitted"""
+        if channel.id in self._webhooks:
+            self._webhooks.move_to_end(channel.id)
+            return self._webhooks[channel.id]
+        webhook = None
+        try:
+            if channel.permissions_for(channel.guild.me).manage_webhooks:
+                webhook = discord.utils.get(await channel.webhooks(), name=self.webhook_name)
+                if webhook is None:
+                    webhook = await channel.create_webhook(name=self.webhook_name)
+        except discord.HTTPException as e:
+            print(f"[WARNING] Could not set up log webhook in {channel.id}, using the channel: {e}")
+            webhook = None
+        self._webhooks[channel.id] = webhook
+        if len(self._webhooks) > self.max_webhooks:
+            self._webhooks.popitem(last=False)
+        return webhook
+
+    async def close(self) -> None:
+        """Cancel pending timers and flush every buffer now"""
+        for task in self._timers.values():
+            task.cancel()
+        self._timers.clear()
+        await asyncio.gather(*(self.flush(guild_id) for guild_id in list(self._buffers)))
+
+
+log_aggregator = LogAggregator(
+    window=float(os.getenv('LOG_BATCH_WINDOW', '2')),
+    max_buffer=int(os.getenv('LOG_BUFFER_SIZE', '500')),
+    use_webhooks=os.getenv('LOG_USE_WEBHOOKS', '').lower() in ('1', 'true', 'yes')
+)
@@ -0,0 +1,95 @@
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional
+
+from database import iter_violation_logs
+from storage import TABLE_COLUMNS
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+EXPORT_COLUMNS = TABLE_COLUMNS['moderation_logs']
+
+
+def export_chunks(rows: Iterable[Dict], fmt: str = 'csv', chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Encode log rows as CSV or JSON Lines, yielding ~``chunk_size`` byte chunks.
+
+    Only the current chunk is buffered, so memory stays constant however many
+    rows the iterable produces.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}', expected one of: {', '.join(EXPORT_FORMATS)}")
+    buf = io.StringIO()
+    if fmt == 'csv':
+        writer = csv.DictWriter(buf, fieldnames=EXPORT_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        def write(row: Dict) -> None:
+            buf.write(json.dumps({column: row.get(column) for column in EXPORT_COLUMNS}))
+            buf.write("\n")
+
+    for row in rows:
+        write(row)
+        if buf.tell() >= chunk_size:
+            yield buf.getvalue().encode('utf-8')
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode('utf-8')
+
+
+def export_violation_logs(guild_id: int, fmt: str = 'csv', **filters) -> Iterator[bytes]:
+    """Stream a guild's logs, oldest first; filters as for iter_violation_logs"""
+    return export_chunks(iter_violation_logs(guild_id, **filters), fmt)
+
+
+def write_export(out, guild_id: int, fmt: str = 'csv', max_bytes: Optional[int] = None, **filters) -> int:
+    """Write an export to a binary file object; returns the number of rows written.
+
+    Raises OverflowError once more than ``max_bytes`` would be written.
+    """
+    count = 0
+
+    def counted() -> Iterator[Dict]:
+        nonlocal count
+        for row in iter_violation_logs(guild_id, **filters):
+            count += 1
+            yield row
+
+    written = 0
+    for chunk in export_chunks(counted(), fmt):
+        written += len(chunk)
+        if max_bytes is not None and written > max_bytes:
+            raise OverflowError(f"Export is larger than {max_bytes} bytes")
+        out.write(chunk)
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export a guild's moderation logs")
+    parser.add_argument('guild_id', type=int)
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+    parser.add_argument('--user', type=int, help="Only this user ID")
+    parser.add_argument('--channel', type=int, help="Only this channel ID")
+    parser.add_argument('--since', type=datetime.fromisoformat, help="ISO-8601 start (inclusive)")
+    parser.add_argument('--until', type=datetime.fromisoformat, help="ISO-8601 end (exclusive)")
+    parser.add_argument('-o', '--output', help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        count = write_export(
+            out, args.guild_id, args.format, user_id=args.user, channel_id=args.channel,
+            since=args.since, until=args.until
+        )
+    finally:
+        if args.output:
+            out.close()
+    print(f"Exported {count} log entries", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
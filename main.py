@@ -3,10 +3,11 @@ import re
 import json
 import time
 import asyncio
+import tempfile
 import functools
 from threading import Thread
 
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 from datetime import datetime, timedelta,timezone
 
 import discord
@@ -19,25 +20,79 @@ import threading
 from gui import SwearGuardGUI
 from swear_filter import SwearFilter, split_words
 from shared import guild_filters
+from message_gate import gate_for, invalidate_gate
+from violations import ViolationPipeline, violation_pipeline
+from log_aggregator import log_aggregator, violation_entry
+from warning_coalescer import warning_coalescer
+from raid_mode import raid_guard
+from outbound import Priority, outbound
+from cooldowns import cooldowns
+from filter_scheduler import GuildBacklogged, filter_scheduler
+from cluster import cluster
+from log_export import write_export
+from retention import start_retention_job
+from metrics import cache_hit_ratios, metrics, start_metrics_dump, top_latencies
 from database import (
     get_roles_data,
     save_roles_data,
+    update_roles_data,
     get_swear_data,
     save_swear_data,
+    update_swear_data,
     load_swear_data,
     load_guild_settings,
+    get_guild_config_async,
+    preload_guild_configs,
+    start_config_sync,
+    start_rollup_flusher,
     log_violation,
-    load_logging_channel, 
-    save_logging_channel
+    save_logging_channel,
+    get_retention_days,
+    save_retention_days,
+    storage_status,
+    invalidate_config,
+    config_change_hooks,
+    config_refresh_hooks
 )
 
-command_cooldowns = {}  # user_id: last_command_time
-
-
 # Bot setup
 intents = discord.Intents.default()
 intents.message_content = True  # Enable access to message content
-bot = commands.Bot(command_prefix="!", intents=intents)
+
+class SwearBot(commands.AutoShardedBot):
+    async def close(self):
+        # Finish in-flight violations and post buffered log entries before disconnecting
+        await filter_scheduler.close()
+        await raid_guard.close()
+        await violation_pipeline.drain()
+        await log_aggregator.close()
+        await warning_coalescer.close()
+        cluster.close()
+        await super().close()
+
+# Under launcher.py each process runs its own range of shards; otherwise shards are picked automatically
+bot = SwearBot(command_prefix="!", intents=intents, shard_count=cluster.shard_count, shard_ids=cluster.shard_ids)
+
+def drop_remote_config(guild_id: Optional[str]) -> None:
+    """Another cluster changed this guild's config (or every guild's, for None); reload it on next use"""
+    invalidate_config(guild_id, remote=True)
+    if guild_id is None:
+        guild_filters.clear()
+        invalidate_gate()
+    else:
+        guild_filters.pop(int(guild_id), None)
+        invalidate_gate(int(guild_id))
+
+# Every committed config change (or flush) is broadcast to the other clusters
+config_change_hooks.append(cluster.publish_invalidation)
+
+def drop_synced_filter(table: str, guild_id: str) -> None:
+    """The background sync brought in a changed swear list; rebuild the filter on next use"""
+    if table == 'swear_data':
+        guild_filters.pop(int(guild_id), None)
+
+config_refresh_hooks.append(drop_synced_filter)
+
 gui_system = SwearGuardGUI(bot)
 app = Flask(__name__)
 @app.route("/")
@@ -55,77 +110,56 @@ def start_keep_alive():
 #####################################
 
 
-async def send_log_message(guild: discord.Guild, user: discord.Member, message: str, channel: discord.TextChannel):
-    """Send a formatted log message to the logging channel"""
-    logging_channel_id = load_logging_channel(guild.id)
-    if not logging_channel_id:
-        return
-    
-    logging_channel = guild.get_channel(logging_channel_id)
-    if not logging_channel:
-        return
-    
-    # Get current time in UTC
-    time_str = f"<t:{int(datetime.utcnow().timestamp())}:F>"
-    
-    embed = discord.Embed(
-        title="🚨 Filtered Message",
-        color=discord.Color.red(),
-        timestamp=datetime.utcnow()
+async def record_violation(message: discord.Message, matched_word: str, now_utc: datetime):
+    """Write the violation to the database (off the event loop)"""
+    await asyncio.to_thread(
+        log_violation,
+        guild_id=message.guild.id,
+        user_id=message.author.id,
+        username=message.author.name,
+        discriminator=getattr(message.author, 'discriminator', '0'),
+        message=message.content,
+        channel_id=message.channel.id,
+        timestamp=now_utc.isoformat(),
+        matched_word=matched_word
     )
-    
-    embed.add_field(name="User", value=f"{user.mention}\nID: {user.id}", inline=True)
-    embed.add_field(name="Channel", value=channel.mention, inline=True)
-    embed.add_field(name="Time", value=time_str, inline=False)
-    embed.add_field(name="Message Content", value=f"```{message}```", inline=False)
-    
+
+async def send_violation_embed(message: discord.Message, logging_channel_id: Optional[int], now_utc: datetime):
+    """Queue the filtered message for the guild's logging channel; posted in batches"""
+    log_aggregator.add(message.guild, logging_channel_id, violation_entry(message, now_utc))
+
+async def send_violation_warning(message: discord.Message, allowed_channels: Iterable[int]):
+    """Tell the author their message was filtered and where swearing is allowed.
+
+    Offenders in the same channel share one warning, edited as more arrive.
+    """
+    mentions = [f"<#{cid}>" for cid in allowed_channels if message.guild.get_channel(cid)]
     try:
-        await logging_channel.send(embed=embed)
+        await warning_coalescer.warn(message.channel, message.author, mentions)
     except discord.Forbidden:
-        print(f"Missing permissions to send messages in logging channel {logging_channel_id}")
-        
+        pass
 
 def cooldown(seconds: int):
-    """Professional embed-based cooldown with live countdown and auto-delete."""
+    """Per-command cooldown; blocked uses get one embed that counts down client-side."""
     def decorator(func):
+        command = func.__name__
+
         @functools.wraps(func)
         async def wrapper(interaction: discord.Interaction, *args, **kwargs):
-            user_id = interaction.user.id
-            now = datetime.now()
-            last_time = command_cooldowns.get(user_id)
-
-            if last_time:
-                elapsed = (now - last_time).total_seconds()
-                remaining = seconds - elapsed
-                if remaining > 0:
-                    remaining = int(remaining) + 1
-
-                    try:
-                        # Initial embed
-                        embed = discord.Embed(
-                            title="🚫 Cooldown",
-                            description=f"Please wait ` {remaining} ` seconds before using this command again.",
-                            color=discord.Color.from_str("#FF8C00")  # Soft but visible orange
-                        )
-                        embed.set_author(name="SwearFilter", icon_url=bot.user.avatar.url if bot.user.avatar else None)
-
-                        await interaction.response.send_message(embed=embed, ephemeral=True)
-                        message = await interaction.original_response()
-
-                        # Countdown loop
-                        for i in range(remaining - 1, 0, -1):
-                            await asyncio.sleep(1)
-                            embed.description = f"Please wait ` {i} ` seconds before using this command again."
-                            await message.edit(embed=embed)
-
-                        await asyncio.sleep(1)
-                        await message.delete()
-                    except Exception as e:
-                        print(f"Cooldown embed error: {e}")
-                    return
-
-            command_cooldowns[user_id] = now
-            return await func(interaction, *args, **kwargs)
+            expires_at = cooldowns.hit(command, interaction.user.id, seconds)
+            if expires_at is None:
+                return await func(interaction, *args, **kwargs)
+
+            try:
+                embed = discord.Embed(
+                    title="🚫 Cooldown",
+                    description=f"You can use this command again <t:{int(expires_at) + 1}:R>.",
+                    color=discord.Color.from_str("#FF8C00")  # Soft but visible orange
+                )
+                embed.set_author(name="SwearFilter", icon_url=bot.user.avatar.url if bot.user.avatar else None)
+                await interaction.response.send_message(embed=embed, ephemeral=True)
+            except Exception as e:
+                print(f"Cooldown embed error: {e}")
         return wrapper
     return decorator
 
@@ -141,7 +175,7 @@ async def has_permission(interaction: discord.Interaction) -> bool:
     
     # Check if user has any allowed roles
     user_role_ids = [str(r.id) for r in interaction.user.roles]
-    allowed_role_ids = [str(r.id) for r in interaction.guild.roles if r.name in roles_data["allowed_roles"]]
+    allowed_role_ids = [str(r.id) for r in interaction.guild.roles if r.name in roles_data.allowed_roles]
     
     return any(role_id in allowed_role_ids for role_id in user_role_ids)
 
@@ -168,101 +202,11 @@ async def set_logging_channel(interaction: discord.Interaction, channel: discord
     else:
         await interaction.followup.send("❌ Failed to set logging channel. Please try again.", ephemeral=True)
 
-@bot.event
-async def on_message(message):
-    if message.author.bot or not isinstance(message.channel, discord.TextChannel):
-        await bot.process_commands(message)
-        return 
-
-    try:
-        guild_id = message.guild.id
-
-        # Load config from Supabase
-        swear_data = get_swear_data(guild_id)
-        roles_data = get_roles_data(guild_id)
-
-        # Initialize filter if missing
-        if guild_id not in guild_filters:
-            guild_filters[guild_id] = SwearFilter(swear_data["swear_words"])
-
-        # Check if user is immune
-        immune_role_ids = [str(r.id) for r in message.guild.roles if r.name in roles_data["immune_roles"]]
-        user_role_ids = [str(r.id) for r in message.author.roles]
-        is_immune = any(role_id in immune_role_ids for role_id in user_role_ids)
-
-        # Skip check if immune or in allowed channel
-        if is_immune or message.channel.id in swear_data["allowed_channels"]:
-            await bot.process_commands(message)
-            return
-
-        # Check for swearing
-        contains_swear = await guild_filters[guild_id].contains_swear_word(message.content)
-
-        if contains_swear:
-            try:
-                await message.delete()
-                now_utc = datetime.now(timezone.utc)
-                # Log the violation with all required arguments
-                log_violation(
-                    guild_id=message.guild.id,
-                    user_id=message.author.id,
-                    username=message.author.name,
-                    timestamp=now_utc.isoformat(),
-                    discriminator=message.author.discriminator,
-                    message=message.content,
-                    channel_id=message.channel.id
-                )
-
-                # Send log message to logging channel
-                logging_channel_id = load_logging_channel(guild_id)
-                if logging_channel_id:
-                    logging_channel = message.guild.get_channel(logging_channel_id)
-                    if logging_channel:
-                        time_str = f"<t:{int(datetime.utcnow().timestamp())}:F>"
-                        embed = discord.Embed(
-                            title="🚨 Filtered Message",
-                            color=discord.Color.red(),
-                            timestamp=datetime.utcnow()
-                        )
-                        embed.add_field(name="User", value=f"{message.author.mention}\nID: {message.author.id}", inline=True)
-                        embed.add_field(name="Channel", value=message.channel.mention, inline=True)
-                        embed.add_field(name="Time", value=time_str, inline=False)
-                        embed.add_field(name="Message Content", value=f"```{message.content}```", inline=False)
-                        try:
-                            await logging_channel.send(embed=embed)
-                        except discord.Forbidden:
-                            print(f"Missing permissions to send messages in logging channel {logging_channel_id}")
-
-                # Build warning message
-                allowed_mentions = []
-                for channel_id in swear_data["allowed_channels"]:
-                    ch = message.guild.get_channel(channel_id)
-                    if ch:
-                        allowed_mentions.append(ch.mention)
-
-                warning = (
-                    f"{message.author.mention}, your message was filtered. "
-                    f"Swearing is only allowed in: {' '.join(allowed_mentions)}"
-                    if allowed_mentions else
-                    f"{message.author.mention}, your message was filtered. Swearing is not allowed here."
-                )
-
-                await message.channel.send(warning, delete_after=10)
-
-            except discord.Forbidden:
-                print("❌ Missing permission to delete or send message.")
-            except discord.NotFound:
-                print("❌ Message already deleted.")
-    except Exception as e:
-        print(f"💥 on_message error: {e}")
-
-    await bot.process_commands(message)
-    
 async def ensure_filter_initialized(guild_id: int):
     """Ensure the swear filter is initialized for a guild."""
     if guild_id not in guild_filters:
         swear_data = get_swear_data(guild_id)
-        guild_filters[guild_id] = SwearFilter(swear_data["swear_words"])
+        guild_filters[guild_id] = SwearFilter(swear_data.swear_words)
 
 #####################################
 # Role Management Commands
@@ -281,12 +225,13 @@ async def add_allowed_role(interaction: discord.Interaction, role: discord.Role)
     guild_id = interaction.guild.id
     roles_data = get_roles_data(guild_id)
     
-    if role.name in roles_data["allowed_roles"]:
+    if role.name in roles_data.allowed_roles:
         await interaction.followup.send(f"⚠️ {role.name} is already in the allowed roles list.", ephemeral=True)
         return
     
-    roles_data["allowed_roles"].append(role.name)
-    save_roles_data(guild_id, roles_data)
+    if update_roles_data(interaction.guild, lambda d: d.replace(allowed_roles=d.allowed_roles | {role.name})) is None:
+        await interaction.followup.send("❌ Failed to save roles. Please try again.", ephemeral=True)
+        return
     
     await interaction.followup.send(f"✅ {role.name} has been added to the allowed roles list.")
 
@@ -303,12 +248,13 @@ async def remove_allowed_role(interaction: discord.Interaction, role: discord.Ro
     guild_id = interaction.guild.id
     roles_data = get_roles_data(guild_id)
     
-    if role.name not in roles_data["allowed_roles"]:
+    if role.name not in roles_data.allowed_roles:
         await interaction.followup.send(f"⚠️ {role.name} is not in the allowed roles list.", ephemeral=True)
         return
     
-    roles_data["allowed_roles"].remove(role.name)
-    save_roles_data(guild_id, roles_data)
+    if update_roles_data(interaction.guild, lambda d: d.replace(allowed_roles=d.allowed_roles - {role.name})) is None:
+        await interaction.followup.send("❌ Failed to save roles. Please try again.", ephemeral=True)
+        return
     
     await interaction.followup.send(f"✅ {role.name} has been removed from the allowed roles list.")
 
@@ -325,12 +271,13 @@ async def add_immune_role(interaction: discord.Interaction, role: discord.Role):
     guild_id = interaction.guild.id
     roles_data = get_roles_data(guild_id)
     
-    if role.name in roles_data["immune_roles"]:
+    if role.name in roles_data.immune_roles:
         await interaction.followup.send(f"⚠️ {role.name} is already in the immune roles list.", ephemeral=True)
         return
     
-    roles_data["immune_roles"].append(role.name)
-    save_roles_data(guild_id, roles_data)
+    if update_roles_data(interaction.guild, lambda d: d.replace(immune_roles=d.immune_roles | {role.name})) is None:
+        await interaction.followup.send("❌ Failed to save roles. Please try again.", ephemeral=True)
+        return
     
     await interaction.followup.send(f"✅ {role.name} has been added to the immune roles list.")
 
@@ -347,12 +294,13 @@ async def remove_immune_role(interaction: discord.Interaction, role: discord.Rol
     guild_id = interaction.guild.id
     roles_data = get_roles_data(guild_id)
     
-    if role.name not in roles_data["immune_roles"]:
+    if role.name not in roles_data.immune_roles:
         await interaction.followup.send(f"⚠️ {role.name} is not in the immune roles list.", ephemeral=True)
         return
     
-    roles_data["immune_roles"].remove(role.name)
-    save_roles_data(guild_id, roles_data)
+    if update_roles_data(interaction.guild, lambda d: d.replace(immune_roles=d.immune_roles - {role.name})) is None:
+        await interaction.followup.send("❌ Failed to save roles. Please try again.", ephemeral=True)
+        return
     
     await interaction.followup.send(f"✅ {role.name} has been removed from the immune roles list.")
 
@@ -372,13 +320,13 @@ async def list_roles(interaction: discord.Interaction):
     
     embed.add_field(
         name="Allowed Roles (Can manage bot)",
-        value="\n".join(f"• {role}" for role in roles_data["allowed_roles"]) or "None",
+        value="\n".join(f"• {role}" for role in sorted(roles_data.allowed_roles)) or "None",
         inline=False
     )
     
     embed.add_field(
         name="Immune Roles (Bypass filter)",
-        value="\n".join(f"• {role}" for role in roles_data["immune_roles"]) or "None",
+        value="\n".join(f"• {role}" for role in sorted(roles_data.immune_roles)) or "None",
         inline=False
     )
     
@@ -402,23 +350,23 @@ async def add_swear(interaction: discord.Interaction, words: str):
         
         guild_id = interaction.guild.id
         swear_data = get_swear_data(guild_id)
-        
-        # Initialize with empty list if none exists
-        if not swear_data["swear_words"]:
-            swear_data["swear_words"] = []
 
         words_to_add = split_words(words)
-        added_words = [word for word in words_to_add if word not in swear_data["swear_words"]]
+        added_words = [word for word in words_to_add if word not in swear_data.swear_words]
         
         if not added_words:
             await interaction.followup.send("⚠️ All specified words are already in the filter.", ephemeral=True)
             return
         
-        swear_data["swear_words"].extend(added_words)
-        save_swear_data(guild_id, swear_data)
+        swear_data = update_swear_data(
+            guild_id, lambda d: d.replace(swear_words=d.swear_words | set(added_words)), added_by=interaction.user.id
+        )
+        if swear_data is None:
+            await interaction.followup.send("❌ Failed to save the swear word list. Please try again.", ephemeral=True)
+            return
         
         # Update filter immediately
-        guild_filters[guild_id] = SwearFilter(swear_data["swear_words"])
+        guild_filters[guild_id] = SwearFilter(swear_data.swear_words)
         
         await interaction.followup.send(f"✅ Added `{', '.join(added_words)}` to the swear word list.")
     except Exception as e:
@@ -441,16 +389,18 @@ async def remove_swear(interaction: discord.Interaction, words: str):
         swear_data = get_swear_data(guild_id)
         
         words_to_remove = split_words(words)
-        removed_words = [word for word in words_to_remove if word in swear_data["swear_words"]]
+        removed_words = [word for word in words_to_remove if word in swear_data.swear_words]
         
         if not removed_words:
             await interaction.followup.send("⚠️ No matching words found in the filter.", ephemeral=True)
             return
         
-        swear_data["swear_words"] = [word for word in swear_data["swear_words"] if word not in removed_words]
-        save_swear_data(guild_id, swear_data)
+        swear_data = update_swear_data(guild_id, lambda d: d.replace(swear_words=d.swear_words - set(removed_words)))
+        if swear_data is None:
+            await interaction.followup.send("❌ Failed to save the swear word list. Please try again.", ephemeral=True)
+            return
         
-        guild_filters[guild_id] = SwearFilter(swear_data["swear_words"])  # Update filter
+        guild_filters[guild_id] = SwearFilter(swear_data.swear_words)  # Update filter
         
         await interaction.followup.send(f"✅ Removed: `{', '.join(removed_words)}`")
     except Exception as e:
@@ -467,7 +417,7 @@ async def list_swears(interaction: discord.Interaction):
         guild_id = interaction.guild.id
         swear_data = get_swear_data(guild_id)
         
-        if not swear_data["swear_words"]:
+        if not swear_data.swear_words:
             await interaction.followup.send("ℹ️ The swear word list is currently empty.")
             return
             
@@ -519,7 +469,7 @@ async def list_swears(interaction: discord.Interaction):
                 embed.set_footer(text=f"Page {self.page+1}/{self.max_pages} • Use the buttons to navigate")
                 return embed
         
-        view = WordsView(sorted(swear_data["swear_words"]), interaction)
+        view = WordsView(sorted(swear_data.swear_words), interaction)
         await interaction.followup.send(embed=view.get_embed(), view=view)
     except Exception as e:
         print(f"Error in list_swears: {e}")
@@ -543,12 +493,13 @@ async def set_allowed_swear(interaction: discord.Interaction, channel: discord.T
         guild_id = interaction.guild.id
         swear_data = get_swear_data(guild_id)
         
-        if channel.id in swear_data["allowed_channels"]:
+        if channel.id in swear_data.allowed_channels:
             await interaction.followup.send(f"⚠️ Swearing is already allowed in {channel.mention}.", ephemeral=True)
             return
         
-        swear_data["allowed_channels"].append(channel.id)
-        save_swear_data(guild_id, swear_data)
+        if update_swear_data(guild_id, lambda d: d.replace(allowed_channels=d.allowed_channels | {channel.id})) is None:
+            await interaction.followup.send("❌ Failed to save channel settings. Please try again.", ephemeral=True)
+            return
         
         await interaction.followup.send(f"✅ Swearing is now allowed in {channel.mention}.")
     except Exception as e:
@@ -569,12 +520,13 @@ async def unset_allowed_swear(interaction: discord.Interaction, channel: discord
         guild_id = interaction.guild.id
         swear_data = get_swear_data(guild_id)
         
-        if channel.id not in swear_data["allowed_channels"]:
+        if channel.id not in swear_data.allowed_channels:
             await interaction.followup.send(f"⚠️ Swearing is not allowed in {channel.mention}.", ephemeral=True)
             return
         
-        swear_data["allowed_channels"].remove(channel.id)
-        save_swear_data(guild_id, swear_data)
+        if update_swear_data(guild_id, lambda d: d.replace(allowed_channels=d.allowed_channels - {channel.id})) is None:
+            await interaction.followup.send("❌ Failed to save channel settings. Please try again.", ephemeral=True)
+            return
         
         await interaction.followup.send(f"✅ Swearing is no longer allowed in {channel.mention}.")
     except Exception as e:
@@ -591,7 +543,7 @@ async def list_allowed(interaction: discord.Interaction):
         guild_id = interaction.guild.id
         swear_data = get_swear_data(guild_id)
         
-        channels = [f"<#{channel_id}>" for channel_id in swear_data["allowed_channels"]]
+        channels = [f"<#{channel_id}>" for channel_id in sorted(swear_data.allowed_channels)]
         embed = discord.Embed(
             title="📜 **Allowed Swear Channels** 📜",
             description="Here are the channels where swearing is allowed:",
@@ -607,6 +559,153 @@ async def list_allowed(interaction: discord.Interaction):
         print(f"Error in list_allowed: {e}")
         await interaction.followup.send(f"❌ An error occurred: {str(e)}", ephemeral=True)
 
+#####################################
+# Log Export and Retention Commands
+#####################################
+
+# Stay under Discord's attachment limit for servers without boosts
+EXPORT_MAX_BYTES = int(os.getenv('EXPORT_MAX_BYTES', str(8 * 1024 * 1024)))
+
+@bot.tree.command(name="exportlogs", description="Export moderation logs as a file")
+@app_commands.describe(
+    format="File format",
+    user="Only include this user",
+    channel="Only include this channel",
+    days="Only include the last N days"
+)
+@app_commands.choices(format=[
+    app_commands.Choice(name="CSV", value="csv"),
+    app_commands.Choice(name="JSON Lines", value="jsonl"),
+])
+@cooldown(10)
+async def export_logs(interaction: discord.Interaction, format: str = "csv",
+                      user: Optional[discord.User] = None,
+                      channel: Optional[discord.TextChannel] = None,
+                      days: Optional[app_commands.Range[int, 1, 3650]] = None):
+    """Stream the guild's moderation logs into a file attachment."""
+    await interaction.response.defer(ephemeral=True)
+
+    if not await has_permission(interaction):
+        await interaction.followup.send("❌ You do not have permission to use this command.", ephemeral=True)
+        return
+
+    since = datetime.now(timezone.utc) - timedelta(days=days) if days else None
+    # Spooled to disk past 1 MB, so large exports never sit in memory
+    out = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    try:
+        count = await asyncio.to_thread(
+            write_export, out, interaction.guild.id, format, EXPORT_MAX_BYTES,
+            user_id=user.id if user else None,
+            channel_id=channel.id if channel else None,
+            since=since
+        )
+        if not count:
+            await interaction.followup.send("ℹ️ No moderation logs match those filters.", ephemeral=True)
+            return
+        out.seek(0)
+        filename = f"moderation_logs_{interaction.guild.id}.{format}"
+        await interaction.followup.send(
+            "📄 Moderation log export:", file=discord.File(out, filename=filename), ephemeral=True
+        )
+    except OverflowError:
+        await interaction.followup.send(
+            "❌ The export is too large to attach. Narrow it with the user, channel or days options.",
+            ephemeral=True
+        )
+    except Exception as e:
+        print(f"Error in export_logs: {e}")
+        await interaction.followup.send(f"❌ An error occurred: {str(e)}", ephemeral=True)
+    finally:
+        out.close()
+
+@bot.tree.command(name="setretention", description="Set how many days moderation logs are kept")
+@app_commands.describe(days="Days to keep raw logs (0 keeps them forever, leave empty for the default)")
+@cooldown(3)
+async def set_retention(interaction: discord.Interaction,
+                        days: Optional[app_commands.Range[int, 0, 3650]] = None):
+    """Set the guild's log retention; older logs are archived and removed."""
+    await interaction.response.defer(ephemeral=True)
+
+    if not await has_permission(interaction):
+        await interaction.followup.send("❌ You do not have permission to use this command.", ephemeral=True)
+        return
+
+    guild_id = interaction.guild.id
+    if not await asyncio.to_thread(save_retention_days, guild_id, days):
+        await interaction.followup.send("❌ Failed to save retention. Please try again.", ephemeral=True)
+        return
+
+    effective = get_retention_days(guild_id)
+    if effective:
+        await interaction.followup.send(f"✅ Moderation logs older than {effective} days will be archived and removed.", ephemeral=True)
+    else:
+        await interaction.followup.send("✅ Moderation logs will be kept forever.", ephemeral=True)
+
+#####################################
+# Diagnostics Commands
+#####################################
+
+@bot.tree.command(name="dbstats", description="Show database latency, cache and health statistics")
+@cooldown(3)
+async def db_stats(interaction: discord.Interaction):
+    """Summarize the database metrics registry."""
+    await interaction.response.defer(ephemeral=True)
+
+    # The figures are process-wide and name other guilds, so guild admins may not see them
+    if not await bot.is_owner(interaction.user):
+        await interaction.followup.send("❌ Only the bot's owners can view these statistics.", ephemeral=True)
+        return
+
+    status = storage_status()
+    embed = discord.Embed(
+        title="📊 Database Statistics",
+        description=f"Backend `{status['backend']}` · circuit **{status['state']}**",
+        color=discord.Color.orange() if status['degraded'] else discord.Color.green()
+    )
+    latencies = "\n".join(
+        f"`{row['name']}` {row['count']}× avg {row['avg'] * 1000:.1f}ms p95 ≤{row['p95'] * 1000:.0f}ms"
+        for row in top_latencies(limit=8)
+    )
+    embed.add_field(name="Slowest Calls (total time)", value=latencies or "No calls yet", inline=False)
+    ratios = "\n".join(f"`{name}` {ratio:.1%}" for name, ratio in cache_hit_ratios().items())
+    embed.add_field(name="Cache Hit Ratio", value=ratios or "No lookups yet", inline=True)
+    lock_wait = metrics.snapshot()['histograms'].get('db_lock.wait_seconds')
+    if lock_wait:
+        embed.add_field(
+            name="db_lock Wait",
+            value=f"avg {lock_wait['avg'] * 1000:.2f}ms, max {lock_wait['max'] * 1000:.0f}ms",
+            inline=True
+        )
+    queued = outbound.queue_depths()
+    histograms = metrics.snapshot()['histograms']
+    embed.add_field(
+        name="Outbound Queue",
+        value="\n".join(
+            f"`{name}` {depth} queued, p95 wait ≤{histograms.get(f'outbound.{name}.queue_seconds', {}).get('p95', 0) * 1000:.0f}ms"
+            for name, depth in queued.items()
+        ),
+        inline=False
+    )
+    busiest = filter_scheduler.stats()
+    if busiest:
+        embed.add_field(
+            name="Filter Queues",
+            value="\n".join(
+                f"`{row['guild_id']}` {row['depth']} queued, avg wait {row['wait'] * 1000:.1f}ms, "
+                f"CPU {row['cpu'] * 1000:.0f}ms{' (throttled)' if row['throttled'] else ''}"
+                for row in busiest
+            ),
+            inline=False
+        )
+    slow = list(metrics.slow_queries)[-5:]
+    if slow:
+        embed.add_field(
+            name="Recent Slow Queries",
+            value="\n".join(f"`{entry['function']}` guild {entry['guild_id']}: {entry['ms']}ms" for entry in slow),
+            inline=False
+        )
+    await interaction.followup.send(embed=embed, ephemeral=True)
+
 #####################################
 # Testing and Help Commands
 #####################################
@@ -822,132 +921,137 @@ async def on_message(message):
         await bot.process_commands(message)
         return
 
+    received = time.perf_counter()
     try:
         guild_id = message.guild.id
-        swear_data = get_swear_data(guild_id)
-        roles_data = get_roles_data(guild_id)
+        # Swear list, roles, settings and logging channel from one cached record
+        config = await get_guild_config_async(message.guild)
 
         # Initialize filter if needed
         if guild_id not in guild_filters:
-            guild_filters[guild_id] = SwearFilter(swear_data["swear_words"])
+            guild_filters[guild_id] = SwearFilter(config.swear_words)
 
-        # Check immunity
-        immune_roles = [r.name for r in message.guild.roles if r.name in roles_data["immune_roles"]]
-        is_immune = any(role.name in immune_roles for role in message.author.roles)
-
-        # Skip if immune or in allowed channel
-        if is_immune or message.channel.id in swear_data["allowed_channels"]:
+        # Skip if immune or in allowed channel (precompiled per guild)
+        if gate_for(message.guild, config).bypasses(message):
             await bot.process_commands(message)
             return
 
-        # Check for swear words
-        if await guild_filters[guild_id].contains_swear_word(message.content):
-            try:
-                await message.delete()
-                
-                # Get current time in UTC
-                now_utc = datetime.now(timezone.utc)
-                timestamp_str = now_utc.isoformat()
-                discord_time = f"<t:{int(now_utc.timestamp())}:F>"
-                
-                # Log to database
-                log_violation(
-                    guild_id=guild_id,
-                    user_id=message.author.id,
-                    username=message.author.name,
-                    discriminator=getattr(message.author, 'discriminator', '0'),
-                    message=message.content,
-                    channel_id=message.channel.id,
-                    timestamp=timestamp_str
-                )
-
-                # Send to logging channel
-                if logging_channel_id := load_logging_channel(guild_id):
-                    if logging_channel := message.guild.get_channel(logging_channel_id):
-                        embed = discord.Embed(
-                            title="🚨 Filtered Message",
-                            color=discord.Color.red(),
-                            timestamp=now_utc
-                        )
-                        embed.add_field(
-                            name="User", 
-                            value=f"{message.author.mention}\n({message.author.name})",
-                            inline=True
-                        )
-                        embed.add_field(
-                            name="Channel", 
-                            value=message.channel.mention,
-                            inline=True
-                        )
-                        embed.add_field(
-                            name="Time", 
-                            value=discord_time, 
-                            inline=False
-                        )
-                        embed.add_field(
-                            name="Message Content", 
-                            value=f"```{message.content[:1000]}```", 
-                            inline=False
-                        )
-                        embed.set_footer(text=f"User ID: {message.author.id}")
-                        
-                        try:
-                            await logging_channel.send(embed=embed)
-                        except discord.Forbidden:
-                            print(f"Missing permissions to log to {logging_channel.mention}")
-
-                # Send warning message
-                allowed_channels = [
-                    f"<#{cid}>" for cid in swear_data["allowed_channels"]
-                    if message.guild.get_channel(cid)
-                ]
-                warning = (
-                    f"{message.author.mention}, your message was filtered. "
-                    f"Swearing is only allowed in: {' '.join(allowed_channels)}"
-                    if allowed_channels else
-                    f"{message.author.mention}, your message was filtered. Swearing is not allowed here."
-                )
-                
-                
+        # Check for swear words, queued fairly against other guilds' messages
+        checked = time.perf_counter()
+        check = functools.partial(raid_guard.verdict, message, guild_filters[guild_id])
+        try:
+            matched_word = await filter_scheduler.submit(guild_id, check)
+        except GuildBacklogged:
+            # Never let a flood past moderation: once the guild's queue is full, check inline
+            metrics.incr('filter_queue.inline')
+            matched_word = check()
+        if matched_word:
+            ViolationPipeline.record('detect', checked)
+            now_utc = datetime.now(timezone.utc)
+            if raid_guard.record_violation(message, config.logging_channel):
+                # Raid mode: deleted in bulk and summarized once; only the database record is kept per message
+                violation_pipeline.submit(received, {
+                    'log': lambda: record_violation(message, matched_word, now_utc),
+                })
+            else:
+                # Only the delete is awaited here; everything else runs in the background
+                deleted = time.perf_counter()
                 try:
-                    await message.channel.send(warning, delete_after=10)
+                    await outbound.run(message.channel.id, Priority.DELETE, message.delete)
+                except discord.NotFound:
+                    pass  # Message already deleted
                 except discord.Forbidden:
-                    pass
-
-            except discord.NotFound:
-                pass  # Message already deleted
-            except discord.Forbidden:
-                print(f"Missing permissions in {message.channel.name}")
+                    print(f"Missing permissions in {message.channel.name}")
+                else:
+                    ViolationPipeline.record('delete', deleted)
+                    violation_pipeline.submit(received, {
+                        'log': lambda: record_violation(message, matched_word, now_utc),
+                        'audit': lambda: send_violation_embed(message, config.logging_channel, now_utc),
+                        'warning': lambda: send_violation_warning(message, config.allowed_channels),
+                    })
 
     except Exception as e:
         print(f"Error processing message: {e}")
 
     # Fix for the TypeError - removed accidental @ symbol
     await bot.process_commands(message)
+
+async def build_guild_filters(guild_ids: List[int], chunk_size: int = 50) -> None:
+    """Compile swear filters for many guilds on worker threads, a chunk at a time."""
+    def build_chunk(chunk: List[int]) -> Dict[int, SwearFilter]:
+        return {guild_id: SwearFilter(get_swear_data(guild_id).swear_words) for guild_id in chunk}
+
+    chunks = [guild_ids[i:i + chunk_size] for i in range(0, len(guild_ids), chunk_size)]
+    for built in await asyncio.gather(*(asyncio.to_thread(build_chunk, chunk) for chunk in chunks)):
+        guild_filters.update(built)
+
+@bot.event
 async def on_ready():
     print(f"Logged in as {bot.user}")
-    print(f"Bot is in {len(bot.guilds)} guilds")
-    
-    
-    # Initialize filters for all guilds
-    for guild in bot.guilds:
-        guild_id = guild.id
-        swear_data = get_swear_data(guild_id)
-        print(f"Initializing filter for {guild.name} with words: {swear_data['swear_words']}")
-        guild_filters[guild_id] = SwearFilter(swear_data["swear_words"])
+    print(f"Bot is in {len(bot.guilds)} guilds" + (
+        f" (cluster {cluster.cluster_id}, shards {cluster.shard_ids[0]}-{cluster.shard_ids[-1]} of {cluster.shard_count})"
+        if cluster.sharded else ""
+    ))
     
-    try:
-        synced = await bot.tree.sync()
-        print(f"✅ Synced {len(synced)} slash commands successfully!")
-    except Exception as e:
-        print(f"❌ Error syncing commands: {e}")
+    # Bulk-load config for every guild, then compile their filters
+    started = time.perf_counter()
+    table_timings = await asyncio.to_thread(preload_guild_configs, bot.guilds)
+    loaded_at = time.perf_counter()
+    await build_guild_filters([guild.id for guild in bot.guilds])
+    compiled_at = time.perf_counter()
+    start_config_sync()
+    start_rollup_flusher()
+    start_retention_job(lambda: [guild.id for guild in bot.guilds])
+    start_metrics_dump()
+    await cluster.listen(drop_remote_config)
+
+    # Commands are global, so one cluster syncing them is enough
+    if cluster.cluster_id == 0:
+        try:
+            synced = await bot.tree.sync()
+            print(f"✅ Synced {len(synced)} slash commands successfully!")
+        except Exception as e:
+            print(f"❌ Error syncing commands: {e}")
+    synced_at = time.perf_counter()
+
+    tables = ", ".join(f"{table} {seconds:.2f}s" for table, seconds in table_timings.items())
+    print(
+        f"⏱️ Startup: config preload {loaded_at - started:.2f}s ({tables}), "
+        f"filter compile {compiled_at - loaded_at:.2f}s, "
+        f"command sync {synced_at - compiled_at:.2f}s"
+    )
+
+@bot.event
+async def on_guild_role_create(role: discord.Role):
+    # A new role may carry an immune role's name
+    invalidate_gate(role.guild.id)
+
+@bot.event
+async def on_guild_role_update(before: discord.Role, after: discord.Role):
+    if before.name == after.name:
+        return
+    invalidate_gate(after.guild.id)
+    # Management and immune roles are stored by name; follow the rename so the role keeps both
+    def rename(data):
+        renamed = {
+            field: (names - {before.name}) | {after.name}
+            for field, names in (('allowed_roles', data.allowed_roles), ('immune_roles', data.immune_roles))
+            if before.name in names
+        }
+        return data.replace(**renamed) if renamed else data
+    if await asyncio.to_thread(update_roles_data, after.guild, rename) is None:
+        print(f"[WARNING] Failed to carry permissions over to renamed role {after.name} in {after.guild.id}")
+
+@bot.event
+async def on_guild_role_delete(role: discord.Role):
+    invalidate_gate(role.guild.id)
 
 @bot.event
 async def on_guild_join(guild):
     """Initialize filter and send DM setup guide to the owner."""
     guild_id = guild.id
     swear_data = get_swear_data(guild_id)
-    guild_filters[guild_id] = SwearFilter(swear_data["swear_words"])
+    guild_filters[guild_id] = SwearFilter(swear_data.swear_words)
     print(f"✅ Joined {guild.name} — initialized filter.")
 
     try:
@@ -1120,7 +1224,8 @@ async def on_application_command_error(interaction: discord.Interaction, error:
 # Run the bot
 if __name__ == "__main__":
     load_dotenv()  # Loads the .env file
-    start_keep_alive() 
+    if cluster.cluster_id == 0:
+        start_keep_alive()
     token = os.getenv('DISCORD_TOKEN')
     if not token:
         print("ERROR: No Discord token found in environment variables!")
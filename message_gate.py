@@ -0,0 +1,50 @@
+from typing import FrozenSet, Iterable, Optional
+
+from models import GuildConfig
+from shared import guild_gates
+
+
+class MessageGate:
+    """Per-guild precompiled check for messages that skip the swear filter.
+
+    Immune roles are stored by name; they are resolved to role IDs once, when
+    the gate is compiled, so checking a message is a channel lookup and a
+    handful of role-ID lookups instead of a scan over every role of the guild.
+    A gate remembers the GuildConfig it was built from and is recompiled when
+    that snapshot is replaced or the guild's roles change.
+    """
+    __slots__ = ("config", "immune_role_ids", "allowed_channel_ids")
+
+    def __init__(self, config: GuildConfig, immune_role_ids: Iterable[int] = ()):
+        self.config = config
+        self.immune_role_ids: FrozenSet[int] = frozenset(immune_role_ids)
+        self.allowed_channel_ids: FrozenSet[int] = config.allowed_channels
+
+    @classmethod
+    def compile(cls, guild, config: GuildConfig) -> "MessageGate":
+        names = config.immune_roles
+        return cls(config, (role.id for role in guild.roles if role.name in names) if names else ())
+
+    def bypasses(self, message) -> bool:
+        """Whether the message is in an allowed channel or from a member with an immune role"""
+        if message.channel.id in self.allowed_channel_ids:
+            return True
+        # Member.get_role is a lookup in the member's sorted role IDs
+        get_role = getattr(message.author, 'get_role', None)
+        return get_role is not None and any(get_role(role_id) for role_id in self.immune_role_ids)
+
+
+def gate_for(guild, config: GuildConfig) -> MessageGate:
+    """The guild's gate, compiled again only if its config snapshot changed"""
+    gate = guild_gates.get(guild.id)
+    if gate is None or gate.config is not config:
+        gate = guild_gates[guild.id] = MessageGate.compile(guild, config)
+    return gate
+
+
+def invalidate_gate(guild_id: Optional[int] = None) -> None:
+    """Drop the compiled gate for one guild (e.g. after a role change), or for every guild"""
+    if guild_id is None:
+        guild_gates.clear()
+    else:
+        guild_gates.pop(guild_id, None)
@@ -0,0 +1,277 @@
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from contextlib import contextmanager
+from threading import Lock
+from typing import Callable, Dict, List, Optional
+
+# Upper bounds of histogram buckets, in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Calls slower than this (in milliseconds) are written to the slow-query log
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '250'))
+
+
+class Histogram:
+    """Fixed-bucket histogram; percentiles are reported as bucket upper bounds."""
+    __slots__ = ('buckets', 'counts', 'count', 'total', 'max')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict:
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'avg': self.total / self.count if self.count else 0.0,
+            'max': self.max,
+            'p50': self.percentile(0.50),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+        }
+
+
+class Metrics:
+    """Process-wide counters, latency histograms and a slow-query log.
+
+    Safe to update from any thread. The bot and scripts read it through
+    ``snapshot()``; with METRICS_FILE set, ``start_metrics_dump`` also writes
+    it to disk periodically for other processes.
+    """
+
+    def __init__(self, slow_log_size: int = 200):
+        self._lock = Lock()
+        self._counters: Counter = Counter()
+        self._histograms: Dict[str, Histogram] = {}
+        self.slow_queries: deque = deque(maxlen=slow_log_size)
+
+    def incr(self, name: str, count: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += count
+
+    def get(self, name: str) -> int:
+        with self._lock:
+            return self._counters[name]
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(value)
+
+    def record_slow(self, entry: Dict) -> None:
+        with self._lock:
+            self.slow_queries.append(entry)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'counters': dict(self._counters),
+                'histograms': {name: h.snapshot() for name, h in self._histograms.items()},
+                'slow_queries': list(self.slow_queries),
+            }
+
+    def write_json(self, path: str) -> None:
+        """Write a snapshot atomically so readers never see a partial file"""
+        with open(path + ".tmp", 'w') as f:
+            json.dump({'written_at': time.time(), **self.snapshot()}, f)
+        os.replace(path + ".tmp", path)
+
+
+metrics = Metrics()
+
+# Per-thread totals for the instrumented call currently running
+_context = threading.local()
+
+
+def _add_to_context(key: str, value: float) -> None:
+    current = getattr(_context, 'current', None)
+    if current is not None:
+        current[key] += value
+
+
+def record_request(name: str, seconds: float, payload_bytes: int) -> None:
+    """Account one storage request (time on the wire and bytes moved)"""
+    metrics.incr(f'{name}.calls')
+    metrics.observe(f'{name}.seconds', seconds)
+    metrics.incr(f'{name}.bytes', payload_bytes)
+    _add_to_context('request', seconds)
+    _add_to_context('bytes', payload_bytes)
+
+
+class TimedLock:
+    """Lock that records how long callers wait for it and how long it is held."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = Lock()
+        self._acquired_at = 0.0
+        self._owner: Optional[int] = None
+
+    def __enter__(self):
+        started = time.perf_counter()
+        self._lock.acquire()
+        self._owner = threading.get_ident()
+        self._acquired_at = time.perf_counter()
+        waited = self._acquired_at - started
+        metrics.observe(f'{self.name}.wait_seconds', waited)
+        _add_to_context('lock_wait', waited)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        metrics.observe(f'{self.name}.hold_seconds', time.perf_counter() - self._acquired_at)
+        self._owner = None
+        self._lock.release()
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    def held(self) -> bool:
+        """Whether the calling thread holds the lock"""
+        return self._owner == threading.get_ident()
+
+    @contextmanager
+    def suspended(self):
+        """Release the lock for the block if the calling thread holds it (e.g. while sleeping)"""
+        if not self.held():
+            yield
+            return
+        self.__exit__()
+        try:
+            yield
+        finally:
+            self.__enter__()
+
+
+def _guild_of(args, kwargs, guild_arg: Optional[int]) -> Optional[str]:
+    if guild_arg is None:
+        return None
+    positional = args[guild_arg] if len(args) > guild_arg else None
+    guild = kwargs.get('guild_id', kwargs.get('guild', positional))
+    guild = getattr(guild, 'id', guild)
+    return str(guild) if isinstance(guild, (int, str)) else None
+
+
+def instrumented(name: str, guild_arg: Optional[int] = 0) -> Callable:
+    """Time a database function: calls, errors, wall time, lock wait vs request time, bytes.
+
+    Calls slower than SLOW_QUERY_MS are printed and kept in ``metrics.slow_queries``
+    with the function name and the guild id found at positional index
+    ``guild_arg`` (or the guild_id/guild keyword). Nested instrumented calls roll their
+    lock and request time up into the caller's totals.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            outer = getattr(_context, 'current', None)
+            current = _context.current = {'lock_wait': 0.0, 'request': 0.0, 'bytes': 0}
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                metrics.incr(f'db.{name}.errors')
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                _context.current = outer
+                if outer is not None:
+                    for key, value in current.items():
+                        outer[key] += value
+                metrics.incr(f'db.{name}.calls')
+                metrics.observe(f'db.{name}.seconds', elapsed)
+                metrics.observe(f'db.{name}.lock_wait_seconds', current['lock_wait'])
+                metrics.observe(f'db.{name}.request_seconds', current['request'])
+                if elapsed * 1000 >= SLOW_QUERY_MS:
+                    entry = {
+                        'function': name,
+                        'guild_id': _guild_of(args, kwargs, guild_arg),
+                        'ms': round(elapsed * 1000, 1),
+                        'lock_wait_ms': round(current['lock_wait'] * 1000, 1),
+                        'request_ms': round(current['request'] * 1000, 1),
+                        'bytes': current['bytes'],
+                        'at': time.time(),
+                    }
+                    metrics.record_slow(entry)
+                    print(
+                        f"[SLOW] {name} guild={entry['guild_id']} took {entry['ms']}ms "
+                        f"(lock wait {entry['lock_wait_ms']}ms, requests {entry['request_ms']}ms, "
+                        f"{entry['bytes']} bytes)"
+                    )
+        return wrapper
+    return decorator
+
+
+def cache_result(cache: str, hit: bool) -> None:
+    metrics.incr(f'cache.{cache}.{"hit" if hit else "miss"}')
+
+
+def cache_hit_ratios() -> Dict[str, float]:
+    """Hit ratio per cache name, from the cache.<name>.hit/miss counters"""
+    counters = metrics.snapshot()['counters']
+    names = {key.split('.')[1] for key in counters if key.startswith('cache.')}
+    ratios = {}
+    for name in sorted(names):
+        hits, misses = counters.get(f'cache.{name}.hit', 0), counters.get(f'cache.{name}.miss', 0)
+        ratios[name] = hits / (hits + misses) if hits + misses else 0.0
+    return ratios
+
+
+def top_latencies(prefix: str = 'db.', limit: int = 10) -> List[Dict]:
+    """Instrumented functions sorted by total wall time"""
+    histograms = metrics.snapshot()['histograms']
+    rows = [
+        {'name': name[len(prefix):-len('.seconds')], **stats}
+        for name, stats in histograms.items()
+        if name.startswith(prefix) and name.endswith('.seconds')
+    ]
+    return sorted(rows, key=lambda row: -row['sum'])[:limit]
+
+
+_dump_thread: Optional[threading.Thread] = None
+
+
+def start_metrics_dump(path: Optional[str] = None, interval: Optional[float] = None) -> None:
+    """Write metrics to METRICS_FILE every METRICS_DUMP_INTERVAL seconds (idempotent, off if unset)"""
+    global _dump_thread
+    path = path or os.getenv('METRICS_FILE')
+    if not path or _dump_thread is not None:
+        return
+    interval = interval or float(os.getenv('METRICS_DUMP_INTERVAL', '30'))
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                metrics.write_json(path)
+            except Exception as e:
+                print(f"[WARNING] Failed to write metrics to {path}: {e}")
+
+    _dump_thread = threading.Thread(target=run, name="metrics-dump", daemon=True)
+    _dump_thread.start()
@@ -0,0 +1,130 @@
+from typing import Dict, FrozenSet, Iterable, Optional
+
+
+class _Snapshot:
+    """Base for immutable per-guild config records.
+
+    Snapshots are shared between the caches and every reader, so they can never
+    be changed in place. Use ``replace`` to derive a modified copy and commit it
+    through the ``update_*`` helpers in database.py.
+    """
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable; use replace()")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def _set(self, name: str, value) -> None:
+        object.__setattr__(self, name, value)
+
+    def replace(self, **changes):
+        """Return a copy of this snapshot with the given fields changed."""
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return type(self)(**fields)
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __hash__(self):
+        return hash(tuple(getattr(self, name) for name in self.__slots__))
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class SwearData(_Snapshot):
+    """Filtered words and channels where swearing is allowed for one guild.
+
+    ``version`` is the swear_words change version the word set is known to
+    include; refreshes fetch only later changes (0 means read it in full).
+    """
+    __slots__ = ("swear_words", "allowed_channels", "version")
+
+    swear_words: FrozenSet[str]
+    allowed_channels: FrozenSet[int]
+    version: int
+
+    def __init__(self, swear_words: Iterable[str] = (), allowed_channels: Iterable[int] = (),
+                 version: int = 0):
+        self._set("swear_words", frozenset(swear_words))
+        self._set("allowed_channels", frozenset(int(c) for c in allowed_channels))
+        self._set("version", int(version or 0))
+
+    def to_dict(self) -> Dict:
+        return {
+            "swear_words": sorted(self.swear_words),
+            "allowed_channels": sorted(self.allowed_channels)
+        }
+
+
+class RolesData(_Snapshot):
+    """Owner, management roles and filter-immune roles for one guild."""
+    __slots__ = ("owner_id", "allowed_roles", "immune_roles")
+
+    owner_id: Optional[int]
+    allowed_roles: FrozenSet[str]
+    immune_roles: FrozenSet[str]
+
+    def __init__(self, owner_id: Optional[int] = None,
+                 allowed_roles: Iterable[str] = (), immune_roles: Iterable[str] = ()):
+        self._set("owner_id", int(owner_id) if owner_id else None)
+        self._set("allowed_roles", frozenset(allowed_roles))
+        self._set("immune_roles", frozenset(immune_roles))
+
+    def to_dict(self) -> Dict:
+        return {
+            "owner_id": self.owner_id,
+            "allowed_roles": sorted(self.allowed_roles),
+            "immune_roles": sorted(self.immune_roles)
+        }
+
+
+class GuildConfig(_Snapshot):
+    """Everything the message path needs for one guild, cached as a unit.
+
+    Combines the swear and roles snapshots with the guild_settings row
+    (including the logging channel), so handling a message or a violation
+    needs no further lookups.
+    """
+    __slots__ = ("swear", "roles", "strict_mode", "warning_message", "cooldown_time",
+                 "max_warnings", "retention_days", "logging_channel")
+
+    swear: SwearData
+    roles: RolesData
+    strict_mode: bool
+    warning_message: Optional[str]
+    cooldown_time: int
+    max_warnings: int
+    retention_days: Optional[int]
+    logging_channel: Optional[int]
+
+    def __init__(self, swear: SwearData = SwearData(), roles: RolesData = RolesData(),
+                 strict_mode: bool = False, warning_message: Optional[str] = None,
+                 cooldown_time: int = 60, max_warnings: int = 3,
+                 retention_days: Optional[int] = None, logging_channel: Optional[int] = None):
+        self._set("swear", swear)
+        self._set("roles", roles)
+        self._set("strict_mode", bool(strict_mode))
+        self._set("warning_message", warning_message)
+        self._set("cooldown_time", cooldown_time)
+        self._set("max_warnings", max_warnings)
+        self._set("retention_days", retention_days)
+        self._set("logging_channel", int(logging_channel) if logging_channel else None)
+
+    @property
+    def swear_words(self) -> FrozenSet[str]:
+        return self.swear.swear_words
+
+    @property
+    def allowed_channels(self) -> FrozenSet[int]:
+        return self.swear.allowed_channels
+
+    @property
+    def immune_roles(self) -> FrozenSet[str]:
+        return self.roles.immune_roles
@@ -0,0 +1,175 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from metrics import metrics
+
+
+class Priority(IntEnum):
+    """Outbound work classes, most urgent first."""
+    DELETE = 0
+    WARNING = 1
+    AUDIT = 2
+    COSMETIC = 3
+
+
+class Dropped(Exception):
+    """Queued work was shed under pressure, went stale, or was superseded by newer work."""
+
+
+class _Job:
+    __slots__ = ("priority", "seq", "action", "future", "queued_at", "merge_key")
+
+    def __init__(self, priority: Priority, seq: int, action: Callable[[], Awaitable[Any]],
+                 future: asyncio.Future, merge_key: Optional[Hashable]):
+        self.priority = priority
+        self.seq = seq
+        self.action = action
+        self.future = future
+        self.queued_at = time.monotonic()
+        self.merge_key = merge_key
+
+    def __lt__(self, other: "_Job") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class _Route:
+    __slots__ = ("queue", "merging", "workers")
+
+    def __init__(self):
+        self.queue: List[_Job] = []
+        self.merging: Dict[Hashable, _Job] = {}
+        self.workers = 0
+
+
+def _consume(future: asyncio.Future) -> None:
+    # Fire-and-forget submitters never look at the result; keep asyncio from warning about it
+    if not future.cancelled():
+        future.exception()
+
+
+class OutboundScheduler:
+    """Central queue for Discord API calls, ordered by priority within each route.
+
+    A route is normally the channel (or webhook) a call targets. Each route
+    runs at most ``route_concurrency`` calls at a time, taking queued work
+    most urgent first (delete > warning > audit log > cosmetic), and at most
+    ``max_in_flight`` calls run across all routes. This only orders and
+    serializes calls per channel: discord.py's HTTP client already tracks
+    Discord's rate-limit buckets and retries 429s itself, so a call that is
+    rate limited simply takes longer, holding up less urgent work behind it.
+
+    Under pressure low-priority work gives way: work queued with a
+    ``merge_key`` replaces older queued work with the same key, cosmetic work
+    older than ``stale_after`` seconds is skipped, and once a route holds
+    ``max_queue`` jobs the least urgent audit or cosmetic job is dropped.
+    Shed work fails with Dropped. Queue latency is recorded per class as
+    ``outbound.<class>.queue_seconds``.
+    """
+
+    def __init__(self, route_concurrency: int = 1, max_in_flight: int = 25, max_queue: int = 50,
+                 stale_after: float = 10.0):
+        self.route_concurrency = route_concurrency
+        self.max_queue = max_queue
+        self.stale_after = stale_after
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._routes: Dict[Hashable, _Route] = {}
+        self._seq = itertools.count()
+
+    def submit(self, route: Hashable, priority: Priority, action: Callable[[], Awaitable[Any]],
+               merge_key: Optional[Hashable] = None) -> asyncio.Future:
+        """Queue ``action`` (a coroutine factory) on a route; the future resolves to its result"""
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume)
+        job = _Job(priority, next(self._seq), action, future, merge_key)
+        state = self._routes.get(route)
+        if state is None:
+            state = self._routes[route] = _Route()
+
+        if merge_key is not None:
+            if (older := state.merging.get(merge_key)) is not None and not older.future.done():
+                self._shed(older, 'merged')
+            state.merging[merge_key] = job
+        if len(state.queue) >= self.max_queue:
+            self._shed_for(state, job)
+        if not job.future.done():
+            heapq.heappush(state.queue, job)
+            metrics.incr(f'outbound.{priority.name.lower()}.queued')
+        if state.workers < self.route_concurrency and state.queue:
+            state.workers += 1
+            asyncio.ensure_future(self._work(route, state))
+        return future
+
+    async def run(self, route: Hashable, priority: Priority, action: Callable[[], Awaitable[Any]],
+                  merge_key: Optional[Hashable] = None) -> Any:
+        """Queue ``action`` and wait for its result (or its exception)"""
+        return await self.submit(route, priority, action, merge_key)
+
+    @staticmethod
+    def _shed(job: _Job, reason: str) -> None:
+        job.future.set_exception(Dropped(reason))
+        metrics.incr(f'outbound.{job.priority.name.lower()}.{reason}')
+
+    def _shed_for(self, state: _Route, incoming: _Job) -> None:
+        """Make room on a full route by dropping its least urgent droppable job (maybe the incoming one)"""
+        live = [job for job in state.queue if not job.future.done()]
+        candidates = [job for job in live + [incoming] if job.priority >= Priority.AUDIT]
+        if not candidates:
+            return  # Deletes and warnings are never shed; the queue grows instead
+        victim = max(candidates, key=lambda job: (job.priority, -job.seq))
+        self._shed(victim, 'dropped')
+        if victim is not incoming:
+            state.queue = [job for job in state.queue if job is not victim]
+            heapq.heapify(state.queue)
+
+    async def _work(self, route: Hashable, state: _Route) -> None:
+        try:
+            while state.queue:
+                job = heapq.heappop(state.queue)
+                if job.future.done():
+                    continue
+                if job.merge_key is not None and state.merging.get(job.merge_key) is job:
+                    del state.merging[job.merge_key]
+                waited = time.monotonic() - job.queued_at
+                if job.priority == Priority.COSMETIC and waited > self.stale_after:
+                    self._shed(job, 'stale')
+                    continue
+                name = job.priority.name.lower()
+                metrics.observe(f'outbound.{name}.queue_seconds', waited)
+
+                async with self._in_flight:
+                    try:
+                        result = await job.action()
+                    except Exception as e:
+                        metrics.incr(f'outbound.{name}.errors')
+                        if not job.future.done():
+                            job.future.set_exception(e)
+                        continue
+                metrics.incr(f'outbound.{name}.sent')
+                # The caller may have been cancelled while the call ran; the route carries on regardless
+                if not job.future.done():
+                    job.future.set_result(result)
+        finally:
+            state.workers -= 1
+            if not state.queue and not state.workers and self._routes.get(route) is state:
+                del self._routes[route]
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Queued jobs per class across all routes"""
+        depths = {priority.name.lower(): 0 for priority in Priority}
+        for state in self._routes.values():
+            for job in state.queue:
+                if not job.future.done():
+                    depths[job.priority.name.lower()] += 1
+        return depths
+
+
+outbound = OutboundScheduler(
+    route_concurrency=int(os.getenv('OUTBOUND_ROUTE_CONCURRENCY', '1')),
+    max_in_flight=int(os.getenv('OUTBOUND_MAX_IN_FLIGHT', '25')),
+    max_queue=int(os.getenv('OUTBOUND_MAX_QUEUE', '50'))
+)
@@ -0,0 +1,195 @@
+import asyncio
+import functools
+import os
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Deque, Dict, List, Optional
+
+import discord
+
+from metrics import metrics
+from outbound import Dropped, Priority, outbound
+
+# Channel.delete_messages takes at most this many IDs per call
+BULK_DELETE_LIMIT = 100
+
+_MISSING = object()
+
+
+class _Raid:
+    __slots__ = ("channel", "guild", "logging_channel_id", "started", "pending", "offenders",
+                 "deleted", "verdicts", "filter", "notice", "task")
+
+    def __init__(self, channel: discord.TextChannel, logging_channel_id: Optional[int]):
+        self.channel = channel
+        self.guild = channel.guild
+        self.logging_channel_id = logging_channel_id
+        self.started = time.monotonic()
+        self.pending: List[int] = []
+        self.offenders: Counter = Counter()
+        self.deleted = 0
+        self.verdicts: OrderedDict = OrderedDict()
+        self.filter = None
+        self.notice: Optional[discord.Message] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class RaidGuard:
+    """Automatic per-channel raid mode for spam waves.
+
+    A channel enters raid mode once ``threshold`` violations land in it within
+    ``window`` seconds. While it lasts, flagged messages are collected and
+    removed with ``delete_messages`` in batches of up to 100 every
+    ``flush_interval`` seconds, per-message warnings and log embeds are
+    replaced by one notice in the channel and one summary in the logging
+    channel, and filter verdicts are cached by message content so repeated
+    spam skips the filter. The channel leaves raid mode once its rate falls to
+    half the threshold. Activations and the work saved are exported as
+    ``raid.*`` metrics.
+    """
+
+    def __init__(self, threshold: int = 8, window: float = 10.0, flush_interval: float = 1.0,
+                 cache_size: int = 1024):
+        self.threshold = threshold
+        self.window = window
+        self.flush_interval = flush_interval
+        self.cache_size = cache_size
+        self._recent: Dict[int, Deque[float]] = {}
+        self._raids: Dict[int, _Raid] = {}
+
+    def active(self, channel_id: int) -> bool:
+        return channel_id in self._raids
+
+    def _rate(self, channel_id: int, now: float) -> int:
+        """Violations in the channel during the last window"""
+        recent = self._recent.get(channel_id)
+        if recent is None:
+            return 0
+        while recent and recent[0] <= now - self.window:
+            recent.popleft()
+        if not recent:
+            del self._recent[channel_id]
+            return 0
+        return len(recent)
+
+    def verdict(self, message: discord.Message, swear_filter) -> Optional[str]:
+        """The filter's matched word for a message; cached by content while its channel is raided"""
+        raid = self._raids.get(message.channel.id)
+        if raid is None:
+            return swear_filter.match(message.content)
+        if raid.filter is not swear_filter:
+            # The word list changed; earlier verdicts no longer hold
+            raid.verdicts.clear()
+            raid.filter = swear_filter
+        cached = raid.verdicts.get(message.content, _MISSING)
+        if cached is not _MISSING:
+            raid.verdicts.move_to_end(message.content)
+            metrics.incr('raid.verdict_cache_hits')
+            return cached
+        matched = swear_filter.match(message.content)
+        raid.verdicts[message.content] = matched
+        if len(raid.verdicts) > self.cache_size:
+            raid.verdicts.popitem(last=False)
+        return matched
+
+    def record_violation(self, message: discord.Message, logging_channel_id: Optional[int]) -> bool:
+        """Count a violation; returns True if the channel is in raid mode and will handle the message"""
+        channel_id = message.channel.id
+        now = time.monotonic()
+        self._recent.setdefault(channel_id, deque()).append(now)
+        raid = self._raids.get(channel_id)
+        if raid is None:
+            if self._rate(channel_id, now) < self.threshold:
+                return False
+            raid = self._raids[channel_id] = _Raid(message.channel, logging_channel_id)
+            raid.task = asyncio.ensure_future(self._run(raid))
+            metrics.incr('raid.activations')
+            print(f"[WARNING] Raid mode on in channel {channel_id} (guild {message.guild.id})")
+        raid.logging_channel_id = logging_channel_id
+        raid.pending.append(message.id)
+        raid.offenders[message.author.mention] += 1
+        # Handled by the bulk delete and the summaries instead of individually
+        metrics.incr('raid.warnings_skipped')
+        metrics.incr('raid.embeds_skipped')
+        return True
+
+    async def _flush(self, raid: _Raid) -> None:
+        while raid.pending:
+            batch, raid.pending = raid.pending[:BULK_DELETE_LIMIT], raid.pending[BULK_DELETE_LIMIT:]
+            try:
+                await outbound.run(
+                    raid.channel.id, Priority.DELETE,
+                    functools.partial(raid.channel.delete_messages, [discord.Object(id=message_id) for message_id in batch])
+                )
+            except discord.NotFound:
+                pass  # Some were already gone; the rest of the batch was not removed
+            except discord.HTTPException as e:
+                metrics.incr('raid.bulk_delete_errors')
+                print(f"[WARNING] Bulk delete of {len(batch)} messages in {raid.channel.id} failed: {e}")
+                continue
+            raid.deleted += len(batch)
+            metrics.incr('raid.bulk_deletes')
+            metrics.incr('raid.messages_deleted', len(batch))
+            metrics.incr('raid.delete_calls_saved', len(batch) - 1)
+
+    async def _run(self, raid: _Raid) -> None:
+        channel_id = raid.channel.id
+        try:
+            try:
+                raid.notice = await outbound.run(raid.channel.id, Priority.WARNING, functools.partial(
+                    raid.channel.send, "🛡️ Raid mode is on: filtered messages in this channel are being removed in bulk."
+                ))
+            except discord.HTTPException:
+                pass
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                await self._flush(raid)
+                now = time.monotonic()
+                if now - raid.started >= self.window and self._rate(channel_id, now) <= self.threshold // 2:
+                    break
+        finally:
+            del self._raids[channel_id]
+            await self._flush(raid)
+            await self._summarize(raid)
+
+    async def _summarize(self, raid: _Raid) -> None:
+        duration = int(time.monotonic() - raid.started)
+        total = sum(raid.offenders.values())
+        print(f"[INFO] Raid mode off in channel {raid.channel.id}: {total} messages over {duration}s")
+        if raid.notice is not None:
+            try:
+                # Not cosmetic: shed work would leave the notice up for good
+                await outbound.run(raid.channel.id, Priority.WARNING, raid.notice.delete)
+            except discord.HTTPException:
+                pass
+        logging_channel = raid.guild.get_channel(raid.logging_channel_id) if raid.logging_channel_id else None
+        if logging_channel is None:
+            return
+        embed = discord.Embed(
+            title="🛡️ Raid Mode Summary",
+            description=f"{raid.channel.mention}: {total} filtered messages over {duration}s, "
+                        f"{raid.deleted} removed in bulk",
+            color=discord.Color.orange()
+        )
+        embed.add_field(
+            name="Top Offenders",
+            value="\n".join(f"{mention} — {count}" for mention, count in raid.offenders.most_common(10)) or "None",
+            inline=False
+        )
+        try:
+            await outbound.run(logging_channel.id, Priority.AUDIT, functools.partial(logging_channel.send, embed=embed))
+        except (discord.HTTPException, Dropped) as e:
+            print(f"[WARNING] Failed to post raid summary for {raid.channel.id}: {e}")
+
+    async def close(self) -> None:
+        """End every raid now, flushing pending deletes and summaries"""
+        tasks = [raid.task for raid in self._raids.values() if raid.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+raid_guard = RaidGuard(
+    threshold=int(os.getenv('RAID_THRESHOLD', '8')),
+    window=float(os.getenv('RAID_WINDOW', '10'))
+)
@@ -0,0 +1,286 @@
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from threading import BoundedSemaphore, Lock
+from typing import Dict, Optional
+
+from metrics import TimedLock, metrics, record_request
+from storage import StorageBackend
+
+# Read-only backend calls, which may be repeated safely after a failure or
+# timeout. Writes are sent once: a timed-out attempt may still be running, so
+# a retry could apply the same write twice at the same time.
+READ_CALLS = frozenset({
+    'fetch_row', 'fetch_rows', 'fetch_guild_config', 'fetch_logs', 'aggregate_logs',
+    'fetch_rollups', 'fetch_swear_words',
+})
+
+
+def _payload_size(value) -> int:
+    """Approximate bytes moved for a request argument or result"""
+    if value is None:
+        return 0
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _row_count(value) -> int:
+    if isinstance(value, list):
+        return len(value)
+    return 1 if isinstance(value, dict) else 0
+
+
+class PayloadEstimator:
+    """Estimates bytes moved per storage call without serializing every payload.
+
+    One call in ``sample_every`` per method (and the first) is measured with
+    json.dumps; that sets the method's bytes per row, and other calls are
+    estimated from their row counts.
+    """
+
+    def __init__(self, sample_every: int = 50):
+        self.sample_every = sample_every
+        self._calls: Dict[str, int] = {}
+        self._per_row: Dict[str, float] = {}
+
+    def estimate(self, method: str, args: tuple, result) -> int:
+        payloads = [arg for arg in args if isinstance(arg, (dict, list))] + [result]
+        rows = sum(_row_count(payload) for payload in payloads)
+        calls = self._calls.get(method, 0)
+        self._calls[method] = calls + 1
+        if calls % self.sample_every and method in self._per_row:
+            return int(rows * self._per_row[method])
+        size = sum(_payload_size(payload) for payload in payloads)
+        if rows:
+            self._per_row[method] = size / rows
+        return size
+
+
+class StorageTimeout(Exception):
+    """A storage call did not finish within its deadline."""
+
+
+class CircuitOpenError(Exception):
+    """The circuit breaker is open; the call was rejected without being attempted."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    ``closed``: calls pass through. After ``failure_threshold`` consecutive
+    failures it turns ``open`` and rejects calls immediately for
+    ``reset_timeout`` seconds, then lets a single trial call through
+    (``half_open``); success closes it, failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = Lock()
+        self._state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == 'open' and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = 'half_open'
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted now"""
+        with self._lock:
+            state = self._current_state()
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != 'closed':
+                print(f"[INFO] Circuit '{self.name}' closed")
+            self._state = 'closed'
+            self._failures = 0
+            self._trial_running = False
+
+    def release(self) -> None:
+        """End a trial call without judging the backend (e.g. it failed on bad input)"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self, error: Exception) -> None:
+        with self._lock:
+            self._failures += 1
+            self._last_error = f"{type(error).__name__}: {error}"
+            reopen = self._state == 'half_open'
+            self._trial_running = False
+            if reopen or (self._state == 'closed' and self._failures >= self.failure_threshold):
+                self._state = 'open'
+                self._opened_at = time.monotonic()
+                metrics.incr(f'{self.name}.breaker_opened')
+                print(f"[WARNING] Circuit '{self.name}' opened after {self._failures} failures: {self._last_error}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            state = self._current_state()
+            return {
+                'state': state,
+                'consecutive_failures': self._failures,
+                'open_for': time.monotonic() - self._opened_at if state != 'closed' else 0.0,
+                'last_error': self._last_error,
+            }
+
+
+class ResilientBackend(StorageBackend):
+    """Wraps a backend so every call has a deadline, a breaker and bounded retries.
+
+    Calls run on a small worker pool so a hung request gives up after
+    ``timeout`` seconds instead of blocking the caller. A timed-out request
+    cannot be cancelled and keeps its worker until it returns, so at most
+    ``workers`` calls are outstanding at once; past that, calls fail within
+    the same deadline rather than queueing behind hung ones. Reads (never
+    writes) are retried up to ``retries`` times with full-jitter exponential
+    backoff, with ``yield_lock`` (if the caller holds it) released while
+    waiting; all failures feed the circuit breaker, and while it is open calls
+    fail fast with CircuitOpenError so callers fall back to cached config at
+    once.
+    """
+
+    def __init__(self, inner: StorageBackend, timeout: float = 5.0, retries: int = 2,
+                 backoff: float = 0.2, breaker: Optional[CircuitBreaker] = None, workers: int = 8,
+                 yield_lock: Optional[TimedLock] = None):
+        self.inner = inner
+        self.name = inner.name
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker('storage')
+        self.workers = workers
+        self.yield_lock = yield_lock
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="storage")
+        self._slots = BoundedSemaphore(workers)
+        self._payloads = PayloadEstimator()
+
+    def _call(self, method: str, *args, **kwargs):
+        attempts = 1 + (self.retries if method in READ_CALLS else 0)
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                metrics.incr('storage.rejected_open')
+                raise CircuitOpenError(f"Storage circuit is open; {method} not attempted")
+            started = time.perf_counter()
+            try:
+                if not self._slots.acquire(timeout=self.timeout):
+                    metrics.incr('storage.saturated')
+                    raise StorageTimeout(f"{method} not started: {self.workers} storage calls still outstanding")
+                future = self._executor.submit(getattr(self.inner, method), *args, **kwargs)
+                # The slot is freed when the call really ends, even after a timeout
+                future.add_done_callback(lambda _: self._slots.release())
+                result = future.result(timeout=max(0.0, self.timeout - (time.perf_counter() - started)))
+            except (ValueError, NotImplementedError):
+                # Caller errors, not provider trouble
+                self.breaker.release()
+                raise
+            except Exception as e:
+                record_request(f'storage.{method}', time.perf_counter() - started, 0)
+                metrics.incr(f'storage.{method}.errors')
+                if isinstance(e, FutureTimeout):
+                    future.cancel()
+                    metrics.incr('storage.timeouts')
+                    e = StorageTimeout(f"{method} timed out after {self.timeout}s")
+                self.breaker.record_failure(e)
+                if attempt + 1 >= attempts:
+                    raise e
+                metrics.incr('storage.retries')
+                self._sleep(random.uniform(0, self.backoff * 2 ** attempt))
+            else:
+                record_request(
+                    f'storage.{method}', time.perf_counter() - started, self._payloads.estimate(method, args, result)
+                )
+                self.breaker.record_success()
+                return result
+
+    def _sleep(self, delay: float) -> None:
+        # Backing off must not stall every other storage user waiting on the caller's lock
+        if self.yield_lock is not None:
+            with self.yield_lock.suspended():
+                time.sleep(delay)
+        else:
+            time.sleep(delay)
+
+    def __getattr__(self, name: str):
+        # Backend-specific attributes (e.g. client, path) pass straight through
+        return getattr(self.inner, name)
+
+    def fetch_row(self, *args, **kwargs):
+        return self._call('fetch_row', *args, **kwargs)
+
+    def fetch_rows(self, *args, **kwargs):
+        return self._call('fetch_rows', *args, **kwargs)
+
+    def upsert_row(self, *args, **kwargs):
+        return self._call('upsert_row', *args, **kwargs)
+
+    def insert_row_if_absent(self, *args, **kwargs):
+        return self._call('insert_row_if_absent', *args, **kwargs)
+
+    def fetch_guild_config(self, *args, **kwargs):
+        return self._call('fetch_guild_config', *args, **kwargs)
+
+    def fetch_swear_words(self, *args, **kwargs):
+        return self._call('fetch_swear_words', *args, **kwargs)
+
+    def apply_swear_words(self, *args, **kwargs):
+        return self._call('apply_swear_words', *args, **kwargs)
+
+    def migrate_swear_words(self, *args, **kwargs):
+        return self._call('migrate_swear_words', *args, **kwargs)
+
+    def insert_log(self, *args, **kwargs):
+        return self._call('insert_log', *args, **kwargs)
+
+    def fetch_logs(self, *args, **kwargs):
+        return self._call('fetch_logs', *args, **kwargs)
+
+    def delete_logs(self, *args, **kwargs):
+        return self._call('delete_logs', *args, **kwargs)
+
+    def aggregate_logs(self, *args, **kwargs):
+        return self._call('aggregate_logs', *args, **kwargs)
+
+    def fetch_rollups(self, *args, **kwargs):
+        return self._call('fetch_rollups', *args, **kwargs)
+
+    def increment_rollups(self, *args, **kwargs):
+        return self._call('increment_rollups', *args, **kwargs)
+
+    def seed_rollups(self, *args, **kwargs):
+        return self._call('seed_rollups', *args, **kwargs)
+
+
+def wrap_backend(backend: StorageBackend, yield_lock: Optional[TimedLock] = None) -> ResilientBackend:
+    """Wrap a backend using the STORAGE_TIMEOUT, STORAGE_RETRIES and BREAKER_* env settings"""
+    return ResilientBackend(
+        backend,
+        timeout=float(os.getenv('STORAGE_TIMEOUT', '5')),
+        retries=int(os.getenv('STORAGE_RETRIES', '2')),
+        breaker=CircuitBreaker(
+            'storage',
+            failure_threshold=int(os.getenv('BREAKER_THRESHOLD', '5')),
+            reset_timeout=float(os.getenv('BREAKER_RESET_TIMEOUT', '30'))
+        ),
+        yield_lock=yield_lock
+    )
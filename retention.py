@@ -0,0 +1,239 @@
+import argparse
+import gzip
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from threading import Event, Thread
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+try:
+    import zstandard
+except ImportError:  # optional; gzip is always available
+    zstandard = None
+
+from database import (
+    delete_violation_logs,
+    get_retention_days,
+    get_violation_logs_page,
+    rollups
+)
+
+SEGMENT_SUFFIXES = {'zstd': '.ndjson.zst', 'gzip': '.ndjson.gz'}
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Treat a naive datetime (e.g. a bare date given on the command line) as UTC"""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _parse_timestamp(value: str) -> datetime:
+    """ISO-8601 date or timestamp, UTC unless it carries an offset"""
+    return _as_utc(datetime.fromisoformat(value))
+
+
+class LogArchive:
+    """Compressed NDJSON segments of log rows removed from moderation_logs.
+
+    Each purge batch becomes one immutable segment under ``<root>/<guild_id>/``,
+    named after its first timestamp and id range so a retried batch rewrites
+    the same file instead of duplicating rows. Segments are zstd-compressed
+    when the zstandard package is installed, gzip otherwise, and stay
+    searchable offline with ``python retention.py search``.
+    """
+
+    def __init__(self, root: str, compression: Optional[str] = None):
+        self.root = root
+        self.compression = compression or ('zstd' if zstandard else 'gzip')
+        if self.compression not in SEGMENT_SUFFIXES:
+            raise ValueError(f"Unknown compression '{self.compression}'")
+        if self.compression == 'zstd' and zstandard is None:
+            raise ValueError("zstd compression needs the zstandard package")
+
+    def write_segment(self, guild_id: Union[int, str], rows: List[Dict]) -> str:
+        """Write rows (ordered by timestamp, id) to a new segment; returns its path"""
+        directory = os.path.join(self.root, str(guild_id))
+        os.makedirs(directory, exist_ok=True)
+        first_ts = datetime.fromisoformat(rows[0]['timestamp']).strftime('%Y%m%dT%H%M%S')
+        name = f"{first_ts}_{rows[0]['id']}-{rows[-1]['id']}{SEGMENT_SUFFIXES[self.compression]}"
+        path = os.path.join(directory, name)
+        payload = "".join(json.dumps(row) + "\n" for row in rows).encode('utf-8')
+        if self.compression == 'zstd':
+            payload = zstandard.ZstdCompressor(level=10).compress(payload)
+        else:
+            payload = gzip.compress(payload)
+        # Written aside and renamed so a crash never leaves a truncated segment
+        with open(path + ".tmp", 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        return path
+
+    def segments(self, guild_id: Optional[Union[int, str]] = None) -> List[str]:
+        """Segment paths in chronological order, for one guild or all of them"""
+        if guild_id is not None:
+            guild_dirs = [str(guild_id)]
+        elif os.path.isdir(self.root):
+            guild_dirs = sorted(os.listdir(self.root))
+        else:
+            guild_dirs = []
+        paths = []
+        for guild_dir in guild_dirs:
+            directory = os.path.join(self.root, guild_dir)
+            if not os.path.isdir(directory):
+                continue
+            paths.extend(
+                os.path.join(directory, name) for name in sorted(os.listdir(directory))
+                if name.endswith(tuple(SEGMENT_SUFFIXES.values()))
+            )
+        return paths
+
+    @staticmethod
+    def read_segment(path: str) -> Iterator[Dict]:
+        if path.endswith(SEGMENT_SUFFIXES['zstd']):
+            if zstandard is None:
+                raise ValueError(f"Reading {path} needs the zstandard package")
+            with open(path, 'rb') as f:
+                data = zstandard.ZstdDecompressor().stream_reader(f).read()
+            lines = data.decode('utf-8').splitlines()
+        else:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+
+    def search(self, guild_id: Optional[Union[int, str]] = None, user_id: Optional[int] = None,
+               channel_id: Optional[int] = None, text: Optional[str] = None,
+               since: Optional[datetime] = None, until: Optional[datetime] = None) -> Iterator[Dict]:
+        """Archived rows matching every given filter; ``text`` is a case-insensitive substring"""
+        needle = text.lower() if text else None
+        # Stored timestamps are UTC-aware; naive bounds would not compare with them
+        since = _as_utc(since) if since else None
+        until = _as_utc(until) if until else None
+        for path in self.segments(guild_id):
+            for row in self.read_segment(path):
+                if user_id is not None and row.get('user_id') != str(user_id):
+                    continue
+                if channel_id is not None and row.get('channel_id') != str(channel_id):
+                    continue
+                if since or until:
+                    ts = _as_utc(datetime.fromisoformat(row['timestamp']))
+                    if (since and ts < since) or (until and ts >= until):
+                        continue
+                if needle and needle not in (row.get('message') or '').lower():
+                    continue
+                yield row
+
+
+class RetentionJob(Thread):
+    """Daemon thread that archives and deletes logs older than each guild's window.
+
+    Work is split into batches of ``batch_size`` rows with a ``pause`` between
+    them and at most ``max_batches`` per guild per pass, so db_lock is only
+    held briefly and live traffic is never starved; a backlog simply drains
+    over several passes. Counts for purged rows live on in the rollup tables,
+    which every violation already feeds, so analytics totals are unaffected.
+    """
+
+    def __init__(self, archive: LogArchive, guild_ids: Callable[[], Iterable[int]],
+                 interval: float = 3600.0, batch_size: int = 500, pause: float = 1.0,
+                 max_batches: int = 20):
+        super().__init__(name="log-retention", daemon=True)
+        self.archive = archive
+        self.guild_ids = guild_ids
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pause = pause
+        self.max_batches = max_batches
+        self._stopped = Event()
+
+    def purge_guild(self, guild_id: int, now: Optional[datetime] = None) -> int:
+        """Archive and delete one guild's expired rows; returns rows deleted"""
+        days = get_retention_days(guild_id)
+        if days <= 0:
+            return 0
+        cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=days)
+        # Seeds (and persists) the guild's rollups from the raw logs if it has none yet
+        rollups.get(str(guild_id))
+
+        purged = 0
+        for _ in range(self.max_batches):
+            rows, _ = get_violation_logs_page(guild_id, self.batch_size, oldest_first=True, until=cutoff)
+            if not rows:
+                break
+            self.archive.write_segment(guild_id, rows)
+            deleted = delete_violation_logs(guild_id, [row['id'] for row in rows])
+            purged += deleted
+            if deleted < len(rows) or len(rows) < self.batch_size:
+                break
+            if self._stopped.wait(self.pause):
+                break
+        return purged
+
+    def run_once(self) -> int:
+        """One pass over every guild; returns total rows deleted"""
+        total = 0
+        for guild_id in list(self.guild_ids()):
+            if self._stopped.is_set():
+                break
+            try:
+                total += self.purge_guild(guild_id)
+            except Exception as e:
+                print(f"[WARNING] Log retention for guild {guild_id} failed, will retry: {e}")
+        if total:
+            print(f"[INFO] Log retention archived and removed {total} rows")
+        return total
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.run_once()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+
+archive = LogArchive(os.getenv('LOG_ARCHIVE_DIR', 'log_archive'), os.getenv('LOG_ARCHIVE_COMPRESSION'))
+retention_job: Optional[RetentionJob] = None
+
+
+def start_retention_job(guild_ids: Callable[[], Iterable[int]]) -> RetentionJob:
+    """Start the background retention pass (idempotent)"""
+    global retention_job
+    if retention_job is None:
+        retention_job = RetentionJob(
+            archive, guild_ids,
+            interval=float(os.getenv('RETENTION_INTERVAL', '3600')),
+            batch_size=int(os.getenv('RETENTION_BATCH_SIZE', '500'))
+        )
+        retention_job.start()
+    return retention_job
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Moderation log retention and archive search")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="Archive and delete expired logs now")
+    run.add_argument('guild_ids', type=int, nargs='+')
+
+    search = commands.add_parser('search', help="Search archived logs (prints JSON Lines)")
+    search.add_argument('--guild', type=int)
+    search.add_argument('--user', type=int)
+    search.add_argument('--channel', type=int)
+    search.add_argument('--text', help="Case-insensitive substring of the message")
+    search.add_argument('--since', type=_parse_timestamp, help="ISO-8601 start (inclusive), UTC by default")
+    search.add_argument('--until', type=_parse_timestamp, help="ISO-8601 end (exclusive), UTC by default")
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        job = RetentionJob(archive, lambda: args.guild_ids, pause=0, max_batches=sys.maxsize)
+        print(f"Removed {job.run_once()} rows", file=sys.stderr)
+    else:
+        for row in archive.search(args.guild, args.user, args.channel, args.text, args.since, args.until):
+            print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
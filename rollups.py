@@ -0,0 +1,200 @@
+from collections import Counter
+from datetime import datetime, timezone
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Dimensions kept per guild; each persisted row is (guild_id, dimension, bucket, count)
+DIMENSIONS = ('total', 'day', 'hour', 'user', 'channel', 'word')
+
+# Hourly buckets kept in memory; older hours stay in the rollup table only
+HOURS_KEPT = 24 * 7
+
+
+class TopK:
+    """Space-Saving heavy-hitter counter holding at most ``capacity`` keys.
+
+    Counts for keys that survive are exact or over-estimated by at most the
+    count of the key they evicted, which keeps the top entries reliable while
+    memory stays bounded for high-cardinality dimensions like users.
+    """
+    __slots__ = ('capacity', 'counts')
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+
+    def add(self, key: str, count: int = 1) -> None:
+        if key in self.counts:
+            self.counts[key] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = count
+        else:
+            evicted = min(self.counts, key=self.counts.__getitem__)
+            self.counts[key] = self.counts.pop(evicted) + count
+
+    def most_common(self, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        return sorted(self.counts.items(), key=lambda item: -item[1])[:n]
+
+
+class GuildRollup:
+    """Running violation counts for one guild, plus deltas not yet flushed."""
+    __slots__ = ('total', 'daily', 'hourly', 'channels', 'words', 'users', 'version', '_pending')
+
+    def __init__(self, top_k: int = 100):
+        self.total = 0
+        self.daily: Counter = Counter()
+        self.hourly: Counter = Counter()
+        self.channels: Counter = Counter()
+        self.words = TopK(top_k)
+        self.users = TopK(top_k)
+        self.version = 0
+        self._pending: Counter = Counter()
+
+    def _apply(self, dimension: str, bucket: str, count: int) -> None:
+        if dimension == 'total':
+            self.total += count
+        elif dimension == 'day':
+            self.daily[bucket] += count
+        elif dimension == 'hour':
+            self.hourly[bucket] += count
+        elif dimension == 'channel':
+            self.channels[bucket] += count
+        elif dimension == 'word':
+            self.words.add(bucket, count)
+        elif dimension == 'user':
+            self.users.add(bucket, count)
+
+    def seed(self, rows: List[Dict]) -> None:
+        """Load persisted counts; users and words go through their top-K bounds"""
+        for row in sorted(rows, key=lambda row: -row['count']):
+            self._apply(row['dimension'], row['bucket'], row['count'])
+        self._trim_hours()
+        self.version += 1
+
+    def record(self, timestamp: datetime, user: str, channel_id: str, word: Optional[str]) -> None:
+        buckets = [
+            ('total', ''),
+            ('day', timestamp.strftime('%Y-%m-%d')),
+            ('hour', timestamp.strftime('%Y-%m-%dT%H')),
+            ('user', user),
+            ('channel', channel_id),
+        ]
+        if word:
+            buckets.append(('word', word))
+        for dimension, bucket in buckets:
+            self._apply(dimension, bucket, 1)
+            self._pending[(dimension, bucket)] += 1
+        if len(self.hourly) > HOURS_KEPT:
+            self._trim_hours()
+        self.version += 1
+
+    def _trim_hours(self) -> None:
+        for hour in sorted(self.hourly)[:-HOURS_KEPT]:
+            del self.hourly[hour]
+
+    def take_pending(self) -> Counter:
+        pending, self._pending = self._pending, Counter()
+        return pending
+
+    def restore_pending(self, pending: Counter) -> None:
+        self._pending.update(pending)
+
+
+class RollupRegistry:
+    """Per-guild rollups fed by the violation path and flushed in the background.
+
+    ``load(guild_id)`` returns persisted rollup rows for a guild (an empty list
+    means none exist yet) and ``flush(rows)`` adds ``(guild_id, dimension,
+    bucket, delta)`` rows to the rollup table. Both are provided by database.py.
+    """
+
+    def __init__(self, load: Callable[[str], List[Dict]],
+                 flush: Callable[[List[Tuple[str, str, str, int]]], None],
+                 top_k: int = 100):
+        self._load = load
+        self._flush = flush
+        self._top_k = top_k
+        self._lock = Lock()
+        self._guilds: Dict[str, GuildRollup] = {}
+
+    def get(self, guild_id: str) -> GuildRollup:
+        """Return a guild's rollup, loading persisted counts on first use"""
+        with self._lock:
+            rollup = self._guilds.get(guild_id)
+        if rollup is not None:
+            return rollup
+        rows = self._load(guild_id)
+        with self._lock:
+            # Another thread may have loaded it while we were querying
+            if guild_id not in self._guilds:
+                rollup = GuildRollup(self._top_k)
+                rollup.seed(rows)
+                self._guilds[guild_id] = rollup
+            return self._guilds[guild_id]
+
+    def record(self, guild_id: str, user: str, channel_id: str,
+               word: Optional[str] = None, timestamp: Optional[datetime] = None) -> None:
+        rollup = self.get(guild_id)
+        timestamp = (timestamp or datetime.now(timezone.utc)).astimezone(timezone.utc)
+        with self._lock:
+            rollup.record(timestamp, user, channel_id, word)
+
+    def summary(self, guild_id: str, top_users: Optional[int] = None) -> Dict:
+        """Counts for analytics and the dashboard, read straight from memory"""
+        rollup = self.get(guild_id)
+        with self._lock:
+            return {
+                'version': rollup.version,
+                'total': rollup.total,
+                'daily': dict(sorted(rollup.daily.items())),
+                'hourly': dict(sorted(rollup.hourly.items())),
+                'channels': dict(rollup.channels.most_common()),
+                'words': dict(rollup.words.most_common()),
+                'users': dict(rollup.users.most_common(top_users)),
+            }
+
+    def version(self, guild_id: str) -> int:
+        with self._lock:
+            rollup = self._guilds.get(guild_id)
+            return rollup.version if rollup else 0
+
+    def flush(self) -> int:
+        """Write pending deltas for every guild; returns the number of rows written"""
+        with self._lock:
+            pending = {guild_id: rollup.take_pending() for guild_id, rollup in self._guilds.items()}
+        rows = [
+            (guild_id, dimension, bucket, delta)
+            for guild_id, deltas in pending.items()
+            for (dimension, bucket), delta in deltas.items()
+        ]
+        if not rows:
+            return 0
+        try:
+            self._flush(rows)
+        except Exception:
+            # Keep the deltas for the next attempt
+            with self._lock:
+                for guild_id, deltas in pending.items():
+                    self._guilds[guild_id].restore_pending(deltas)
+            raise
+        return len(rows)
+
+
+class RollupFlusher(Thread):
+    """Daemon thread that flushes a registry every ``interval`` seconds."""
+
+    def __init__(self, registry: RollupRegistry, interval: float = 60.0):
+        super().__init__(name="rollup-flush", daemon=True)
+        self.registry = registry
+        self.interval = interval
+        self._stopped = Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                self.registry.flush()
+            except Exception as e:
+                print(f"[WARNING] Rollup flush failed, will retry: {e}")
+
+    def stop(self) -> None:
+        self._stopped.set()
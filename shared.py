@@ -1 +1,3 @@
-guild_filters = {} 
\ No newline at end of file
+guild_filters = {} 
+# Compiled MessageGate per guild id (see message_gate.py)
+guild_gates = {}
@@ -0,0 +1,611 @@
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+# Columns of each table, shared by both backends. The SQLite backend also uses
+# these as a whitelist when building statements from row dicts.
+TABLE_COLUMNS = {
+    # swear_words here is the legacy JSON word list, NULL once moved to the swear_words table
+    'swear_data': ('guild_id', 'swear_words', 'allowed_channels'),
+    'swear_words': ('guild_id', 'word', 'added_by', 'added_at', 'version', 'deleted'),
+    'roles_data': ('guild_id', 'owner_id', 'allowed_roles', 'immune_roles'),
+    'guild_settings': ('guild_id', 'strict_mode', 'warning_message', 'cooldown_time',
+                       'max_warnings', 'logging_channel', 'retention_days'),
+    'moderation_logs': ('id', 'guild_id', 'user_id', 'username', 'discriminator',
+                        'channel_id', 'message', 'timestamp'),
+    'moderation_rollups': ('guild_id', 'dimension', 'bucket', 'count'),
+}
+
+# Per-guild config tables, keyed by guild_id
+CONFIG_TABLES = ('swear_data', 'roles_data', 'guild_settings')
+
+
+class StorageBackend:
+    """Row-level storage operations behind the database.py API.
+
+    Backends raise on failure; database.py owns caching, locking and turning
+    errors into the defaults its callers expect.
+    """
+    name = "base"
+
+    def fetch_row(self, table: str, guild_id: str) -> Optional[Dict]:
+        """Return the config row for one guild, or None if it has none"""
+        raise NotImplementedError
+
+    def fetch_rows(self, table: str, guild_ids: Optional[List[str]] = None) -> List[Dict]:
+        """Return config rows for the given guilds, or for every guild if None"""
+        raise NotImplementedError
+
+    def upsert_row(self, table: str, guild_id: str, row: Dict) -> None:
+        """Insert a guild's row, or update only the given columns if it exists"""
+        raise NotImplementedError
+
+    def insert_row_if_absent(self, table: str, guild_id: str, row: Dict) -> bool:
+        """Insert a guild's row unless one exists; returns whether it was inserted"""
+        raise NotImplementedError
+
+    def fetch_guild_config(self, guild_id: str) -> Dict[str, Optional[Dict]]:
+        """Return a guild's row from each of CONFIG_TABLES in one round-trip (None if absent).
+
+        The result also holds the guild's live swear_words rows under
+        'swear_words' (None if the backend could not include them).
+        """
+        raise NotImplementedError
+
+    def fetch_swear_words(self, guild_ids: List[str], since_version: int = 0) -> List[Dict]:
+        """Return swear_words rows of the given guilds changed after ``since_version``.
+
+        Rows are ordered by version. With ``since_version`` 0 only live words
+        are returned; otherwise removed words come back too, with ``deleted`` set.
+        """
+        raise NotImplementedError
+
+    def apply_swear_words(self, guild_id: str, added: List[str], removed: List[str],
+                          added_by: Optional[str] = None) -> None:
+        """Add and remove words of a guild's list atomically, under one new version.
+
+        Creates the guild's swear_data row if it has none. Words already
+        present (or already removed) are left as they are.
+        """
+        raise NotImplementedError
+
+    def migrate_swear_words(self, guild_id: str) -> int:
+        """Move a guild's legacy JSON word list into swear_words rows; returns words moved"""
+        raise NotImplementedError
+
+    def insert_log(self, log: Dict) -> bool:
+        """Append a moderation log entry; returns whether it was stored"""
+        raise NotImplementedError
+
+    def fetch_logs(self, guild_id: str, limit: int, after: Optional[Tuple[str, int]] = None,
+                   ascending: bool = False, user_id: Optional[str] = None,
+                   channel_id: Optional[str] = None, since: Optional[str] = None,
+                   until: Optional[str] = None) -> List[Dict]:
+        """Return up to ``limit`` log entries for a guild ordered by (timestamp, id).
+
+        Newest first unless ``ascending``. ``after`` is the (timestamp, id) of
+        the last row of the previous page; rows past it in the chosen order are
+        returned (keyset pagination). Filters are exact matches, and time bounds
+        are ISO-8601 timestamps for [since, until).
+        """
+        raise NotImplementedError
+
+    def delete_logs(self, guild_id: str, log_ids: List[int]) -> int:
+        """Delete a guild's log entries by id; returns how many were removed"""
+        raise NotImplementedError
+
+    def aggregate_logs(self, guild_id: str, since: Optional[str] = None,
+                       until: Optional[str] = None) -> Dict:
+        """Count a guild's log entries in [since, until) without fetching them.
+
+        Bounds are ISO-8601 timestamps. Returns ``{'total': int,
+        'daily': {'YYYY-MM-DD': count}, 'users': {'name#discriminator': count}}``.
+        """
+        raise NotImplementedError
+
+    def fetch_rollups(self, guild_id: str) -> List[Dict]:
+        """Return a guild's persisted rollup rows (dimension, bucket, count)"""
+        raise NotImplementedError
+
+    def increment_rollups(self, rows: List[Tuple[str, str, str, int]]) -> None:
+        """Add (guild_id, dimension, bucket, delta) rows to the rollup counts"""
+        raise NotImplementedError
+
+    def seed_rollups(self, guild_id: str, rows: List[Tuple[str, str, int]]) -> bool:
+        """Insert (dimension, bucket, count) rows for a guild that has no rollups yet.
+
+        Atomic per guild: if any rollup row exists (e.g. another process
+        backfilled first) nothing is written. Returns whether the rows were written.
+        """
+        raise NotImplementedError
+
+
+class SupabaseBackend(StorageBackend):
+    """Hosted Postgres via the Supabase client."""
+    name = "supabase"
+
+    # Guild IDs per `in` filter; keeps the PostgREST query string well under URL limits
+    PAGE_SIZE = 100
+
+    # Rows per swear_words request; at or below PostgREST's default max-rows
+    WORDS_PAGE_SIZE = 1000
+
+    def __init__(self, url: Optional[str] = None, key: Optional[str] = None,
+                 timeout: Optional[float] = None):
+        # Imported here so the SQLite backend works without the supabase package
+        import supabase
+        from supabase.lib.client_options import ClientOptions
+        # HTTP-level timeout so requests are abandoned rather than left hanging
+        options = ClientOptions(postgrest_client_timeout=timeout or float(os.getenv('STORAGE_TIMEOUT', '5')))
+        self.client = supabase.create_client(
+            url or os.getenv('SUPABASE_URL'), key or os.getenv('SUPABASE_KEY'), options=options
+        )
+
+    def fetch_row(self, table: str, guild_id: str) -> Optional[Dict]:
+        response = self.client.table(table).select('*').eq('guild_id', guild_id).execute()
+        return response.data[0] if response.data else None
+
+    def fetch_rows(self, table: str, guild_ids: Optional[List[str]] = None) -> List[Dict]:
+        if guild_ids is None:
+            return self.client.table(table).select('*').execute().data or []
+        rows = []
+        for start in range(0, len(guild_ids), self.PAGE_SIZE):
+            page = guild_ids[start:start + self.PAGE_SIZE]
+            rows.extend(self.client.table(table).select('*').in_('guild_id', page).execute().data or [])
+        return rows
+
+    def upsert_row(self, table: str, guild_id: str, row: Dict) -> None:
+        # Check if record exists
+        response = self.client.table(table).select('guild_id').eq('guild_id', guild_id).execute()
+        if response.data:
+            self.client.table(table).update(row).eq('guild_id', guild_id).execute()
+        else:
+            self.client.table(table).insert(row).execute()
+
+    def insert_row_if_absent(self, table: str, guild_id: str, row: Dict) -> bool:
+        # Single statement: INSERT ... ON CONFLICT (guild_id) DO NOTHING
+        response = self.client.table(table).upsert(
+            {**row, 'guild_id': guild_id}, on_conflict='guild_id', ignore_duplicates=True
+        ).execute()
+        return bool(response.data)
+
+    def fetch_guild_config(self, guild_id: str) -> Dict[str, Optional[Dict]]:
+        # All three rows and the word list in one call; see guild_config in supabase_functions.sql
+        result = self.client.rpc('guild_config', {'p_guild_id': guild_id}).execute().data or {}
+        return {**{table: result.get(table) for table in CONFIG_TABLES}, 'swear_words': result.get('swear_words')}
+
+    def fetch_swear_words(self, guild_ids: List[str], since_version: int = 0) -> List[Dict]:
+        rows = []
+        for start in range(0, len(guild_ids), self.PAGE_SIZE):
+            page = guild_ids[start:start + self.PAGE_SIZE]
+            offset = 0
+            while True:
+                # Query builders are mutable, so each page starts a fresh one
+                query = self.client.table('swear_words').select('*').in_('guild_id', page) \
+                    .gt('version', since_version)
+                if not since_version:
+                    query = query.eq('deleted', False)
+                batch = query.order('version').order('guild_id').order('word') \
+                    .range(offset, offset + self.WORDS_PAGE_SIZE - 1).execute().data or []
+                rows.extend(batch)
+                if len(batch) < self.WORDS_PAGE_SIZE:
+                    break
+                offset += self.WORDS_PAGE_SIZE
+        return rows
+
+    def apply_swear_words(self, guild_id: str, added: List[str], removed: List[str],
+                          added_by: Optional[str] = None) -> None:
+        # One transaction server-side; see apply_swear_words in supabase_functions.sql
+        self.client.rpc('apply_swear_words', {
+            'p_guild_id': guild_id, 'p_added': added, 'p_removed': removed, 'p_added_by': added_by
+        }).execute()
+
+    def migrate_swear_words(self, guild_id: str) -> int:
+        return self.client.rpc('migrate_swear_words', {'p_guild_id': guild_id}).execute().data or 0
+
+    def insert_log(self, log: Dict) -> bool:
+        response = self.client.table('moderation_logs').insert(log).execute()
+        return bool(getattr(response, 'data', None))
+
+    def fetch_logs(self, guild_id: str, limit: int, after: Optional[Tuple[str, int]] = None,
+                   ascending: bool = False, user_id: Optional[str] = None,
+                   channel_id: Optional[str] = None, since: Optional[str] = None,
+                   until: Optional[str] = None) -> List[Dict]:
+        query = self.client.table('moderation_logs').select('*').eq('guild_id', guild_id)
+        if user_id is not None:
+            query = query.eq('user_id', user_id)
+        if channel_id is not None:
+            query = query.eq('channel_id', channel_id)
+        if since is not None:
+            query = query.gte('timestamp', since)
+        if until is not None:
+            query = query.lt('timestamp', until)
+        if after is not None:
+            timestamp, log_id = after
+            op = 'gt' if ascending else 'lt'
+            # Row-value comparison (timestamp, id) > / < cursor, spelled out for PostgREST
+            query = query.or_(
+                f'timestamp.{op}."{timestamp}",and(timestamp.eq."{timestamp}",id.{op}.{int(log_id)})'
+            )
+        return query.order('timestamp', desc=not ascending).order('id', desc=not ascending) \
+            .limit(limit).execute().data or []
+
+    def delete_logs(self, guild_id: str, log_ids: List[int]) -> int:
+        deleted = 0
+        for start in range(0, len(log_ids), self.PAGE_SIZE):
+            page = log_ids[start:start + self.PAGE_SIZE]
+            response = self.client.table('moderation_logs').delete() \
+                .eq('guild_id', guild_id).in_('id', page).execute()
+            deleted += len(response.data or [])
+        return deleted
+
+    def aggregate_logs(self, guild_id: str, since: Optional[str] = None,
+                       until: Optional[str] = None) -> Dict:
+        # Grouping runs in Postgres; see moderation_log_counts in supabase_functions.sql
+        rows = self.client.rpc('moderation_log_counts', {
+            'p_guild_id': guild_id, 'p_since': since, 'p_until': until
+        }).execute().data or []
+        result = {'total': 0, 'daily': {}, 'users': {}}
+        for row in rows:
+            if row['kind'] == 'day':
+                result['daily'][row['bucket']] = row['count']
+                result['total'] += row['count']
+            else:
+                result['users'][row['bucket']] = row['count']
+        return result
+
+    def fetch_rollups(self, guild_id: str) -> List[Dict]:
+        return self.client.table('moderation_rollups').select('dimension, bucket, count') \
+            .eq('guild_id', guild_id).execute().data or []
+
+    def increment_rollups(self, rows: List[Tuple[str, str, str, int]]) -> None:
+        # Additive upsert in one round-trip; see increment_moderation_rollups in supabase_functions.sql
+        self.client.rpc('increment_moderation_rollups', {'p_rows': [
+            {'guild_id': guild_id, 'dimension': dimension, 'bucket': bucket, 'delta': delta}
+            for guild_id, dimension, bucket, delta in rows
+        ]}).execute()
+
+    def seed_rollups(self, guild_id: str, rows: List[Tuple[str, str, int]]) -> bool:
+        # Check and insert under a per-guild lock; see seed_moderation_rollups in supabase_functions.sql
+        return bool(self.client.rpc('seed_moderation_rollups', {'p_guild_id': guild_id, 'p_rows': [
+            {'dimension': dimension, 'bucket': bucket, 'count': count} for dimension, bucket, count in rows
+        ]}).execute().data)
+
+
+class SQLiteBackend(StorageBackend):
+    """Single-file local store for single-node deployments and load tests."""
+    name = "sqlite"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS swear_data (
+            guild_id TEXT PRIMARY KEY,
+            swear_words TEXT,
+            allowed_channels TEXT
+        );
+        CREATE TABLE IF NOT EXISTS roles_data (
+            guild_id TEXT PRIMARY KEY,
+            owner_id TEXT,
+            allowed_roles TEXT,
+            immune_roles TEXT
+        );
+        CREATE TABLE IF NOT EXISTS guild_settings (
+            guild_id TEXT PRIMARY KEY,
+            strict_mode INTEGER,
+            warning_message TEXT,
+            cooldown_time INTEGER,
+            max_warnings INTEGER,
+            logging_channel TEXT,
+            retention_days INTEGER
+        );
+        -- One row per filtered word. Removed words stay as tombstones (deleted = 1)
+        -- so readers can fetch everything changed after the version they hold.
+        CREATE TABLE IF NOT EXISTS swear_words (
+            guild_id TEXT NOT NULL,
+            word TEXT NOT NULL,
+            added_by TEXT,
+            added_at TEXT,
+            version INTEGER NOT NULL,
+            deleted INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (guild_id, word)
+        );
+        CREATE INDEX IF NOT EXISTS idx_swear_words_guild_version
+            ON swear_words (guild_id, version);
+        CREATE INDEX IF NOT EXISTS idx_swear_words_version
+            ON swear_words (version);
+        CREATE TABLE IF NOT EXISTS moderation_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id TEXT NOT NULL,
+            user_id TEXT,
+            username TEXT,
+            discriminator TEXT,
+            channel_id TEXT,
+            message TEXT,
+            timestamp TEXT NOT NULL
+        );
+        -- id is the rowid, so this index also serves (timestamp, id) keyset pagination
+        CREATE INDEX IF NOT EXISTS idx_moderation_logs_guild_time
+            ON moderation_logs (guild_id, timestamp);
+        CREATE TABLE IF NOT EXISTS moderation_rollups (
+            guild_id TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (guild_id, dimension, bucket)
+        );
+    """
+
+    # Columns added after the first release; existing files are altered on open
+    ADDED_COLUMNS = (
+        ('guild_settings', 'retention_days', 'INTEGER'),
+    )
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv('SQLITE_DB_PATH', 'moderator.db')
+        self._lock = Lock()
+        # Give up on a locked database file instead of waiting indefinitely
+        self._conn = sqlite3.connect(
+            self.path, timeout=float(os.getenv('STORAGE_TIMEOUT', '5')),
+            check_same_thread=False, isolation_level=None
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        for table, column, sql_type in self.ADDED_COLUMNS:
+            existing = {row['name'] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {sql_type}")
+
+    def _query(self, sql: str, params=()) -> List[Dict]:
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params).fetchall()]
+
+    @staticmethod
+    def _table(table: str) -> str:
+        """Reject unknown tables before their name is formatted into SQL"""
+        if table not in TABLE_COLUMNS:
+            raise ValueError(f"Unknown table: {table}")
+        return table
+
+    @staticmethod
+    def _columns(table: str, row: Dict) -> List[str]:
+        unknown = set(row) - set(TABLE_COLUMNS[table])
+        if unknown:
+            raise ValueError(f"Unknown columns for {table}: {sorted(unknown)}")
+        return list(row)
+
+    def fetch_row(self, table: str, guild_id: str) -> Optional[Dict]:
+        rows = self._query(f"SELECT * FROM {self._table(table)} WHERE guild_id = ?", (guild_id,))
+        return rows[0] if rows else None
+
+    def fetch_rows(self, table: str, guild_ids: Optional[List[str]] = None) -> List[Dict]:
+        table = self._table(table)
+        if guild_ids is None:
+            return self._query(f"SELECT * FROM {table}")
+        rows = []
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(guild_ids), 500):
+            page = guild_ids[start:start + 500]
+            placeholders = ", ".join("?" for _ in page)
+            rows.extend(self._query(f"SELECT * FROM {table} WHERE guild_id IN ({placeholders})", page))
+        return rows
+
+    def upsert_row(self, table: str, guild_id: str, row: Dict) -> None:
+        row = {**row, 'guild_id': guild_id}
+        columns = self._columns(table, row)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column != 'guild_id')
+        sql = (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT (guild_id) DO " + (f"UPDATE SET {updates}" if updates else "NOTHING")
+        )
+        with self._lock:
+            self._conn.execute(sql, [row[column] for column in columns])
+
+    def insert_row_if_absent(self, table: str, guild_id: str, row: Dict) -> bool:
+        row = {**row, 'guild_id': guild_id}
+        columns = self._columns(self._table(table), row)
+        sql = (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT (guild_id) DO NOTHING"
+        )
+        with self._lock:
+            return self._conn.execute(sql, [row[column] for column in columns]).rowcount == 1
+
+    def fetch_guild_config(self, guild_id: str) -> Dict[str, Optional[Dict]]:
+        # One row: each table's columns prefixed with its alias, joined on guild_id
+        aliases = {table: f"t{i}" for i, table in enumerate(CONFIG_TABLES)}
+        select = ", ".join(
+            f"{alias}.{column} AS {alias}_{column}"
+            for table, alias in aliases.items() for column in TABLE_COLUMNS[table]
+        )
+        joins = " ".join(
+            f"LEFT JOIN {table} {alias} ON {alias}.guild_id = k.guild_id" for table, alias in aliases.items()
+        )
+        row = self._query(f"SELECT {select} FROM (SELECT ? AS guild_id) k {joins}", (guild_id,))[0]
+        result = {
+            table: {column: row[f"{alias}_{column}"] for column in TABLE_COLUMNS[table]}
+            if row[f"{alias}_guild_id"] is not None else None
+            for table, alias in aliases.items()
+        }
+        result['swear_words'] = self.fetch_swear_words([guild_id])
+        return result
+
+    def fetch_swear_words(self, guild_ids: List[str], since_version: int = 0) -> List[Dict]:
+        live_only = "" if since_version else " AND deleted = 0"
+        rows = []
+        for start in range(0, len(guild_ids), 500):
+            page = guild_ids[start:start + 500]
+            placeholders = ", ".join("?" for _ in page)
+            rows.extend(self._query(
+                f"SELECT * FROM swear_words WHERE guild_id IN ({placeholders}) AND version > ?{live_only} "
+                f"ORDER BY version, guild_id, word",
+                page + [since_version]
+            ))
+        return rows
+
+    def _write_words(self, guild_id: str, added: List[str], removed: List[str],
+                     added_by: Optional[str]) -> None:
+        """Apply a word delta under the next version; call inside a write transaction"""
+        version = self._conn.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM swear_words").fetchone()[0]
+        now = datetime.now(timezone.utc).isoformat()
+        self._conn.executemany(
+            "INSERT INTO swear_words (guild_id, word, added_by, added_at, version, deleted) "
+            "VALUES (?, ?, ?, ?, ?, 0) ON CONFLICT (guild_id, word) DO UPDATE SET "
+            "added_by = excluded.added_by, added_at = excluded.added_at, "
+            "version = excluded.version, deleted = 0 WHERE swear_words.deleted = 1",
+            [(guild_id, word, added_by, now, version) for word in added]
+        )
+        self._conn.executemany(
+            "UPDATE swear_words SET deleted = 1, version = ? WHERE guild_id = ? AND word = ? AND deleted = 0",
+            [(version, guild_id, word) for word in removed]
+        )
+
+    def apply_swear_words(self, guild_id: str, added: List[str], removed: List[str],
+                          added_by: Optional[str] = None) -> None:
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so versions never interleave
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT INTO swear_data (guild_id, allowed_channels) VALUES (?, '[]') "
+                    "ON CONFLICT (guild_id) DO NOTHING", (guild_id,)
+                )
+                self._write_words(guild_id, added, removed, added_by)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def migrate_swear_words(self, guild_id: str) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT swear_words FROM swear_data WHERE guild_id = ?", (guild_id,)
+                ).fetchone()
+                words = json.loads(row['swear_words']) if row and row['swear_words'] else []
+                if words:
+                    self._write_words(guild_id, words, [], None)
+                if row is not None:
+                    self._conn.execute("UPDATE swear_data SET swear_words = NULL WHERE guild_id = ?", (guild_id,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(words)
+
+    def insert_log(self, log: Dict) -> bool:
+        columns = self._columns('moderation_logs', log)
+        sql = f"INSERT INTO moderation_logs ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+        with self._lock:
+            return self._conn.execute(sql, [log[column] for column in columns]).rowcount == 1
+
+    def fetch_logs(self, guild_id: str, limit: int, after: Optional[Tuple[str, int]] = None,
+                   ascending: bool = False, user_id: Optional[str] = None,
+                   channel_id: Optional[str] = None, since: Optional[str] = None,
+                   until: Optional[str] = None) -> List[Dict]:
+        where, params = ["guild_id = ?"], [guild_id]
+        for clause, value in (("user_id = ?", user_id), ("channel_id = ?", channel_id),
+                              ("timestamp >= ?", since), ("timestamp < ?", until)):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        if after is not None:
+            # Row values compare lexicographically, so this seeks straight into the index
+            where.append(f"(timestamp, id) {'>' if ascending else '<'} (?, ?)")
+            params.extend([after[0], int(after[1])])
+        direction = "ASC" if ascending else "DESC"
+        return self._query(
+            f"SELECT * FROM moderation_logs WHERE {' AND '.join(where)} "
+            f"ORDER BY timestamp {direction}, id {direction} LIMIT ?",
+            params + [limit]
+        )
+
+    def delete_logs(self, guild_id: str, log_ids: List[int]) -> int:
+        deleted = 0
+        with self._lock:
+            for start in range(0, len(log_ids), 500):
+                page = [int(log_id) for log_id in log_ids[start:start + 500]]
+                placeholders = ", ".join("?" for _ in page)
+                deleted += self._conn.execute(
+                    f"DELETE FROM moderation_logs WHERE guild_id = ? AND id IN ({placeholders})",
+                    [guild_id] + page
+                ).rowcount
+        return deleted
+
+    def aggregate_logs(self, guild_id: str, since: Optional[str] = None,
+                       until: Optional[str] = None) -> Dict:
+        where = "guild_id = ? AND timestamp >= ? AND timestamp < ?"
+        # Open bounds as values that sort before/after any ISO timestamp
+        params = (guild_id, since or "", until or "\uffff")
+        daily = self._query(
+            f"SELECT substr(timestamp, 1, 10) AS day, COUNT(*) AS count FROM moderation_logs "
+            f"WHERE {where} GROUP BY day ORDER BY day", params
+        )
+        users = self._query(
+            f"SELECT username, discriminator, COUNT(*) AS count FROM moderation_logs "
+            f"WHERE {where} GROUP BY username, discriminator", params
+        )
+        return {
+            'total': sum(row['count'] for row in daily),
+            'daily': {row['day']: row['count'] for row in daily},
+            'users': {f"{row['username']}#{row['discriminator']}": row['count'] for row in users}
+        }
+
+
+    def fetch_rollups(self, guild_id: str) -> List[Dict]:
+        return self._query(
+            "SELECT dimension, bucket, count FROM moderation_rollups WHERE guild_id = ?", (guild_id,)
+        )
+
+    def increment_rollups(self, rows: List[Tuple[str, str, str, int]]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO moderation_rollups (guild_id, dimension, bucket, count) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (guild_id, dimension, bucket) DO UPDATE SET count = count + excluded.count",
+                    rows
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def seed_rollups(self, guild_id: str, rows: List[Tuple[str, str, int]]) -> bool:
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so other processes cannot seed in between
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = self._conn.execute(
+                    "SELECT 1 FROM moderation_rollups WHERE guild_id = ? LIMIT 1", (guild_id,)
+                ).fetchone()
+                if existing:
+                    self._conn.execute("ROLLBACK")
+                    return False
+                self._conn.executemany(
+                    "INSERT INTO moderation_rollups (guild_id, dimension, bucket, count) VALUES (?, ?, ?, ?)",
+                    [(guild_id, dimension, bucket, count) for dimension, bucket, count in rows]
+                )
+                self._conn.execute("COMMIT")
+                return True
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+
+BACKENDS = {
+    SupabaseBackend.name: SupabaseBackend,
+    SQLiteBackend.name: SQLiteBackend,
+}
+
+
+def create_backend(name: Optional[str] = None) -> StorageBackend:
+    """Create the backend named by ``name`` or the STORAGE_BACKEND env var (default: supabase)"""
+    name = (name or os.getenv('STORAGE_BACKEND', 'supabase')).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown STORAGE_BACKEND '{name}', expected one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
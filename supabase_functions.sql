@@ -0,0 +1,170 @@
+-- Postgres functions used by the Supabase storage backend.
+-- Run once in the Supabase SQL editor, alongside the table definitions.
+
+-- Per-day and per-user violation counts for get_analytics.
+-- Returns one row per bucket: kind = 'day' (bucket = YYYY-MM-DD) or
+-- kind = 'user' (bucket = username#discriminator). NULL bounds are open.
+create or replace function moderation_log_counts(
+    p_guild_id text,
+    p_since timestamptz default null,
+    p_until timestamptz default null
+)
+returns table (kind text, bucket text, count bigint)
+language sql stable
+as $$
+    with logs as (
+        select username, discriminator, "timestamp"::timestamptz as ts
+        from moderation_logs
+        where guild_id = p_guild_id
+          and (p_since is null or "timestamp"::timestamptz >= p_since)
+          and (p_until is null or "timestamp"::timestamptz < p_until)
+    )
+    select 'day', to_char(ts at time zone 'UTC', 'YYYY-MM-DD'), count(*)
+    from logs group by 2
+    union all
+    select 'user', username || '#' || coalesce(discriminator, 'None'), count(*)
+    from logs group by 2;
+$$;
+
+create index if not exists idx_moderation_logs_guild_time
+    on moderation_logs (guild_id, "timestamp");
+
+-- Keyset pagination in get_violation_logs / log export orders by (timestamp, id).
+create index if not exists idx_moderation_logs_guild_time_id
+    on moderation_logs (guild_id, "timestamp", id);
+
+-- Incremental rollup counters maintained by the violation path (rollups.py).
+create table if not exists moderation_rollups (
+    guild_id text not null,
+    dimension text not null,
+    bucket text not null,
+    count bigint not null default 0,
+    primary key (guild_id, dimension, bucket)
+);
+
+-- Adds a batch of {guild_id, dimension, bucket, delta} objects in one call.
+create or replace function increment_moderation_rollups(p_rows jsonb)
+returns void
+language sql
+as $$
+    insert into moderation_rollups as r (guild_id, dimension, bucket, count)
+    select x->>'guild_id', x->>'dimension', x->>'bucket', (x->>'delta')::bigint
+    from jsonb_array_elements(p_rows) as x
+    on conflict (guild_id, dimension, bucket)
+    do update set count = r.count + excluded.count;
+$$;
+
+-- Writes a guild's backfilled {dimension, bucket, count} rows only if it has no
+-- rollups yet. The advisory lock makes check-and-insert atomic per guild, so
+-- two processes backfilling at once cannot both add the counts.
+create or replace function seed_moderation_rollups(p_guild_id text, p_rows jsonb)
+returns boolean
+language plpgsql
+as $$
+begin
+    perform pg_advisory_xact_lock(hashtext('moderation_rollups:' || p_guild_id));
+    if exists (select 1 from moderation_rollups where guild_id = p_guild_id) then
+        return false;
+    end if;
+    insert into moderation_rollups (guild_id, dimension, bucket, count)
+    select p_guild_id, x->>'dimension', x->>'bucket', (x->>'count')::bigint
+    from jsonb_array_elements(p_rows) as x;
+    return true;
+end;
+$$;
+
+-- Per-guild log retention in days (NULL = LOG_RETENTION_DAYS default); see retention.py.
+alter table guild_settings add column if not exists retention_days integer;
+
+-- One row per filtered word (replaces the JSON list in swear_data.swear_words,
+-- which migrate_swear_words empties guild by guild). Removed words stay as
+-- tombstones so readers can fetch every change after the version they hold.
+create sequence if not exists swear_words_version_seq;
+
+create table if not exists swear_words (
+    guild_id text not null,
+    word text not null,
+    added_by text,
+    added_at timestamptz not null default now(),
+    version bigint not null,
+    deleted boolean not null default false,
+    primary key (guild_id, word)
+);
+
+create index if not exists idx_swear_words_guild_version
+    on swear_words (guild_id, version);
+
+-- Adds and removes words under one new version. The guild's swear_data row is
+-- locked first, so a guild's versions always commit in order.
+create or replace function apply_swear_words(
+    p_guild_id text,
+    p_added text[],
+    p_removed text[],
+    p_added_by text default null
+)
+returns bigint
+language plpgsql
+as $$
+declare
+    v bigint;
+begin
+    insert into swear_data (guild_id, allowed_channels) values (p_guild_id, '[]')
+    on conflict (guild_id) do nothing;
+    perform 1 from swear_data where guild_id = p_guild_id for update;
+    v := nextval('swear_words_version_seq');
+
+    insert into swear_words as w (guild_id, word, added_by, version)
+    select p_guild_id, word, p_added_by, v from unnest(coalesce(p_added, '{}')) as word
+    on conflict (guild_id, word) do update
+        set added_by = excluded.added_by, added_at = now(), version = v, deleted = false
+        where w.deleted;
+
+    update swear_words set deleted = true, version = v
+    where guild_id = p_guild_id and word = any(coalesce(p_removed, '{}')) and not deleted;
+    return v;
+end;
+$$;
+
+-- Moves a guild's legacy JSON word list into swear_words and clears it.
+-- Safe to call repeatedly; returns the number of words moved.
+create or replace function migrate_swear_words(p_guild_id text)
+returns integer
+language plpgsql
+as $$
+declare
+    legacy text;
+    v bigint;
+    moved integer := 0;
+begin
+    select swear_words into legacy from swear_data where guild_id = p_guild_id for update;
+    if legacy is null then
+        return 0;
+    end if;
+    v := nextval('swear_words_version_seq');
+    insert into swear_words (guild_id, word, version)
+    select p_guild_id, word, v
+    from jsonb_array_elements_text(legacy::jsonb) as word
+    on conflict (guild_id, word) do nothing;
+    get diagnostics moved = row_count;
+    update swear_data set swear_words = null where guild_id = p_guild_id;
+    return moved;
+end;
+$$;
+
+-- A guild's swear_data, roles_data and guild_settings rows plus its live
+-- swear_words in one round-trip (GuildConfig in database.py). Missing rows
+-- come back as JSON null.
+create or replace function guild_config(p_guild_id text)
+returns jsonb
+language sql stable
+as $$
+    select jsonb_build_object(
+        'swear_data', (select to_jsonb(s) from swear_data s where s.guild_id = p_guild_id),
+        'roles_data', (select to_jsonb(r) from roles_data r where r.guild_id = p_guild_id),
+        'guild_settings', (select to_jsonb(g) from guild_settings g where g.guild_id = p_guild_id),
+        'swear_words', (
+            select coalesce(jsonb_agg(to_jsonb(w) order by w.version, w.word), '[]'::jsonb)
+            from swear_words w where w.guild_id = p_guild_id and not w.deleted
+        )
+    );
+$$;
@@ -4,7 +4,7 @@ from collections import defaultdict
 from itertools import product
 import time
 import unicodedata
-from typing import List, Dict, Set, Optional
+from typing import List, Dict, Set, Optional, Union
 from functools import lru_cache
 from langdetect import detect, LangDetectException
 import nltk
@@ -427,11 +427,15 @@ class SwearFilter:
     async def _get_cached_result(self, message: str):
         return self.message_cache.get(message)
 
-    async def _cache_message_result(self, message: str, result: bool):
+    async def _cache_message_result(self, message: str, result: Union[str, bool]):
         async with self.cache_lock:
-            if len(self.message_cache) >= self.cache_max_size:
-                self.message_cache.pop(next(iter(self.message_cache)))
-            self.message_cache[message] = result
+            self._remember(message, result)
+
+    def _remember(self, message: str, result: Union[str, bool]) -> None:
+        # No await between the size check and the insert, so this needs no lock on the event loop
+        if len(self.message_cache) >= self.cache_max_size:
+            self.message_cache.pop(next(iter(self.message_cache)))
+        self.message_cache[message] = result
 
     def _check_context(self, message: str, word: str) -> bool:
         return False  # Hook for context-aware rules if needed
@@ -545,20 +549,29 @@ class SwearFilter:
             return True
             
     async def contains_swear_word(self, message: str) -> bool:
-        if cached := await self._get_cached_result(message):
+        return await self.find_swear_word(message) is not None
+
+    async def find_swear_word(self, message: str) -> Optional[str]:
+        """Return the filtered word (or flagged token) a message matches, or None"""
+        return self.match(message)
+
+    def match(self, message: str) -> Optional[str]:
+        """Synchronous core of find_swear_word; never yields to the event loop"""
+        if cached := self.message_cache.get(message):
             return cached
 
         if not message or not self.swear_words:
-            await self._cache_message_result(message, False)
-            return False
+            self._remember(message, False)
+            return None
 
         # === RAW token expansion
         words_raw = re.findall(r'\S+', message)
         for word in words_raw:
             variants = expand_all_normalizations(word)
-            if any(v in self.swear_words for v in variants):
-                await self._cache_message_result(message, True)
-                return True
+            matched = next((v for v in variants if v in self.swear_words), None)
+            if matched:
+                self._remember(message, matched)
+                return matched
 
         # === Full normalization
         normalized = preprocess_text_for_filtering(message)
@@ -567,15 +580,15 @@ class SwearFilter:
         # === Safe word bypass
         for word in words_in_message:
             if word in self.safe_words and word not in self.swear_words:
-                await self._cache_message_result(message, False)
-                return False
+                self._remember(message, False)
+                return None
 
         # === Direct match
         for word in words_in_message:
             if word in self.swear_words:
                 if not self._check_context(message, word):
-                    await self._cache_message_result(message, True)
-                    return True
+                    self._remember(message, word)
+                    return word
 
         # === Root + suffix match
         for word in words_in_message:
@@ -587,26 +600,26 @@ class SwearFilter:
                     if swear in variants:
                         suffix_len = len(word) - (i + len(swear))
                         if suffix_len <= 3 and not self._check_context(message, word):
-                            await self._cache_message_result(message, True)
-                            return True
+                            self._remember(message, swear)
+                            return swear
 
         # === Short-form swears
         if (len(words_in_message) == 1 and
             len(words_in_message[0]) <= 3 and
             words_in_message[0] in SHORT_SWEARS):
-            await self._cache_message_result(message, True)
-            return True
+            self._remember(message, words_in_message[0])
+            return words_in_message[0]
 
         # === Phonetic fallback
         phonetic = simple_metaphone(normalized)
         for swear in self.swear_words:
             if simple_metaphone(swear) in phonetic:
                 if not self._check_context(message, swear):
-                    await self._cache_message_result(message, True)
-                    return True
+                    self._remember(message, swear)
+                    return swear
 
-        await self._cache_message_result(message, False)
-        return False
+        self._remember(message, False)
+        return None
     async def _update_cache(self, key: str, value: bool):
         """Thread-safe cache update"""
         async with self.cache_lock:
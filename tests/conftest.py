@@ -0,0 +1,17 @@
+import os
+import sys
+import tempfile
+
+# The bot's modules live flat in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# database.py builds its backend and local tier from the environment on
+# import: point both at throwaway SQLite files and fail storage calls fast
+_scratch = tempfile.mkdtemp(prefix="moderator-tests-")
+os.environ.update({
+    'STORAGE_BACKEND': 'sqlite',
+    'SQLITE_DB_PATH': os.path.join(_scratch, 'moderator.db'),
+    'LOCAL_CONFIG_DB': os.path.join(_scratch, 'config_cache.db'),
+    'LOG_ARCHIVE_DIR': os.path.join(_scratch, 'log_archive'),
+    'STORAGE_RETRIES': '0',
+})
@@ -0,0 +1,140 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from coalescing import BatchLoader, SingleFlight
+
+
+def _loader(batches, **options):
+    def batch_fn(items):
+        batches.append(sorted(items))
+        return {item: item * 10 for item in items if item >= 0}
+    return BatchLoader('test', batch_fn, key_fn=lambda item: item, **options)
+
+
+def test_loads_in_one_tick_share_one_batch():
+    batches = []
+    loader = _loader(batches)
+
+    async def main():
+        return await asyncio.gather(loader.load(1), loader.load(2), loader.load(1), loader.load(3))
+
+    assert asyncio.run(main()) == [10, 20, 10, 30]
+    assert batches == [[1, 2, 3]]
+
+
+def test_later_loads_get_a_new_batch():
+    batches = []
+    loader = _loader(batches)
+
+    async def main():
+        first = await loader.load(1)
+        second = await loader.load(1)
+        return first, second
+
+    assert asyncio.run(main()) == (10, 10)
+    assert batches == [[1], [1]]
+
+
+def test_peek_hits_skip_the_batch():
+    batches = []
+    loader = _loader(batches, peek=lambda key: 'cached' if key == 1 else None)
+
+    async def main():
+        return await loader.load_many([1, 2])
+
+    assert asyncio.run(main()) == ['cached', 20]
+    assert batches == [[2]]
+
+
+def test_batches_are_split_at_max_batch():
+    batches = []
+    loader = _loader(batches, max_batch=2)
+
+    async def main():
+        return await loader.load_many([1, 2, 3, 4, 5])
+
+    assert asyncio.run(main()) == [10, 20, 30, 40, 50]
+    assert sorted(map(len, batches)) == [1, 2, 2]
+
+
+def test_missing_keys_and_failures_reach_every_waiter():
+    loader = _loader([])
+
+    async def missing():
+        return await asyncio.gather(loader.load(-1), loader.load(1), return_exceptions=True)
+
+    error, value = asyncio.run(missing())
+    assert isinstance(error, KeyError) and value == 10
+
+    def broken(items):
+        raise ConnectionError("backend unreachable")
+    failing = BatchLoader('test', broken, key_fn=lambda item: item)
+
+    async def failed():
+        return await asyncio.gather(failing.load(1), failing.load(1), return_exceptions=True)
+
+    assert all(isinstance(result, ConnectionError) for result in asyncio.run(failed()))
+
+
+def test_cancelled_waiter_does_not_cancel_shared_load():
+    loader = _loader([])
+
+    async def main():
+        first = asyncio.ensure_future(loader.load(1))
+        second = asyncio.ensure_future(loader.load(1))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == 10
+
+
+def _concurrent_calls(flight, fn, callers=4):
+    """Run ``do`` from several threads while the first call is still in flight"""
+    started, release = threading.Event(), threading.Event()
+    results, errors = [], []
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return fn()
+
+    def call():
+        try:
+            results.append(flight.do('key', slow))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    return results, errors
+
+
+def test_singleflight_shares_one_execution():
+    calls = []
+    results, errors = _concurrent_calls(SingleFlight('test'), lambda: calls.append(1) or len(calls))
+
+    assert calls == [1]
+    assert results == [1, 1, 1, 1] and errors == []
+
+
+def test_singleflight_shares_errors_and_keeps_nothing():
+    flight = SingleFlight('test')
+
+    def fail():
+        raise ConnectionError("backend unreachable")
+    results, errors = _concurrent_calls(flight, fail)
+
+    assert results == [] and len(errors) == 4
+    assert all(isinstance(error, ConnectionError) for error in errors)
+    assert flight.do('key', lambda: 'fresh') == 'fresh'
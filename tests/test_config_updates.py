@@ -0,0 +1,90 @@
+import pytest
+
+pytest.importorskip("dotenv")
+
+import database
+from models import RolesData
+
+
+def _forget(guild_id):
+    """Drop every cached copy of a guild's config so the next read hits the backend"""
+    database.invalidate_config(guild_id, remote=True)
+    database._last_known_config.pop(str(guild_id), None)
+
+
+def _fail_reads(monkeypatch):
+    def fetch_row(table, guild_id):
+        raise ConnectionError("backend unreachable")
+    monkeypatch.setattr(database.backend, 'fetch_row', fetch_row)
+
+
+def test_roles_update_refused_when_read_fails(monkeypatch):
+    assert database.save_roles_data('1001', RolesData(owner_id=5, allowed_roles={10}))
+    _forget('1001')
+    _fail_reads(monkeypatch)
+
+    calls = []
+    result = database.update_roles_data('1001', lambda data: calls.append(data) or data.replace(immune_roles={20}))
+
+    assert result is None
+    assert calls == []
+    monkeypatch.undo()
+    _forget('1001')
+    assert database.load_roles_data('1001') == RolesData(owner_id=5, allowed_roles={10})
+
+
+def test_roles_update_refused_when_only_stale_copy_served(monkeypatch):
+    assert database.save_roles_data('1002', RolesData(owner_id=5, allowed_roles={10}))
+    database.get_guild_config('1002')
+    database.invalidate_config('1002', remote=True)
+    _fail_reads(monkeypatch)
+
+    assert database.update_roles_data('1002', lambda data: data.replace(allowed_roles=set())) is None
+    monkeypatch.undo()
+    _forget('1002')
+    assert database.load_roles_data('1002').allowed_roles == {10}
+
+
+def test_roles_update_starts_from_default_for_new_guild():
+    _forget('1003')
+
+    result = database.update_roles_data('1003', lambda data: data.replace(allowed_roles={7}))
+
+    assert result == RolesData(allowed_roles={7})
+    _forget('1003')
+    assert database.load_roles_data('1003') == RolesData(allowed_roles={7})
+
+
+def test_settings_read_failure_serves_last_known_settings(monkeypatch):
+    assert database.save_guild_settings('1004', {'cooldown_time': 15, 'max_warnings': 5})
+    database.get_guild_config('1004')
+    database.invalidate_config('1004', remote=True)
+    _fail_reads(monkeypatch)
+
+    settings = database.load_guild_settings('1004')
+
+    assert settings['cooldown_time'] == 15
+    assert settings['max_warnings'] == 5
+
+
+def test_swear_update_refused_when_read_fails(monkeypatch):
+    assert database.update_swear_data('1005', lambda data: data.replace(swear_words={'darn', 'heck'}))
+    _forget('1005')
+    _fail_reads(monkeypatch)
+
+    assert database.update_swear_data('1005', lambda data: data.replace(swear_words={'shoot'})) is None
+    monkeypatch.undo()
+    _forget('1005')
+    assert database.load_swear_data('1005').swear_words == {'darn', 'heck'}
+
+
+def test_swear_update_keeps_words_added_elsewhere():
+    assert database.update_swear_data('1006', lambda data: data.replace(swear_words={'darn'}))
+    # Another process adds a word this one has not seen yet
+    database.backend.apply_swear_words('1006', ['heck'], [])
+
+    result = database.update_swear_data('1006', lambda data: data.replace(swear_words=data.swear_words | {'shoot'}))
+
+    assert result.swear_words >= {'darn', 'shoot'}
+    _forget('1006')
+    assert database.load_swear_data('1006').swear_words == {'darn', 'heck', 'shoot'}
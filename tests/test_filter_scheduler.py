@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import pytest
+
+from filter_scheduler import FilterScheduler, GuildBacklogged
+
+
+def _check(order, guild_id, n, cpu=0.0):
+    def check():
+        deadline = time.thread_time() + cpu
+        while time.thread_time() < deadline:
+            pass
+        order.append((guild_id, n))
+        return n
+    return check
+
+
+async def _run(scheduler, jobs):
+    """Submit (guild_id, check) pairs in one go and wait for every result"""
+    try:
+        return await asyncio.gather(*(scheduler.submit(guild_id, check) for guild_id, check in jobs))
+    finally:
+        await scheduler.close()
+
+
+def test_guilds_take_turns():
+    order = []
+    jobs = [(1, _check(order, 1, n)) for n in range(4)] + [(2, _check(order, 2, n)) for n in range(2)]
+
+    assert asyncio.run(_run(FilterScheduler(workers=1), jobs)) == [0, 1, 2, 3, 0, 1]
+    assert order == [(1, 0), (2, 0), (1, 1), (2, 1), (1, 2), (1, 3)]
+
+
+def test_weight_sets_messages_per_turn():
+    order = []
+    jobs = [(1, _check(order, 1, n)) for n in range(4)] + [(2, _check(order, 2, n)) for n in range(2)]
+
+    asyncio.run(_run(FilterScheduler(workers=1, weights={1: 2}), jobs))
+
+    assert [guild_id for guild_id, _ in order] == [1, 1, 2, 1, 1, 2]
+
+
+def test_guild_is_never_scheduled_twice():
+    scheduler, seen = FilterScheduler(workers=4), []
+
+    def check(n):
+        def run():
+            # While a guild is being served it must not also be waiting in the ready queue
+            seen.append((n, list(scheduler._ready).count(1)))
+            return n
+        return run
+
+    results = asyncio.run(_run(scheduler, [(1, check(n)) for n in range(10)]))
+
+    assert results == list(range(10))
+    assert seen == [(n, 0) for n in range(10)]
+
+
+def test_guild_over_budget_waits_for_next_interval():
+    order = []
+    scheduler = FilterScheduler(workers=1, budget=0.001, interval=0.2)
+    jobs = [(1, _check(order, 1, n, cpu=0.005)) for n in range(2)] + [(2, _check(order, 2, n)) for n in range(3)]
+
+    async def main():
+        pending = [scheduler.submit(guild_id, check) for guild_id, check in jobs]
+        await asyncio.sleep(0.05)
+        throttled = {stats['guild_id']: stats['throttled'] for stats in scheduler.stats()}
+        await asyncio.gather(*pending)
+        await scheduler.close()
+        return throttled
+
+    assert asyncio.run(main()) == {1: True, 2: False}
+    assert order == [(1, 0), (2, 0), (2, 1), (2, 2), (1, 1)]
+
+
+def test_full_guild_queue_refuses_new_messages():
+    async def main():
+        scheduler = FilterScheduler(workers=1, max_queue=2)
+        accepted = [scheduler.submit(1, lambda: None) for _ in range(2)]
+        with pytest.raises(GuildBacklogged):
+            scheduler.submit(1, lambda: None)
+        other = scheduler.submit(2, lambda: 'other guild')
+        results = await asyncio.gather(*accepted, other)
+        await scheduler.close()
+        return results
+
+    assert asyncio.run(main()) == [None, None, 'other guild']
+
+
+def test_failing_check_reaches_caller_and_worker_carries_on():
+    def fail():
+        raise ValueError("bad pattern")
+
+    async def main():
+        scheduler = FilterScheduler(workers=1)
+        results = await asyncio.gather(scheduler.submit(1, fail), scheduler.submit(1, lambda: 'next'),
+                                       return_exceptions=True)
+        await scheduler.close()
+        return results
+
+    error, result = asyncio.run(main())
+    assert isinstance(error, ValueError) and result == 'next'
@@ -0,0 +1,108 @@
+import asyncio
+
+from outbound import OutboundScheduler, Priority
+
+
+class Calls:
+    """Records the order actions ran in; ``gate`` holds the first one until released"""
+
+    def __init__(self):
+        self.order = []
+        self.gate = asyncio.Event()
+
+    def action(self, name, wait=False):
+        async def run():
+            if wait:
+                await self.gate.wait()
+            self.order.append(name)
+            return name
+        return run
+
+
+def _outcomes(results):
+    return [type(result).__name__ if isinstance(result, Exception) else result for result in results]
+
+
+def test_route_runs_most_urgent_work_first():
+    async def main():
+        scheduler, calls = OutboundScheduler(), Calls()
+        futures = [scheduler.submit('chan', Priority.AUDIT, calls.action('busy', wait=True))]
+        await asyncio.sleep(0)
+        for name, priority in (('cosmetic', Priority.COSMETIC), ('audit', Priority.AUDIT),
+                               ('delete', Priority.DELETE), ('warning', Priority.WARNING)):
+            futures.append(scheduler.submit('chan', priority, calls.action(name)))
+        calls.gate.set()
+        await asyncio.gather(*futures)
+        return calls.order
+
+    assert asyncio.run(main()) == ['busy', 'delete', 'warning', 'audit', 'cosmetic']
+
+
+def test_newer_work_replaces_queued_work_with_same_merge_key():
+    async def main():
+        scheduler, calls = OutboundScheduler(), Calls()
+        busy = scheduler.submit('chan', Priority.AUDIT, calls.action('busy', wait=True))
+        await asyncio.sleep(0)
+        older = scheduler.submit('chan', Priority.COSMETIC, calls.action('older'), merge_key='status')
+        newer = scheduler.submit('chan', Priority.COSMETIC, calls.action('newer'), merge_key='status')
+        calls.gate.set()
+        return _outcomes(await asyncio.gather(busy, older, newer, return_exceptions=True)), calls.order
+
+    assert asyncio.run(main()) == (['busy', 'Dropped', 'newer'], ['busy', 'newer'])
+
+
+def test_full_route_sheds_least_urgent_work_but_never_deletes():
+    async def main():
+        scheduler, calls = OutboundScheduler(max_queue=2), Calls()
+        futures = [scheduler.submit('chan', Priority.AUDIT, calls.action('busy', wait=True))]
+        await asyncio.sleep(0)
+        for name, priority in (('audit', Priority.AUDIT), ('cosmetic', Priority.COSMETIC),
+                               ('delete1', Priority.DELETE), ('warning', Priority.WARNING),
+                               ('delete2', Priority.DELETE)):
+            futures.append(scheduler.submit('chan', priority, calls.action(name)))
+        calls.gate.set()
+        return _outcomes(await asyncio.gather(*futures, return_exceptions=True))
+
+    assert asyncio.run(main()) == ['busy', 'Dropped', 'Dropped', 'delete1', 'warning', 'delete2']
+
+
+def test_stale_cosmetic_work_is_skipped():
+    async def main():
+        scheduler, calls = OutboundScheduler(stale_after=0.01), Calls()
+        busy = scheduler.submit('chan', Priority.AUDIT, calls.action('busy', wait=True))
+        await asyncio.sleep(0)
+        cosmetic = scheduler.submit('chan', Priority.COSMETIC, calls.action('cosmetic'))
+        audit = scheduler.submit('chan', Priority.AUDIT, calls.action('audit'))
+        await asyncio.sleep(0.02)
+        calls.gate.set()
+        return _outcomes(await asyncio.gather(busy, cosmetic, audit, return_exceptions=True))
+
+    assert asyncio.run(main()) == ['busy', 'Dropped', 'audit']
+
+
+def test_cancelled_caller_does_not_stop_the_route():
+    async def main():
+        scheduler, calls = OutboundScheduler(), Calls()
+        caller = asyncio.ensure_future(scheduler.run('chan', Priority.WARNING, calls.action('warning', wait=True)))
+        await asyncio.sleep(0.01)
+        after = scheduler.submit('chan', Priority.DELETE, calls.action('delete'))
+        await asyncio.sleep(0)
+        caller.cancel()
+        calls.gate.set()
+        return await asyncio.wait_for(after, 1), calls.order
+
+    assert asyncio.run(main()) == ('delete', ['warning', 'delete'])
+
+
+def test_action_errors_reach_the_caller():
+    async def fail():
+        raise ConnectionError("discord unreachable")
+
+    async def main():
+        scheduler = OutboundScheduler()
+        results = await asyncio.gather(scheduler.run('chan', Priority.DELETE, fail),
+                                       scheduler.run('chan', Priority.DELETE, Calls().action('delete')),
+                                       return_exceptions=True)
+        return _outcomes(results)
+
+    assert asyncio.run(main()) == ['ConnectionError', 'delete']
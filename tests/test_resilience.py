@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+
+from resilience import CircuitBreaker, CircuitOpenError, ResilientBackend, StorageTimeout
+
+
+class FlakyBackend:
+    """Fails the first ``failures`` calls, then answers; records every call"""
+    name = 'flaky'
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = []
+
+    def _answer(self, method, result):
+        self.calls.append(method)
+        if len(self.calls) <= self.failures:
+            raise ConnectionError("backend unreachable")
+        return result
+
+    def fetch_row(self, table, guild_id):
+        return self._answer('fetch_row', {'guild_id': guild_id})
+
+    def upsert_row(self, table, guild_id, row):
+        return self._answer('upsert_row', None)
+
+    def fetch_rows(self, table, guild_ids=None):
+        raise ValueError(f"Unknown table: {table}")
+
+
+def _wrap(inner, **options):
+    options.setdefault('backoff', 0)
+    return ResilientBackend(inner, **options)
+
+
+def test_breaker_opens_rejects_and_half_opens():
+    breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure(ConnectionError())
+    assert breaker.state == 'closed'
+    breaker.record_failure(ConnectionError())
+
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.state == 'half_open'
+    assert breaker.allow()
+    assert not breaker.allow()  # one trial call at a time
+    breaker.record_success()
+    assert breaker.state == 'closed'
+
+
+def test_failed_trial_reopens_breaker():
+    breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure(ConnectionError())
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure(ConnectionError())
+
+    assert breaker.state == 'open'
+
+
+def test_reads_are_retried():
+    inner = FlakyBackend(failures=2)
+
+    assert _wrap(inner, retries=2).fetch_row('roles_data', '1') == {'guild_id': '1'}
+    assert inner.calls == ['fetch_row'] * 3
+
+
+def test_writes_are_sent_once():
+    inner = FlakyBackend(failures=1)
+
+    with pytest.raises(ConnectionError):
+        _wrap(inner, retries=2).upsert_row('roles_data', '1', {})
+    assert inner.calls == ['upsert_row']
+
+
+def test_open_breaker_fails_fast():
+    inner = FlakyBackend(failures=10)
+    backend = _wrap(inner, retries=0, breaker=CircuitBreaker('test', failure_threshold=2))
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            backend.fetch_row('roles_data', '1')
+
+    with pytest.raises(CircuitOpenError):
+        backend.fetch_row('roles_data', '1')
+    assert len(inner.calls) == 2
+
+
+def test_caller_errors_do_not_trip_breaker():
+    backend = _wrap(FlakyBackend(), retries=2, breaker=CircuitBreaker('test', failure_threshold=1))
+
+    with pytest.raises(ValueError):
+        backend.fetch_rows('nope')
+    assert backend.breaker.state == 'closed'
+
+
+def test_hung_call_times_out():
+    release = threading.Event()
+
+    class HungBackend(FlakyBackend):
+        def fetch_row(self, table, guild_id):
+            release.wait(5)
+
+    backend = _wrap(HungBackend(), timeout=0.05, retries=0)
+    try:
+        with pytest.raises(StorageTimeout):
+            backend.fetch_row('roles_data', '1')
+        assert backend.breaker.stats()['consecutive_failures'] == 1
+    finally:
+        release.set()
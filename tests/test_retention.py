@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+from retention import LogArchive, _parse_timestamp
+
+ROWS = [
+    {'id': 1, 'guild_id': '1', 'user_id': '7', 'channel_id': '10',
+     'message': 'What the HECK', 'timestamp': '2024-05-01T08:00:00+00:00'},
+    {'id': 2, 'guild_id': '1', 'user_id': '8', 'channel_id': '10',
+     'message': 'darn it', 'timestamp': '2024-05-02T08:00:00+00:00'},
+    {'id': 3, 'guild_id': '1', 'user_id': '7', 'channel_id': '11',
+     'message': 'heck no', 'timestamp': '2024-05-03T08:00:00+00:00'},
+]
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = LogArchive(str(tmp_path), compression='gzip')
+    archive.write_segment('1', ROWS[:2])
+    archive.write_segment('1', ROWS[2:])
+    archive.write_segment('2', [{**ROWS[0], 'id': 4, 'guild_id': '2'}])
+    return archive
+
+
+def _ids(rows):
+    return [row['id'] for row in rows]
+
+
+def test_search_reads_every_segment_of_a_guild(archive):
+    assert _ids(archive.search('1')) == [1, 2, 3]
+    assert _ids(archive.search()) == [1, 2, 3, 4]
+
+
+def test_search_combines_filters(archive):
+    assert _ids(archive.search('1', user_id=7)) == [1, 3]
+    assert _ids(archive.search('1', channel_id=10, text='heck')) == [1]
+
+
+def test_search_treats_naive_bounds_as_utc(archive):
+    rows = archive.search('1', since=datetime(2024, 5, 2), until=datetime(2024, 5, 3, 8))
+
+    assert _ids(rows) == [2]
+
+
+def test_parse_timestamp_defaults_to_utc():
+    assert _parse_timestamp('2024-05-02') == datetime(2024, 5, 2, tzinfo=timezone.utc)
+    assert _parse_timestamp('2024-05-02T01:00:00+02:00').utcoffset().total_seconds() == 7200
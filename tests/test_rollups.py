@@ -0,0 +1,68 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from rollups import RollupRegistry, TopK
+
+
+def test_topk_keeps_heavy_hitters_within_capacity():
+    top = TopK(capacity=3)
+    for key, count in (('a', 50), ('b', 40), ('c', 30)):
+        top.add(key, count)
+    for i in range(5):
+        top.add(f"rare{i}")
+
+    assert len(top.counts) == 3
+    assert [key for key, _ in top.most_common(2)] == ['a', 'b']
+    assert top.counts['a'] == 50
+
+
+def test_registry_loads_persisted_counts_once():
+    loads = []
+
+    def load(guild_id):
+        loads.append(guild_id)
+        return [{'dimension': 'total', 'bucket': '', 'count': 4},
+                {'dimension': 'user', 'bucket': 'alice#1', 'count': 4}]
+
+    registry = RollupRegistry(load, flush=lambda rows: None)
+    registry.record('1', 'alice#1', '10', 'heck', datetime(2024, 5, 1, 12, tzinfo=timezone.utc))
+    registry.record('1', 'bob#2', '10', None, datetime(2024, 5, 1, 13, tzinfo=timezone.utc))
+    summary = registry.summary('1')
+
+    assert loads == ['1']
+    assert summary['total'] == 6
+    assert summary['daily'] == {'2024-05-01': 2}
+    assert summary['hourly'] == {'2024-05-01T12': 1, '2024-05-01T13': 1}
+    assert summary['users'] == {'alice#1': 5, 'bob#2': 1}
+    assert summary['words'] == {'heck': 1}
+    assert summary['channels'] == {'10': 2}
+
+
+def test_registry_flush_writes_only_new_deltas():
+    flushed = []
+    registry = RollupRegistry(lambda guild_id: [{'dimension': 'total', 'bucket': '', 'count': 9}], flushed.extend)
+    registry.record('1', 'alice#1', '10', timestamp=datetime(2024, 5, 1, tzinfo=timezone.utc))
+
+    assert registry.flush() == 5
+    assert ('1', 'total', '', 1) in flushed
+    assert registry.flush() == 0
+
+
+def test_registry_flush_keeps_deltas_when_write_fails():
+    attempts = []
+
+    def flush(rows):
+        attempts.append(sorted(rows))
+        if len(attempts) == 1:
+            raise ConnectionError("backend unreachable")
+
+    registry = RollupRegistry(lambda guild_id: [], flush)
+    registry.record('1', 'alice#1', '10', timestamp=datetime(2024, 5, 1, tzinfo=timezone.utc))
+    with pytest.raises(ConnectionError):
+        registry.flush()
+    registry.record('1', 'alice#1', '10', timestamp=datetime(2024, 5, 1, tzinfo=timezone.utc))
+
+    assert registry.flush() == 5
+    assert ('1', 'total', '', 2) in attempts[1]
+    assert registry.summary('1')['total'] == 2
@@ -0,0 +1,97 @@
+import pytest
+
+from storage import SQLiteBackend
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return SQLiteBackend(str(tmp_path / 'moderator.db'))
+
+
+def _rollups(backend, guild_id):
+    return {(row['dimension'], row['bucket']): row['count'] for row in backend.fetch_rollups(guild_id)}
+
+
+def test_seed_rollups_only_seeds_once(backend):
+    assert backend.seed_rollups('1', [('total', '', 3), ('day', '2024-05-01', 3)])
+    assert not backend.seed_rollups('1', [('total', '', 3), ('day', '2024-05-01', 3)])
+
+    assert _rollups(backend, '1') == {('total', ''): 3, ('day', '2024-05-01'): 3}
+
+
+def test_increment_rollups_adds_to_seeded_counts(backend):
+    backend.seed_rollups('1', [('total', '', 3)])
+    backend.increment_rollups([('1', 'total', '', 2), ('1', 'user', 'alice#1', 1)])
+
+    assert _rollups(backend, '1') == {('total', ''): 5, ('user', 'alice#1'): 1}
+    assert backend.seed_rollups('2', [])
+
+
+def _insert_logs(backend, guild_id, timestamps):
+    for i, timestamp in enumerate(timestamps):
+        backend.insert_log({
+            'guild_id': guild_id, 'user_id': str(i % 2), 'username': 'user', 'channel_id': '10',
+            'message': f"message {i}", 'timestamp': timestamp
+        })
+
+
+def _pages(backend, guild_id, limit, **filters):
+    after = None
+    while True:
+        page = backend.fetch_logs(guild_id, limit, after=after, **filters)
+        if not page:
+            return
+        yield page
+        after = (page[-1]['timestamp'], page[-1]['id'])
+
+
+def test_fetch_logs_pages_through_ties_without_gaps(backend):
+    # Several rows share a timestamp, so the id must break ties between pages
+    timestamps = ['2024-05-01T00:00:00'] * 3 + ['2024-05-02T00:00:00'] * 4
+    _insert_logs(backend, '1', timestamps)
+    _insert_logs(backend, '2', timestamps)
+
+    pages = list(_pages(backend, '1', 2))
+    rows = [row for page in pages for row in page]
+
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+    assert len({row['id'] for row in rows}) == 7
+    assert all(row['guild_id'] == '1' for row in rows)
+    assert rows == sorted(rows, key=lambda row: (row['timestamp'], row['id']), reverse=True)
+
+
+def test_fetch_logs_ascending_with_filters(backend):
+    _insert_logs(backend, '1', [f"2024-05-0{day}T00:00:00" for day in range(1, 7)])
+
+    rows = [row for page in _pages(backend, '1', 2, ascending=True, user_id='0',
+                                    since='2024-05-02', until='2024-05-06')
+            for row in page]
+
+    assert [row['timestamp'][:10] for row in rows] == ['2024-05-03', '2024-05-05']
+
+
+def _words(backend, guild_id, since_version=0):
+    return [(row['word'], row['version'], row['deleted'])
+            for row in backend.fetch_swear_words([guild_id], since_version)]
+
+
+def test_swear_word_deltas_get_increasing_versions(backend):
+    backend.apply_swear_words('1', ['darn', 'heck'], [])
+    backend.apply_swear_words('2', ['heck'], [])
+    backend.apply_swear_words('1', ['shoot'], ['darn'], added_by='7')
+
+    assert _words(backend, '1') == [('heck', 1, 0), ('shoot', 3, 0)]
+    assert _words(backend, '2') == [('heck', 2, 0)]
+    assert backend.fetch_row('swear_data', '1')['allowed_channels'] == '[]'
+
+
+def test_swear_word_reads_since_a_version_include_tombstones(backend):
+    backend.apply_swear_words('1', ['darn', 'heck'], [])
+    backend.apply_swear_words('1', [], ['darn'])
+
+    assert _words(backend, '1', since_version=1) == [('darn', 2, 1)]
+    assert _words(backend, '1', since_version=2) == []
+
+    backend.apply_swear_words('1', ['darn', 'heck'], [])
+    # Only the revived word moves; a word that is already live keeps its version
+    assert _words(backend, '1', since_version=2) == [('darn', 3, 0)]
@@ -0,0 +1,50 @@
+import pytest
+
+pytest.importorskip("dotenv")
+
+import database
+from rollups import RollupRegistry
+
+TIMESTAMP = '2024-05-01T12:00:00+00:00'
+
+
+def _store_logs(guild_id, count):
+    for i in range(count):
+        database.backend.insert_log({
+            'guild_id': guild_id, 'user_id': '7', 'username': 'alice', 'discriminator': '1',
+            'channel_id': '10', 'message': f"message {i}", 'timestamp': TIMESTAMP
+        })
+
+
+def _log(guild_id):
+    return database.log_violation(int(guild_id), 7, 'alice', 10, 'heck', TIMESTAMP, '1', 'heck')
+
+
+def test_concurrent_backfills_seed_counts_once():
+    _store_logs('2001', 3)
+    first = RollupRegistry(database._load_rollup_rows, database._flush_rollup_rows)
+    second = RollupRegistry(database._load_rollup_rows, database._flush_rollup_rows)
+
+    assert first.summary('2001')['total'] == 3
+    assert second.summary('2001')['total'] == 3
+    stored = {row['dimension']: row['count'] for row in database.backend.fetch_rollups('2001')}
+    assert stored['total'] == 3
+
+
+def test_backfill_does_not_count_the_violation_being_logged():
+    _store_logs('2002', 2)
+
+    assert _log('2002')
+
+    assert database.rollups.summary('2002')['total'] == 3
+
+
+def test_failed_insert_is_not_counted(monkeypatch):
+    assert _log('2003')
+
+    def insert_log(log):
+        raise ConnectionError("backend unreachable")
+    monkeypatch.setattr(database.backend, 'insert_log', insert_log)
+
+    assert not _log('2003')
+    assert database.rollups.summary('2003')['total'] == 1
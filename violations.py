@@ -0,0 +1,69 @@
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, Set
+
+from metrics import metrics
+
+# A step of violation handling: a coroutine factory, called once
+Step = Callable[[], Awaitable[None]]
+
+
+class ViolationPipeline:
+    """Runs the slow parts of handling a violation in the background.
+
+    ``on_message`` only deletes the offending message; logging, the audit
+    embed and the warning are submitted here and run as a background task.
+    The steps of one violation run concurrently and fail independently, and
+    at most ``max_concurrency`` violations are processed at once so a burst
+    cannot flood the database or the Discord API. Each step's duration is
+    recorded as ``violation.<step>.seconds``, and the time from receiving the
+    message to the last step finishing as ``violation.total_seconds``.
+    """
+
+    def __init__(self, max_concurrency: int = 20):
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def record(step: str, started: float) -> None:
+        """Record a step that ran inline (e.g. the delete) from its perf_counter start"""
+        metrics.observe(f'violation.{step}.seconds', time.perf_counter() - started)
+
+    def submit(self, received: float, steps: Dict[str, Step]) -> asyncio.Task:
+        """Schedule a violation's steps; ``received`` is the message's perf_counter arrival time"""
+        task = asyncio.ensure_future(self._run(received, steps))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        metrics.incr('violation.submitted')
+        return task
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    async def _run(self, received: float, steps: Dict[str, Step]) -> None:
+        queued = time.perf_counter()
+        async with self._semaphore:
+            metrics.observe('violation.queue_seconds', time.perf_counter() - queued)
+            await asyncio.gather(*(self._step(name, step) for name, step in steps.items()))
+        metrics.observe('violation.total_seconds', time.perf_counter() - received)
+
+    async def _step(self, name: str, step: Step) -> None:
+        started = time.perf_counter()
+        try:
+            await step()
+        except Exception as e:
+            metrics.incr(f'violation.{name}.errors')
+            print(f"[WARNING] Violation step '{name}' failed: {e}")
+        finally:
+            self.record(name, started)
+
+    async def drain(self, timeout: float = 10.0) -> None:
+        """Wait for submitted violations to finish (at shutdown)"""
+        if self._tasks:
+            await asyncio.wait(list(self._tasks), timeout=timeout)
+
+
+violation_pipeline = ViolationPipeline(int(os.getenv('VIOLATION_CONCURRENCY', '20')))
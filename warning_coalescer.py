@@ -0,0 +1,135 @@
+import asyncio
+import functools
+import os
+import time
+from typing import Dict, List, Optional
+
+import discord
+
+from metrics import metrics
+from outbound import Priority, outbound
+
+
+class _ChannelWarning:
+    __slots__ = ("message", "offenders", "allowed", "expires_at", "dirty", "last_edit", "task", "changed")
+
+    def __init__(self, allowed: List[str], expires_at: float):
+        self.message: Optional[discord.Message] = None
+        self.offenders: Dict[str, None] = {}  # mentions, in order of first offence
+        self.allowed = allowed
+        self.expires_at = expires_at
+        self.dirty = False
+        self.last_edit = 0.0
+        self.task: Optional[asyncio.Task] = None
+        self.changed = asyncio.Event()
+
+
+class WarningCoalescer:
+    """One live warning message per channel instead of one per violation.
+
+    The first violation in a channel posts a warning. Later offenders within
+    ``ttl`` seconds are added to that message by editing it in place, and
+    each one pushes its removal back to ``ttl`` seconds after the latest
+    offence. Edits are rate-limited to one per ``edit_interval`` seconds per
+    channel, with intermediate changes merged, so a channel under attack costs
+    one send, a bounded trickle of edits and one delete however many messages
+    are filtered. Mentions added by an edit do not ping anyone.
+    """
+
+    def __init__(self, ttl: float = 10.0, edit_interval: float = 2.0, max_mentions: int = 10):
+        self.ttl = ttl
+        self.edit_interval = edit_interval
+        self.max_mentions = max_mentions
+        self._channels: Dict[int, _ChannelWarning] = {}
+
+    def _render(self, state: _ChannelWarning) -> str:
+        mentions = list(state.offenders)
+        shown = ", ".join(mentions[:self.max_mentions])
+        if len(mentions) > self.max_mentions:
+            shown += f" and {len(mentions) - self.max_mentions} others"
+        filtered = "your message was filtered" if len(mentions) == 1 else "your messages were filtered"
+        if state.allowed:
+            return f"{shown}, {filtered}. Swearing is only allowed in: {' '.join(state.allowed)}"
+        return f"{shown}, {filtered}. Swearing is not allowed here."
+
+    async def warn(self, channel: discord.TextChannel, member: discord.Member, allowed: List[str]) -> None:
+        """Warn ``member`` in ``channel``; ``allowed`` are mentions of the channels where swearing is allowed"""
+        now = time.monotonic()
+        state = self._channels.get(channel.id)
+        if state is not None:
+            state.expires_at = now + self.ttl
+            state.allowed = allowed
+            if member.mention not in state.offenders:
+                state.offenders[member.mention] = None
+                state.dirty = True
+                state.changed.set()
+                metrics.incr('warnings.coalesced')
+            else:
+                metrics.incr('warnings.repeat_offences')
+            return
+
+        # Registered before sending so offenders arriving meanwhile join this warning
+        state = self._channels[channel.id] = _ChannelWarning(allowed, now + self.ttl)
+        state.offenders[member.mention] = None
+        try:
+            state.message = await outbound.run(
+                channel.id, Priority.WARNING, functools.partial(channel.send, self._render(state))
+            )
+        except Exception:
+            self._channels.pop(channel.id, None)
+            raise
+        metrics.incr('warnings.sent')
+        state.last_edit = time.monotonic()
+        state.task = asyncio.ensure_future(self._maintain(channel.id, state))
+
+    async def _maintain(self, channel_id: int, state: _ChannelWarning) -> None:
+        """Apply pending edits at most once per edit_interval, then delete the warning when it expires"""
+        try:
+            while True:
+                now = time.monotonic()
+                if state.dirty and now - state.last_edit >= self.edit_interval:
+                    state.dirty = False
+                    state.last_edit = now
+                    try:
+                        await outbound.run(
+                            channel_id, Priority.WARNING,
+                            functools.partial(state.message.edit, content=self._render(state))
+                        )
+                        metrics.incr('warnings.edits')
+                    except discord.NotFound:
+                        return  # Deleted by someone else
+                    except discord.HTTPException as e:
+                        print(f"[WARNING] Failed to update warning in {channel_id}: {e}")
+                    continue
+                if now >= state.expires_at:
+                    return
+                if state.dirty:
+                    await asyncio.sleep(min(state.expires_at, state.last_edit + self.edit_interval) - now)
+                    continue
+                # Sleep until expiry, or until a new offender needs an edit
+                state.changed.clear()
+                try:
+                    await asyncio.wait_for(state.changed.wait(), state.expires_at - now)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if self._channels.get(channel_id) is state:
+                del self._channels[channel_id]
+            try:
+                # Not cosmetic: shed work would leave the warning up for good
+                await outbound.run(channel_id, Priority.WARNING, state.message.delete)
+            except discord.HTTPException:
+                pass
+
+    async def close(self) -> None:
+        """Remove every live warning now"""
+        tasks = [state.task for state in self._channels.values() if state.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+warning_coalescer = WarningCoalescer(
+    ttl=float(os.getenv('WARNING_TTL', '10')),
+    edit_interval=float(os.getenv('WARNING_EDIT_INTERVAL', '2'))
+)